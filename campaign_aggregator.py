@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - キャンペーン名単位集計
+統合CSVデータのキャンペーン名×ソース（adult/general）単位の指標合算
+"""
+
+from pathlib import Path
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from loguru import logger
+from shard_pool import ShardPool
+
+
+class CampaignAggregator:
+    """キャンペーン名単位集計クラス"""
+
+    # 合算対象の指標列（CSV列名）
+    METRIC_COLUMNS = ['Imp', 'Click', 'CV', 'グロス', 'ネット']
+
+    # 整数として扱う指標列
+    INTEGER_METRICS = ['Imp', 'Click', 'CV']
+
+    # Excelシリアル値の起点（1900年うるう年バグのため1900-03-01以降のみ一致）
+    EXCEL_EPOCH = date(1899, 12, 30)
+    EXCEL_SERIAL_MIN_DATE = date(1900, 3, 1)
+
+    def __init__(self, config: dict):
+        self.config = config
+
+        # 集計シート設定
+        self.summary_columns = config["excel_structure"]["summary_columns"]
+        self.max_campaign_rows = config["filter_settings"]["max_campaign_rows"]
+        self.ctr_decimal_places = config["aggregation"]["ctr_decimal_places"]
+        self.cvr_decimal_places = config["aggregation"]["cvr_decimal_places"]
+
+        # Excel SEARCH の文字列化と一致させられない検索キー（load_filter_keys で設定）
+        self.inexact_keys = []
+
+    def aggregate(self, data: pd.DataFrame, source_row_counts: dict) -> pd.DataFrame:
+        """キャンペーン名×ソース単位の指標合算（列: source, キャンペーン名, Imp, Click, CV, グロス, ネット）"""
+        # 大容量データは行分割してプロセスプールで部分合算（少量時・並列実行不可時は単一プロセス）
+        aggregated = None
+        shard_pool = ShardPool(self.config)
+        if shard_pool.should_aggregate(len(data)):
+            try:
+                aggregated = shard_pool.aggregate(data, self.source_labels(source_row_counts), self.METRIC_COLUMNS)
+            except Exception as e:
+                logger.warning(f"並列集計失敗のため単一プロセスで集計します: {e}")
+
+        if aggregated is None:
+            metrics = self.to_numeric_metrics(data)
+            metrics.insert(0, 'キャンペーン名', data['キャンペーン名'].to_numpy())
+            metrics.insert(0, 'source', self.source_labels(source_row_counts))
+
+            aggregated = (
+                metrics.groupby(['source', 'キャンペーン名'], observed=True, sort=False)[self.METRIC_COLUMNS]
+                .sum()
+                .reset_index()
+            )
+        aggregated['source'] = aggregated['source'].astype(str)
+        aggregated['キャンペーン名'] = aggregated['キャンペーン名'].astype(str)
+
+        logger.info(f"キャンペーン名単位集計完了: {len(data):,}行 → {len(aggregated):,}行")
+        return aggregated
+
+    def breakdowns(self, data: pd.DataFrame, source_row_counts: dict, dimensions: list) -> pd.DataFrame:
+        """集計軸別の指標合算（列: 集計軸, 値, Imp, Click, CTR, CV, CVR, グロス, ネット、"ソース" は adult/general）"""
+        metrics = self.to_numeric_metrics(data)
+
+        tables = []
+        for dimension in dimensions:
+            if dimension == 'ソース':
+                keys = self.source_labels(source_row_counts)
+            elif dimension in data.columns:
+                keys = data[dimension].to_numpy()
+            else:
+                logger.warning(f"集計軸の列がありません: {dimension}")
+                continue
+
+            table = metrics.groupby(keys, observed=True, sort=True)[self.METRIC_COLUMNS].sum()
+            table.insert(0, '値', table.index.astype(str))
+            table.insert(0, '集計軸', dimension)
+            tables.append(table.reset_index(drop=True))
+
+        if not tables:
+            return pd.DataFrame(columns=['集計軸', '値', 'Imp', 'Click', 'CTR', 'CV', 'CVR', 'グロス', 'ネット'])
+
+        breakdown = pd.concat(tables, ignore_index=True)
+        breakdown['CTR'] = (breakdown['Click'] / breakdown['Imp'].where(breakdown['Imp'] > 0) * 100).round(self.ctr_decimal_places)
+        breakdown['CVR'] = (breakdown['CV'] / breakdown['Click'].where(breakdown['Click'] > 0) * 100).round(self.cvr_decimal_places)
+
+        logger.info(f"集計軸別集計完了: {len(tables)}軸 / {len(breakdown):,}行")
+        return breakdown[['集計軸', '値', 'Imp', 'Click', 'CTR', 'CV', 'CVR', 'グロス', 'ネット']]
+
+    def format_for_paste(self, aggregated: pd.DataFrame) -> pd.DataFrame:
+        """抽出シート貼付用の事前集計表（列名は関数の列位置検出と一致、CTR/CVRは合算後に再計算）"""
+        paste_data = aggregated.rename(columns={'source': 'ソース'})
+
+        ctr = (paste_data['Click'] / paste_data['Imp'].where(paste_data['Imp'] > 0) * 100).round(self.ctr_decimal_places)
+        cvr = (paste_data['CV'] / paste_data['Click'].where(paste_data['Click'] > 0) * 100).round(self.cvr_decimal_places)
+
+        # 算出不能（分母0）は空セル
+        paste_data['CTR'] = ctr.astype(object).where(ctr.notna(), "")
+        paste_data['CVR'] = cvr.astype(object).where(cvr.notna(), "")
+
+        return paste_data[['ソース', 'キャンペーン名', 'Imp', 'Click', 'CTR', 'CV', 'CVR', 'グロス', 'ネット']]
+
+    def to_numeric_metrics(self, data: pd.DataFrame) -> pd.DataFrame:
+        """指標列の数値変換（数値化できない値は0、Excel SUMと同じ扱い）"""
+        metrics = {}
+        for col in self.METRIC_COLUMNS:
+            if col in data.columns:
+                values = pd.to_numeric(data[col].astype(str).str.replace(',', '', regex=False), errors='coerce')
+                values = values.fillna(0)
+            else:
+                values = pd.Series(0, index=data.index)
+            metrics[col] = values.astype('int64') if col in self.INTEGER_METRICS else values.astype('float64')
+
+        return pd.DataFrame(metrics, index=data.index)
+
+    def source_labels(self, source_row_counts: dict) -> pd.Categorical:
+        """ソースラベル生成（統合データは adult → general 順に連結されている）"""
+        labels = np.repeat(list(source_row_counts.keys()), list(source_row_counts.values()))
+        return pd.Categorical(labels, categories=list(source_row_counts.keys()))
+
+    def load_filter_keys(self) -> list:
+        """集計シートA列（A2以降）の検索キー読込（Excel不使用、openpyxl読取専用）"""
+        from openpyxl import load_workbook
+
+        filter_excel = Path(self.config["paths"]["filter_input_excel"])
+        sheet_name = self.config["filter_settings"]["sheet_name"]
+        start_row = self.config["filter_settings"]["start_row"]
+
+        workbook = load_workbook(filter_excel, read_only=True, data_only=True)
+        try:
+            sheet = workbook[sheet_name]
+            keys = [
+                row[0] for row in sheet.iter_rows(
+                    min_row=start_row, max_row=start_row + self.max_campaign_rows - 1,
+                    min_col=1, max_col=1, values_only=True
+                )
+            ]
+        finally:
+            workbook.close()
+
+        key_texts = [self.search_text(key) for key in keys]
+        keys = [text for text, _ in key_texts]
+        self.inexact_keys = [text for text, exact in key_texts if not exact]
+        if self.inexact_keys:
+            logger.warning(f"Excel SEARCH と同じ文字列にできない検索キー（数値・日時セル）: {self.inexact_keys}")
+        logger.info(f"検索キー読込完了: {sum(1 for key in keys if key)}件（{filter_excel}）")
+        return keys
+
+    def search_text(self, value) -> tuple:
+        """検索キーのセル値 → Excel SEARCH が検索する文字列（文字列, 一致が確実か）
+
+        数値セルは表示形式ではなく値の標準形式（12.0 → "12"）、日付セルはシリアル値で検索される
+        """
+        if value is None:
+            return "", True
+        if isinstance(value, str):
+            return value.strip(), True
+        if isinstance(value, bool):
+            return ("TRUE" if value else "FALSE"), True
+
+        if isinstance(value, datetime):
+            # 時刻付きは小数部の丸めが一致する保証がないため日付のみ対象
+            if value.time() != datetime.min.time():
+                return str(value), False
+            value = value.date()
+        if isinstance(value, date):
+            if value < self.EXCEL_SERIAL_MIN_DATE:
+                return str(value), False
+            return str((value - self.EXCEL_EPOCH).days), True
+
+        if isinstance(value, (int, float)):
+            if float(value).is_integer() and abs(value) < 1e15:
+                return str(int(value)), True
+            # 標準形式は有効15桁（指数表記は Excel と書式が異なる）
+            text = f"{value:.15g}"
+            return text, "e" not in text and "n" not in text
+
+        return str(value).strip(), False
+
+    def build_summary(self, campaign_totals: pd.DataFrame, keys: list, match_cache=None) -> pd.DataFrame:
+        """集計シート相当の集計（キー部分一致で合算、CTR/CVRは合算後に再計算、match_cache 指定時は新出名のみ照合）"""
+        names = campaign_totals['キャンペーン名'].astype(str)
+        metric_values = campaign_totals[self.METRIC_COLUMNS]
+
+        if match_cache is None and not ShardPool(self.config).should_match(names.nunique()):
+            # Excel SEARCH と同じく大文字小文字を区別しない部分一致
+            matched_rows = lambda key: names.str.contains(key, case=False, regex=False).to_numpy()
+        else:
+            # 同名行を集約し、キャンペーン名 → 一致キーをキャッシュ（未指定時は並列照合）から解決
+            metric_values = metric_values.groupby(names.to_numpy(), sort=False).sum()
+            if match_cache is None:
+                matches = self._match_names(keys, list(metric_values.index))
+            else:
+                matches = match_cache.matches(keys, list(metric_values.index), self._match_names)
+
+            key_positions = {}
+            for position, name in enumerate(metric_values.index):
+                for key in matches[name]:
+                    key_positions.setdefault(key, []).append(position)
+
+            def matched_rows(key):
+                mask = np.zeros(len(metric_values), dtype=bool)
+                mask[key_positions.get(key, [])] = True
+                return mask
+
+        records = []
+        for key in keys:
+            if not key:
+                continue
+
+            matched = matched_rows(key)
+            record = {'キャンペーン名': key}
+            if matched.any():
+                sums = metric_values[matched].sum()
+                record.update({col: sums[col] for col in self.METRIC_COLUMNS})
+            records.append(record)
+
+        summary = pd.DataFrame(records, columns=['キャンペーン名'] + self.METRIC_COLUMNS)
+        summary['CTR'] = (summary['Click'] / summary['Imp'].where(summary['Imp'] > 0) * 100).round(self.ctr_decimal_places)
+        summary['CVR'] = (summary['CV'] / summary['Click'].where(summary['Click'] > 0) * 100).round(self.cvr_decimal_places)
+        summary['税別グロス'] = (summary['グロス'] / 1.1).round(0)
+
+        logger.info(f"集計シート相当集計完了: {len(summary)}キー")
+        return summary[self.summary_columns]
+
+    def wildcard_keys(self, keys: list) -> list:
+        """Excel SEARCH のワイルドカード（* ? ~）を含む検索キー（Python側の部分一致と結果が異なる）"""
+        return [key for key in keys if any(char in key for char in "*?~")]
+
+    def filter_matching_rows(self, data: pd.DataFrame, keys: list, match_cache=None) -> tuple:
+        """検索キーに部分一致するキャンペーン名の行のみ抽出（行順維持、抽出データと除外行数を返却）"""
+        names = data['キャンペーン名']
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            codes = names.cat.codes.to_numpy()
+            uniques = names.cat.categories
+        else:
+            codes, uniques = pd.factorize(names, use_na_sentinel=True)
+
+        # 照合はキャンペーン名の種類単位（行単位の照合なし）
+        unique_names = [str(name) for name in uniques]
+        keys = [key for key in keys if key]
+        if match_cache is None:
+            matches = self._match_names(keys, unique_names)
+        else:
+            matches = match_cache.matches(keys, unique_names, self._match_names)
+        matched_names = np.array([bool(matches[name]) for name in unique_names], dtype=bool)
+
+        keep = np.zeros(len(data), dtype=bool)
+        valid = codes >= 0
+        keep[valid] = matched_names[codes[valid]]
+        return data[keep], int((~keep).sum())
+
+    def _match_names(self, keys: list, names: list) -> dict:
+        """キャンペーン名ごとの一致キー照合（照合対象名が多い場合はキャンペーン名を分割して並列照合）"""
+        shard_pool = ShardPool(self.config)
+        if shard_pool.should_match(len(names)):
+            try:
+                matches = shard_pool.match(keys, names)
+                if matches is not None:
+                    return matches
+            except Exception as e:
+                logger.warning(f"並列照合失敗のため単一プロセスで照合します: {e}")
+        return self._match_names_serial(keys, names)
+
+    def _match_names_serial(self, keys: list, names: list) -> dict:
+        """キャンペーン名ごとの一致キー照合（Excel SEARCH と同じく大文字小文字を区別しない部分一致）"""
+        name_series = pd.Series(names, dtype=object)
+        matches = {name: [] for name in names}
+        for key in dict.fromkeys(key for key in keys if key):
+            for name in name_series[name_series.str.contains(key, case=False, regex=False).to_numpy()]:
+                matches[name].append(key)
+        return matches
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 工程チェックポイント
+完了工程の成果物（統合データ・集計値）をParquetで保存し、--resume 時に入力フィンガープリント照合のうえ再利用
+通常実行の入力照合はサイズ・更新時刻のみ（内容ハッシュは失敗時に記録し、--resume 時に照合）、Parquet保存は別スレッドで実行
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from loguru import logger
+
+
+class CheckpointStore:
+    """工程チェックポイント管理クラス"""
+
+    MANIFEST_FILENAME = "manifest.json"
+
+    # フィンガープリントに含める設定セクション（変更時はチェックポイント破棄）
+    FINGERPRINT_SECTIONS = ("csv_processing", "aggregation", "filter_settings", "excel_structure")
+
+    # ハッシュ計算時の読込単位
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, config: dict, target_date_str: str):
+        self.config = config
+        self.target_date_str = target_date_str
+
+        checkpoint_config = config.get("checkpoint", {})
+        self.checkpoint_dir = Path(checkpoint_config.get("checkpoint_dir", "checkpoint")) / target_date_str
+        self.manifest = {"fingerprint": None, "stages": {}}
+
+        # ワーカースレッド工程からの同時書込対策
+        self._lock = threading.Lock()
+
+        # Parquet保存（工程の完了を待たせないよう1スレッドで順次保存、正常終了時は未着手分を破棄）
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending = []
+        self._discarding = False
+
+    def fingerprint(self, input_files: list) -> str:
+        """入力フィンガープリント（処理対象日・関連設定・入力CSVのサイズと更新時刻、内容は読まない）"""
+        digest = hashlib.sha256()
+        digest.update(self.target_date_str.encode("utf-8"))
+
+        for section in self.FINGERPRINT_SECTIONS:
+            section_json = json.dumps(self.config.get(section, {}), sort_keys=True, ensure_ascii=False, default=str)
+            digest.update(section_json.encode("utf-8"))
+
+        for input_file in input_files:
+            digest.update(json.dumps([Path(input_file).name, self.file_stat(input_file)]).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def content_hash(self, input_files: list) -> str:
+        """入力CSV内容のSHA-256（失敗時の記録・--resume 時の照合のみ）"""
+        digest = hashlib.sha256()
+        for input_file in input_files:
+            digest.update(self.file_hash(input_file).encode("utf-8"))
+        return digest.hexdigest()
+
+    def record_input_hash(self, input_files: list):
+        """入力CSV内容ハッシュの記録（失敗時、--resume 時にサイズ・更新時刻の一致だけでは検出できない変更を照合）"""
+        input_hash = self.content_hash(input_files)
+        with self._lock:
+            self.manifest["input_sha256"] = input_hash
+            self._write_manifest()
+
+    def start(self, fingerprint: str):
+        """新規実行（既存チェックポイントを破棄）"""
+        with self._lock:
+            shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+            self.manifest = {"fingerprint": fingerprint, "stages": {}}
+            self._write_manifest()
+
+    def resume(self, fingerprint: str, input_files: list) -> list:
+        """再開（フィンガープリント・入力内容ハッシュ一致時は完了工程名一覧を返却、不一致・未作成時は新規実行）"""
+        manifest_file = self.checkpoint_dir / self.MANIFEST_FILENAME
+        if not manifest_file.exists():
+            logger.warning(f"チェックポイントがないため最初から実行: {self.checkpoint_dir}")
+            self.start(fingerprint)
+            return []
+
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if manifest.get("fingerprint") != fingerprint:
+            logger.warning("入力CSVまたは設定が変更されたためチェックポイントを破棄して最初から実行")
+            self.start(fingerprint)
+            return []
+
+        # サイズ・更新時刻が一致した場合のみ内容を照合（失敗時に記録した内容ハッシュがある場合）
+        saved_hash = manifest.get("input_sha256")
+        if saved_hash and self.content_hash(input_files) != saved_hash:
+            logger.warning("入力CSVの内容が変更されたためチェックポイントを破棄して最初から実行")
+            self.start(fingerprint)
+            return []
+
+        self.manifest = manifest
+        completed_stages = list(manifest["stages"])
+        logger.info(f"チェックポイント検証完了: 完了済み工程 {completed_stages}")
+        return completed_stages
+
+    def complete(self, stage_name: str, frames: dict = None, values: dict = None):
+        """工程完了記録（DataFrameはParquet、スキーマ・集計値はマニフェストに保存、DataFrameありは別スレッドで保存）"""
+        if frames:
+            with self._lock:
+                self._pending.append(self._writer.submit(self._complete, stage_name, frames, values))
+        else:
+            self._complete(stage_name, frames, values)
+
+    def flush(self):
+        """保存待ちのチェックポイントを全て保存（失敗時の再開前）"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in wait(pending).done:
+            if future.exception():
+                logger.warning(f"チェックポイント保存エラー: {future.exception()}")
+
+    def _complete(self, stage_name: str, frames: dict, values: dict):
+        if self._discarding:
+            return
+
+        frame_entries = {}
+        for frame_name, frame in (frames or {}).items():
+            frame_file = self.checkpoint_dir / f"{frame_name}.parquet"
+            temp_file = frame_file.with_name(f".{frame_file.name}.tmp")
+            frame.to_parquet(temp_file, index=False)
+            os.replace(temp_file, frame_file)
+
+            frame_entries[frame_name] = {
+                "file": frame_file.name,
+                "rows": len(frame),
+                "schema": {column: str(dtype) for column, dtype in frame.dtypes.items()},
+            }
+
+        with self._lock:
+            self.manifest["stages"][stage_name] = {
+                "completed_at": datetime.now().isoformat(timespec="seconds"),
+                "frames": frame_entries,
+                "values": values or {},
+            }
+            self._write_manifest()
+
+        logger.debug(f"チェックポイント保存: {stage_name} {list(frame_entries)}")
+
+    def load_frame(self, stage_name: str, frame_name: str):
+        """保存済みDataFrame読込（スキーマ不一致時は例外）"""
+        import pandas as pd
+
+        entry = self.manifest["stages"][stage_name]["frames"][frame_name]
+        frame = pd.read_parquet(self.checkpoint_dir / entry["file"])
+
+        schema = {column: str(dtype) for column, dtype in frame.dtypes.items()}
+        if schema != entry["schema"] or len(frame) != entry["rows"]:
+            raise ValueError(f"チェックポイントのスキーマ不一致: {frame_name}")
+
+        logger.info(f"チェックポイント読込: {frame_name} ({len(frame):,}行)")
+        return frame
+
+    def stage_values(self, stage_name: str) -> dict:
+        """保存済み集計値"""
+        return self.manifest["stages"][stage_name]["values"]
+
+    def has_frame(self, stage_name: str, frame_name: str) -> bool:
+        return frame_name in self.manifest["stages"].get(stage_name, {}).get("frames", {})
+
+    def clear(self):
+        """チェックポイント削除（正常終了時、未着手の保存は破棄）"""
+        self._discarding = True
+        self._writer.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        logger.debug(f"チェックポイント削除: {self.checkpoint_dir}")
+
+    def _write_manifest(self):
+        """マニフェスト書込（一時ファイル経由で置換）"""
+        manifest_file = self.checkpoint_dir / self.MANIFEST_FILENAME
+        temp_file = manifest_file.with_name(f".{manifest_file.name}.tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, manifest_file)
+
+    def file_stat(self, file_path: Path) -> dict:
+        """サイズ・更新時刻（ナノ秒）"""
+        stat = Path(file_path).stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def file_hash(self, file_path: Path) -> str:
+        """SHA-256ハッシュ計算"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
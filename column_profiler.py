@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 統合データ列統計
+列ごとに1回の因子化（カテゴリ列は既存のコード）で値の種類と出現数を求め、非空件数・数値変換失敗件数・
+最小/最大/合計（指標列）・種類数（記述列）を種類単位の計算のみで算出
+"""
+
+import json
+import time
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+class ColumnProfiler:
+    """統合データ列統計クラス"""
+
+    def __init__(self, config: dict):
+        self.config = config
+
+        # 指標列（合計を算出）・率列（末尾の % を除いて最小/最大のみ算出）
+        self.metric_columns = set(config["aggregation"]["sum_columns"])
+        self.rate_columns = set(config["aggregation"]["calculated_columns"])
+
+        # 抽出行数（0 は全行、大容量データは無作為抽出した行で統計を算出）
+        self.sample_rows = config["csv_processing"].get("profile_sample_rows", 0)
+
+    def profile(self, data: pd.DataFrame) -> dict:
+        """列統計（1件の構造化レコード）"""
+        start_time = time.perf_counter()
+
+        sampled = bool(self.sample_rows) and len(data) > self.sample_rows
+        target = data.sample(n=self.sample_rows, random_state=0) if sampled else data
+
+        columns = {}
+        for col in target.columns:
+            numeric = col in self.metric_columns or col in self.rate_columns
+            counts, values = self._value_counts(target[col], factorize=not numeric)
+            stripped = values.str.strip()
+            present = stripped.ne("").to_numpy()
+
+            column_profile = {"non_empty": int(counts[present].sum())}
+            if numeric:
+                column_profile["kind"] = "metric" if col in self.metric_columns else "rate"
+                column_profile.update(self._numeric_stats(stripped, counts, present, rate=col in self.rate_columns))
+            else:
+                column_profile["kind"] = "descriptive"
+                column_profile["distinct"] = int((present & (counts > 0)).sum())
+            columns[col] = column_profile
+
+        return {
+            "rows": len(data),
+            "profiled_rows": len(target),
+            "sampled": sampled,
+            "columns": columns,
+            "elapsed": round(time.perf_counter() - start_time, 4),
+        }
+
+    def _value_counts(self, series: pd.Series, factorize: bool = True) -> tuple:
+        """値の種類ごとの出現数（種類は文字列、全行走査は因子化の1回のみ）
+        指標列など種類数が行数に近い列は factorize=False で因子化を省略し、各行を出現数1の種類として扱う"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+        elif not factorize:
+            return np.ones(len(series), dtype="int64"), series.astype(str).reset_index(drop=True)
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return counts, pd.Series(uniques, dtype=object).astype(str)
+
+    def _numeric_stats(self, stripped: pd.Series, counts: np.ndarray, present: np.ndarray, rate: bool) -> dict:
+        """数値統計（種類単位で数値変換し、出現数で重み付け）"""
+        text = stripped.str.replace(",", "", regex=False)
+        if rate:
+            text = text.str.rstrip("%")
+        numbers = np.full(len(text), np.nan)
+        try:
+            # 通常は空欄以外全て数値のため pyarrow で一括変換（変換不可の値を含む場合のみ値ごとに判定）
+            present_text = text if present.all() else text[present]
+            numbers[present] = present_text.astype("double[pyarrow]").to_numpy(dtype="float64", na_value=np.nan)
+        except (ValueError, TypeError, ImportError):
+            numbers = pd.to_numeric(text, errors="coerce").to_numpy(dtype="float64")
+
+        parsed = ~np.isnan(numbers) & (counts > 0)
+        stats = {"parse_failures": int(counts[present & np.isnan(numbers)].sum())}
+        if parsed.any():
+            stats["min"] = float(numbers[parsed].min())
+            stats["max"] = float(numbers[parsed].max())
+            if not rate:
+                stats["sum"] = float((numbers[parsed] * counts[parsed]).sum())
+        return stats
+
+    def log_profile(self, profile: dict, checked_columns: list):
+        """列統計のログ出力（構造化レコードはパフォーマンスログ、品質警告は通常ログ）"""
+        sample_note = f"（{profile['profiled_rows']:,}行抽出）" if profile["sampled"] else ""
+        logger.info(f"列統計{sample_note}: {len(profile['columns'])}列 ({profile['elapsed']:.3f}秒)")
+
+        for col in checked_columns:
+            column_profile = profile["columns"].get(col)
+            if column_profile is None:
+                continue
+            logger.info(
+                f"  {col}列: 非空{column_profile['non_empty']:,}行 / 数値変換失敗{column_profile.get('parse_failures', 0):,}行"
+                + (f" / 合計{column_profile['sum']:,.2f}" if "sum" in column_profile else "")
+            )
+            if column_profile["non_empty"] == 0:
+                logger.warning(f"  {col}列が全行空です")
+            elif column_profile.get("parse_failures"):
+                logger.warning(f"  {col}列に数値変換できない値があります（集計では0として扱います）")
+
+        logger.bind(performance=True).info(f"列統計: {json.dumps(profile, ensure_ascii=False)}")
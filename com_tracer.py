@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - COM往復トレース
+xlwings の App/Book/Sheet/Range（.api 含む）を代理オブジェクトで包み、属性取得・設定・メソッド呼出ごとに
+呼出元・所要時間・データ量を記録して工程別に集計（performance.trace_com_calls 有効時のみ使用）
+"""
+
+import sys
+import heapq
+import inspect
+import threading
+import time
+from pathlib import Path
+from datetime import date, datetime
+from contextlib import contextmanager
+from collections import defaultdict
+from loguru import logger
+
+# 代理オブジェクトで包まない値（セル値・範囲値など、COMオブジェクト以外）
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None), list, tuple, dict, date, datetime)
+
+
+def _payload_cells(value) -> int:
+    """データ量（セル数: 2次元は全要素数、1次元は要素数、スカラーは1）"""
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (list, tuple)):
+            return sum(len(row) for row in value)
+        return len(value)
+    return 0 if value is None else 1
+
+
+def _call_site(frame) -> str:
+    return f"{Path(frame.f_code.co_filename).name}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+def _unwrap(value):
+    return object.__getattribute__(value, "_target") if isinstance(value, _Traced) else value
+
+
+class ComTracer:
+    """COM往復トレースクラス"""
+
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+
+        # (工程, 種別, 呼出元) → [回数, 所要秒, セル数]
+        self.records = defaultdict(lambda: [0, 0.0, 0])
+        # 所要時間上位の個別呼出（最小ヒープ）
+        self.slowest = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, stage_name: str):
+        """記録先工程の切替（スレッドごと）"""
+        previous = getattr(self._local, "stage_name", None)
+        self._local.stage_name = stage_name
+        try:
+            yield
+        finally:
+            self._local.stage_name = previous
+
+    def wrap(self, target, label: str = None):
+        """トレース用代理オブジェクト"""
+        return _Traced(self, target, label or type(target).__name__)
+
+    def wrap_factory(self, factory):
+        """生成関数の戻り値を代理オブジェクトで包む（DataHandler の app_factory 用）"""
+        return lambda *args, **kwargs: self.wrap(factory(*args, **kwargs))
+
+    def record(self, kind: str, site: str, seconds: float, cells: int):
+        stage_name = getattr(self._local, "stage_name", None) or "-"
+        with self._lock:
+            entry = self.records[(stage_name, kind, site)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += cells
+
+            self._sequence += 1
+            item = (seconds, self._sequence, stage_name, kind, site, cells)
+            if len(self.slowest) < self.top_n:
+                heapq.heappush(self.slowest, item)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def log_summary(self):
+        """工程別集計・低速呼出上位をパフォーマンスログへ出力"""
+        if not self.records:
+            return
+
+        perf_logger = logger.bind(performance=True)
+
+        stage_totals = defaultdict(lambda: [0, 0.0, 0])
+        for (stage_name, _, _), (count, seconds, cells) in self.records.items():
+            totals = stage_totals[stage_name]
+            totals[0] += count
+            totals[1] += seconds
+            totals[2] += cells
+
+        perf_logger.info("COM往復（工程別）:")
+        for stage_name, (count, seconds, cells) in sorted(stage_totals.items(), key=lambda item: -item[1][1]):
+            perf_logger.info(f"  {stage_name}: {count:,}回 {seconds:.3f}秒 ({cells:,}セル)")
+
+        perf_logger.info(f"COM往復（呼出元別 上位{self.top_n}件）:")
+        ranked = sorted(self.records.items(), key=lambda item: -item[1][1])[:self.top_n]
+        for (stage_name, kind, site), (count, seconds, cells) in ranked:
+            perf_logger.info(f"  {seconds:8.3f}秒 {count:6,}回 {cells:9,}セル  [{stage_name}] {kind} @ {site}")
+
+        perf_logger.info(f"COM往復（低速呼出 上位{self.top_n}件）:")
+        for seconds, _, stage_name, kind, site, cells in sorted(self.slowest, reverse=True):
+            perf_logger.info(f"  {seconds:8.3f}秒 {cells:9,}セル  [{stage_name}] {kind} @ {site}")
+
+
+class _Traced:
+    """トレース用代理オブジェクト（戻り値のCOMオブジェクトも順次包む）"""
+
+    __slots__ = ("_tracer", "_target", "_label")
+
+    def __init__(self, tracer: ComTracer, target, label: str):
+        object.__setattr__(self, "_tracer", tracer)
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_label", label)
+
+    def _wrap_result(self, value, name: str):
+        if isinstance(value, _PLAIN_TYPES):
+            return value
+        # xlwings オブジェクトは型名、.api 配下のCOMオブジェクトは取得経路を種別名に使用
+        if name == "api" or ".api" in self._label:
+            label = f"{self._label}.{name}" if name else self._label
+        else:
+            label = type(value).__name__
+        return _Traced(self._tracer, value, label)
+
+    def __getattr__(self, name: str):
+        start_time = time.perf_counter()
+        value = getattr(self._target, name)
+        elapsed = time.perf_counter() - start_time
+
+        # メソッド取得自体は往復なし（呼出時に記録）
+        if inspect.ismethod(value) or inspect.isbuiltin(value):
+            return _TracedMethod(self, value, name)
+
+        self._tracer.record(f"{self._label}.{name}", _call_site(sys._getframe(1)), elapsed, _payload_cells(value))
+        return self._wrap_result(value, name)
+
+    def __setattr__(self, name: str, value):
+        start_time = time.perf_counter()
+        setattr(self._target, name, _unwrap(value))
+        elapsed = time.perf_counter() - start_time
+        self._tracer.record(f"{self._label}.{name}=", _call_site(sys._getframe(1)), elapsed, _payload_cells(value))
+
+    def __call__(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        value = self._target(*[_unwrap(arg) for arg in args], **{key: _unwrap(arg) for key, arg in kwargs.items()})
+        elapsed = time.perf_counter() - start_time
+        self._tracer.record(f"{self._label}()", _call_site(sys._getframe(1)), elapsed, _payload_cells(value))
+        return self._wrap_result(value, "")
+
+    def __getitem__(self, key):
+        start_time = time.perf_counter()
+        value = self._target[_unwrap(key)]
+        elapsed = time.perf_counter() - start_time
+        self._tracer.record(f"{self._label}[]", _call_site(sys._getframe(1)), elapsed, 0)
+        return self._wrap_result(value, "")
+
+    def __iter__(self):
+        start_time = time.perf_counter()
+        items = list(self._target)
+        elapsed = time.perf_counter() - start_time
+        self._tracer.record(f"{self._label}.__iter__", _call_site(sys._getframe(1)), elapsed, len(items))
+        return iter([self._wrap_result(item, "") for item in items])
+
+    def __len__(self):
+        return len(self._target)
+
+    def __bool__(self):
+        return bool(self._target)
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"<traced {self._target!r}>"
+
+
+class _TracedMethod:
+    """トレース用メソッド（引数の代理オブジェクトは元に戻して呼出）"""
+
+    __slots__ = ("_owner", "_method", "_name")
+
+    def __init__(self, owner: _Traced, method, name: str):
+        self._owner = owner
+        self._method = method
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        value = self._method(*[_unwrap(arg) for arg in args], **{key: _unwrap(arg) for key, arg in kwargs.items()})
+        elapsed = time.perf_counter() - start_time
+
+        owner_label = object.__getattribute__(self._owner, "_label")
+        tracer = object.__getattribute__(self._owner, "_tracer")
+        payload = sum(_payload_cells(arg) for arg in args) + _payload_cells(value)
+        tracer.record(f"{owner_label}.{self._name}()", _call_site(sys._getframe(1)), elapsed, payload)
+        return self._owner._wrap_result(value, self._name)
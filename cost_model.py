@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 処理コスト予測
+入力CSVの先頭バイト列の抽出解析（推定行数・除外率・検索キー一致率）と実行設定から、Excel往復回数・関数セル数・
+再計算1回あたりの走査セル数・ピークメモリ・処理時間を予測（処理性能履歴があれば実測値で補正、ファイル作成なし）
+Excel往復回数・関数セル数は擬似バックエンドで1行の合成データを実行して工程別に計測し、貼付のスラブ数のみ行数から算出
+"""
+
+import copy
+import math
+import statistics
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+class CostModel:
+    """処理コスト予測クラス"""
+
+    # 集計行あたりのFILTER関数数（B/C/E/G/H列、各々検索列と対象列を走査）
+    FILTER_FORMULAS_PER_ROW = 5
+
+    # 処理性能履歴なし時のメモリ見積（プロセス基礎＋統合データ1セルあたり）
+    BASE_RSS = 150 * 1024 * 1024
+    BYTES_PER_CELL = 64
+
+    # 入力CSVの抽出解析バイト数（先頭から）
+    SAMPLE_BYTES = 1024 * 1024
+
+    def __init__(self, config: dict, target_date_str: str):
+        self.config = config
+        self.target_date_str = target_date_str
+
+        self.com_latency = config.get("perf_history", {}).get("com_latency_ms", 1.0) / 1000
+
+    def estimate(self, csv_paths: dict, keys: list, options: dict) -> dict:
+        """処理コスト予測（csv_paths はソース → CSVパス）"""
+        from data_processor import DataProcessor
+        from campaign_aggregator import CampaignAggregator
+
+        processor = DataProcessor(self.config, self.target_date_str)
+        aggregator = CampaignAggregator(self.config)
+
+        inputs = []
+        samples = []
+        for source, csv_path in csv_paths.items():
+            input_estimate, sample = self._sample_input(processor, source, csv_path)
+            inputs.append(input_estimate)
+            samples.append(sample)
+
+        rows = sum(input_estimate["rows"] for input_estimate in inputs)
+        input_bytes = sum(input_estimate["bytes"] for input_estimate in inputs)
+        sample = pd.concat(samples, ignore_index=True) if samples else pd.DataFrame(columns=["source", "キャンペーン名"])
+        columns = max((len(frame.columns) - 1 for frame in samples), default=0)
+        active_keys = [key for key in keys if key]
+
+        # 貼付行数（事前集計はキャンペーン名×ソース数、絞込貼付は抽出行の一致率で縮小）
+        paste_rows, detail_rows = rows, 0
+        paste_sample = sample
+        if options.get("paste_mode") == "aggregated":
+            paste_sample = sample.drop_duplicates(["source", "キャンペーン名"])
+            paste_rows = self._distinct_rows(len(paste_sample), len(sample), rows)
+            detail_rows = rows if self.config["excel_structure"].get("raw_detail_sheet_name") else 0
+
+        filter_ratio = None
+        if options.get("paste_filter") and active_keys and not aggregator.wildcard_keys(active_keys) and len(paste_sample):
+            filtered, _ = aggregator.filter_matching_rows(paste_sample, active_keys)
+            filter_ratio = len(filtered) / len(paste_sample)
+            paste_rows = round(paste_rows * filter_ratio)
+
+        # Excel往復回数・関数セル数（擬似バックエンドの計測値、貼付のスラブ数のみ行数から算出）
+        layout_skipped = options.get("skip_unchanged_layout", True) and self._layout_fingerprint_stored()
+        slab_rows = options.get("paste_slab_rows", 5000)
+        pasted_rows = [paste_rows] + ([detail_rows] if detail_rows else [])
+        full_pass, skipped_pass = self._measure_excel_pass(options, pasted_rows)
+        measured = skipped_pass if layout_skipped else full_pass
+
+        paste_calls = measured["stages"]["paste_csv_data"]["calls"]
+        com_calls = measured["total_calls"] - paste_calls["range.value.set"]
+        com_calls += sum(1 + math.ceil(rows_in_sheet / slab_rows) for rows_in_sheet in pasted_rows)
+        formula_cells = measured["stages"]["embed_formulas"]["cells"]["range.formula.set"]
+        recalc_formula_cells = full_pass["stages"]["embed_formulas"]["cells"]["range.formula.set"]
+
+        # 空欄キーの行は IF で FILTER を評価しない（検索列・対象列は使用範囲＝ヘッダー＋貼付行）
+        scan_cells = len(active_keys) * self.FILTER_FORMULAS_PER_ROW * 2 * (paste_rows + 1)
+
+        estimate = {
+            "inputs": inputs,
+            "rows": rows,
+            "input_bytes": input_bytes,
+            "keys": len(active_keys),
+            "paste_rows": paste_rows,
+            "detail_rows": detail_rows,
+            "filter_ratio": filter_ratio,
+            "layout_skipped": layout_skipped,
+            "com_calls": com_calls,
+            "com_seconds": com_calls * self.com_latency,
+            "formula_cells": formula_cells,
+            "recalc_formula_cells": recalc_formula_cells,
+            "scan_cells": scan_cells,
+        }
+        estimate.update(self._calibrate(rows, input_bytes, columns, options))
+        return estimate
+
+    def _sample_input(self, processor, source: str, csv_path: Path) -> tuple:
+        """入力CSVの先頭バイト列を解析し、全体行数・除外後行数を推定"""
+        sampled = processor.sample_csv(csv_path, source, max_bytes=self.SAMPLE_BYTES)
+
+        sample = sampled.pop("data").copy()
+        sample.insert(0, "source", source)
+        return {"source": source, "path": str(csv_path), **sampled}, sample
+
+    def _measure_excel_pass(self, options: dict, pasted_rows: list) -> tuple:
+        """擬似バックエンドで合成データを2回実行（1回目: 関数埋込・書式設定あり、2回目: 配置変更なしで省略）"""
+        from excel_benchmark import ExcelBenchmark
+
+        config = copy.deepcopy(self.config)
+        excel_structure = config["excel_structure"]
+        slab_rows = options.get("paste_slab_rows", 5000)
+        excel_structure["paste_slab_rows"] = slab_rows
+        excel_structure["skip_unchanged_layout"] = True
+        if len(pasted_rows) < 2:
+            excel_structure["raw_detail_sheet_name"] = ""
+
+        # 往復回数は列数・値に依存せず、2スラブ目以降は範囲代入のみ増えるため1スラブ分の行数で計測
+        frames = [self._synthetic_frame(min(rows, slab_rows)) for rows in pasted_rows]
+        full_pass, skipped_pass = ExcelBenchmark(config, self.target_date_str).run(
+            frames[0], frames[1] if len(frames) > 1 else None, passes=2,
+            breakdowns=self._synthetic_frame(1) if options.get("breakdown") else None
+        )
+        return full_pass, skipped_pass
+
+    def _synthetic_frame(self, rows: int) -> pd.DataFrame:
+        """CSVの集計対象列のみの合成データ"""
+        return pd.DataFrame({
+            "キャンペーングループ": ["G"] * rows,
+            "ID": range(rows),
+            "キャンペーン名": [f"キャンペーン{row}" for row in range(rows)],
+            "Imp": [0] * rows,
+            "Click": [0] * rows,
+            "CV": [0] * rows,
+            "グロス": [0] * rows,
+            "ネット": [0] * rows,
+        })
+
+    def _distinct_rows(self, sample_distinct: int, sample_rows: int, rows: int) -> int:
+        """キャンペーン名×ソース数の推定（抽出が全行なら実数、それ以外は日次集計履歴の中央値、履歴なしは比例推定）"""
+        if sample_rows >= rows:
+            return sample_distinct
+
+        history_path = Path(self.config.get("history", {}).get("db_path", "history/campaign_history.sqlite3"))
+        if history_path.exists():
+            import sqlite3
+
+            connection = sqlite3.connect(f"file:{history_path.as_posix()}?mode=ro", uri=True)
+            try:
+                counts = [row[0] for row in connection.execute(
+                    "SELECT campaign_count FROM ingested_days ORDER BY report_date DESC LIMIT 30"
+                )]
+            finally:
+                connection.close()
+            if counts:
+                return min(int(statistics.median(counts)), rows)
+
+        return min(round(sample_distinct * rows / max(sample_rows, 1)), rows)
+
+    def _layout_fingerprint_stored(self) -> bool:
+        """前回の関数配置フィンガープリントの有無（openpyxl読取専用、ありなら関数埋込・書式設定の省略を想定）"""
+        from openpyxl import load_workbook
+        from workbook_fingerprint import WorkbookFingerprint
+
+        filter_excel = Path(self.config["paths"]["filter_input_excel"])
+        if not filter_excel.exists():
+            return False
+        workbook = load_workbook(filter_excel, read_only=True)
+        try:
+            return WorkbookFingerprint.DEFINED_NAME in workbook.defined_names
+        finally:
+            workbook.close()
+
+    def _calibrate(self, rows: int, input_bytes: int, columns: int, options: dict) -> dict:
+        """ピークメモリ・処理時間（処理性能履歴の実測値で補正、同一設定の実行を優先）"""
+        calibration = {
+            "peak_rss": self.BASE_RSS + rows * columns * self.BYTES_PER_CELL,
+            "wall_seconds": None,
+            "stage_seconds": {},
+            "history_runs": 0,
+            "history_same_options": False,
+        }
+
+        history_path = Path(self.config.get("perf_history", {}).get("db_path", "history/perf_history.sqlite3"))
+        if not history_path.exists():
+            return calibration
+
+        from perf_history import PerfHistory
+
+        history = PerfHistory(self.config)
+        try:
+            samples = history.samples(history.options_key(options))
+            calibration["history_same_options"] = bool(samples)
+            if not samples:
+                samples = history.samples()
+        finally:
+            history.close()
+        if not samples:
+            return calibration
+
+        calibration["history_runs"] = len(samples)
+        calibration["peak_rss"] = self._fit(
+            [sample["input_bytes"] for sample in samples], [sample["peak_rss"] for sample in samples], input_bytes
+        )
+        calibration["wall_seconds"] = self._fit(
+            [sample["rows"] for sample in samples], [sample["total_seconds"] for sample in samples], rows
+        )
+        for stage_name in dict.fromkeys(name for sample in samples for name in sample["stages"]):
+            stage_samples = [sample for sample in samples if stage_name in sample["stages"]]
+            calibration["stage_seconds"][stage_name] = self._fit(
+                [sample["rows"] for sample in stage_samples],
+                [sample["stages"][stage_name] for sample in stage_samples], rows
+            )
+        logger.debug(f"処理性能履歴で補正: {len(samples)}件（同一設定: {calibration['history_same_options']}）")
+        return calibration
+
+    def _fit(self, xs: list, ys: list, x: float) -> float:
+        """実測値からの予測（規模が2種類以上なら一次回帰、それ以外・負の傾きは規模比の中央値）"""
+        if len(set(xs)) >= 2:
+            slope, intercept = np.polyfit(xs, ys, 1)
+            if slope >= 0:
+                return max(float(intercept + slope * x), 0.0)
+
+        ratios = [y / x_value for x_value, y in zip(xs, ys) if x_value > 0]
+        if not ratios:
+            return float(statistics.median(ys))
+        return float(statistics.median(ratios) * x)
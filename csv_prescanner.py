@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - CSVバイト列事前走査
+メモリマップしたCSVのバイト列から行境界・ヘッダー位置を特定し、除外パターンを含む行を文字列化前に除去
+"""
+
+import io
+import re
+import csv
+import mmap
+import time
+import codecs
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from loguru import logger
+
+
+class CsvPrescanner:
+    """CSVバイト列事前走査クラス"""
+
+    # 改行・引用符がマルチバイト文字の一部に現れないエンコーディング（codecs正規名）
+    SUPPORTED_ENCODINGS = {"shift_jis", "cp932", "euc_jp", "utf-8", "utf-8-sig", "ascii", "iso8859-1"}
+
+    # 改行・引用符位置探索の処理単位（一時ブール配列のサイズ上限）
+    SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, rule_definitions: list, skip_rows: int = 2):
+        # 部分一致ルールのみ事前走査（正規表現・完全一致・数値条件は解析後の除外で適用）
+        self.rule_definitions = [rule for rule in rule_definitions if rule.get("type", "substring") == "substring"]
+        self.skip_rows = skip_rows
+
+    def scan(self, file_path: Path, encoding: str) -> "PrescanResult":
+        """事前走査（非対応エンコーディング・ヘッダーなしの場合は None）"""
+        if codecs.lookup(encoding).name not in self.SUPPORTED_ENCODINGS:
+            logger.debug(f"事前走査非対応エンコーディング: {encoding}")
+            return None
+
+        start_time = time.perf_counter()
+        file = open(file_path, "rb")
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            file.close()
+            raise
+
+        buffer = np.frombuffer(mapped, dtype=np.uint8)
+        record_ends = self._record_ends(buffer)
+        header_index = self.skip_rows
+        if len(record_ends) <= header_index:
+            del buffer
+            mapped.close()
+            file.close()
+            return None
+
+        record_starts = np.concatenate(([0], record_ends[:-1]))
+        header_start, header_end = int(record_starts[header_index]), int(record_ends[header_index])
+        data_start = header_end
+
+        # 空行（改行のみ）はデータ行数に含めない
+        data_lengths = record_ends[header_index + 1:] - record_starts[header_index + 1:]
+        data_firsts = buffer[record_starts[header_index + 1:]]
+        blank_rows = int(np.count_nonzero((data_lengths == 1) | ((data_lengths == 2) & (data_firsts == 0x0D))))
+        data_rows = len(data_lengths) - blank_rows
+
+        # mmap を閉じられるよう配列参照を解放
+        del buffer, data_firsts
+
+        header = self._parse_record(mapped[header_start:header_end], encoding)
+        excluded, rule_hits = self._find_excluded_records(
+            mapped, encoding, header, record_starts, record_ends, data_start
+        )
+
+        # 残存バイト範囲（ヘッダー＋除外行の間の連続区間）
+        ranges = [(header_start, header_end)]
+        cursor = data_start
+        for index in sorted(excluded):
+            if record_starts[index] > cursor:
+                ranges.append((cursor, int(record_starts[index])))
+            cursor = int(record_ends[index])
+        if cursor < len(mapped):
+            ranges.append((cursor, len(mapped)))
+
+        elapsed = time.perf_counter() - start_time
+        return PrescanResult(file, mapped, ranges, data_rows, len(excluded), rule_hits, elapsed)
+
+    def _record_ends(self, buffer: np.ndarray) -> np.ndarray:
+        """レコード終端位置（改行の次位置、引用符内の改行はセル内改行として除外）"""
+        newlines = self._byte_positions(buffer, 0x0A)
+        quotes = self._byte_positions(buffer, 0x22)
+        if len(quotes):
+            newlines = newlines[np.searchsorted(quotes, newlines) % 2 == 0]
+
+        record_ends = newlines + 1
+        if len(buffer) and (len(record_ends) == 0 or record_ends[-1] != len(buffer)):
+            record_ends = np.append(record_ends, len(buffer))
+        return record_ends
+
+    def _byte_positions(self, buffer: np.ndarray, byte_value: int) -> np.ndarray:
+        """指定バイトの出現位置（ブロック単位で探索）"""
+        positions = [
+            np.flatnonzero(buffer[offset:offset + self.SCAN_BLOCK_SIZE] == byte_value) + offset
+            for offset in range(0, len(buffer), self.SCAN_BLOCK_SIZE)
+        ]
+        return np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+
+    def _compile_byte_rules(self, header: list, encoding: str) -> list:
+        """除外パターンのバイト列正規表現化（対象列がない・符号化できないルールは除外）"""
+        byte_rules = []
+        for rule in self.rule_definitions:
+            column = rule["column"]
+            pattern = str(rule["pattern"])
+            case = rule.get("case", False)
+            if column not in header or not pattern:
+                continue
+
+            # 大文字小文字を区別しない場合、バイト列で判定できるのはASCII英字の大小のみ
+            if not case and not all(ch.isascii() or ch.lower() == ch.upper() for ch in pattern):
+                continue
+
+            try:
+                pattern_bytes = pattern.encode(encoding)
+            except UnicodeEncodeError:
+                continue
+
+            byte_rules.append({
+                "column_index": header.index(column),
+                "pattern": pattern,
+                "case": case,
+                "regex": re.compile(re.escape(pattern_bytes), 0 if case else re.IGNORECASE),
+                "label": f"{column}列で'{pattern}'を含む",
+            })
+        return byte_rules
+
+    def _find_excluded_records(self, mapped: mmap.mmap, encoding: str, header: list,
+                               record_starts: np.ndarray, record_ends: np.ndarray, data_start: int) -> tuple:
+        """除外レコード特定（バイト列一致した行のみ文字列化して対象列の値を確認）"""
+        excluded = set()
+        rule_hits = Counter()
+
+        for rule in self._compile_byte_rules(header, encoding):
+            checked = set()
+            for match in rule["regex"].finditer(mapped, data_start):
+                index = int(np.searchsorted(record_ends, match.start(), side="right"))
+                if index in checked:
+                    continue
+                checked.add(index)
+
+                fields = self._parse_record(mapped[record_starts[index]:record_ends[index]], encoding)
+                if rule["column_index"] >= len(fields):
+                    continue
+
+                value = fields[rule["column_index"]]
+                if rule["case"]:
+                    hit = rule["pattern"] in value
+                else:
+                    hit = rule["pattern"].upper() in value.upper()
+
+                if hit:
+                    excluded.add(index)
+                    rule_hits[rule["label"]] += 1
+
+        return excluded, rule_hits
+
+    def _parse_record(self, record: bytes, encoding: str) -> list:
+        """単一レコードの文字列化・列分割"""
+        text = record.decode(encoding, errors="replace").rstrip("\r\n")
+        return next(csv.reader([text]), [])
+
+
+class PrescanResult:
+    """事前走査結果（残存バイト範囲・行数、解析完了まで mmap を保持）"""
+
+    def __init__(self, file, mapped: mmap.mmap, ranges: list, data_rows: int,
+                 excluded_rows: int, rule_hits: Counter, elapsed: float):
+        self.file = file
+        self.mapped = mapped
+        self.ranges = ranges
+        self.data_rows = data_rows
+        self.excluded_rows = excluded_rows
+        self.rule_hits = rule_hits
+        self.elapsed = elapsed
+        self._readers = []
+
+    def open(self) -> io.BufferedReader:
+        """残存バイト範囲を連続ストリームとして読むファイルオブジェクト（ヘッダー行から開始）"""
+        reader = io.BufferedReader(_RangeReader(self.mapped, self.ranges), buffer_size=1024 * 1024)
+        self._readers.append(reader)
+        return reader
+
+    def close(self):
+        for reader in self._readers:
+            reader.close()
+        self.mapped.close()
+        self.file.close()
+
+
+class _RangeReader(io.RawIOBase):
+    """mmap上の複数バイト範囲を順に読み出すストリーム（範囲外のバイトは読まない）"""
+
+    def __init__(self, mapped: mmap.mmap, ranges: list):
+        self.mapped = mapped
+        self.ranges = ranges
+        self.range_index = 0
+        self.offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self.range_index < len(self.ranges):
+            start, end = self.ranges[self.range_index]
+            position = start + self.offset
+            if position >= end:
+                self.range_index += 1
+                self.offset = 0
+                continue
+
+            size = min(len(buffer), end - position)
+            buffer[:size] = self.mapped[position:position + size]
+            self.offset += size
+            return size
+        return 0
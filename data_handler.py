@@ -11,11 +11,16 @@ import xlwings as xw
 from loguru import logger
 import time
 
+from workbook_fingerprint import WorkbookFingerprint
+
 
 class DataHandler:
     """Excelデータ操作クラス"""
 
-    def __init__(self, config: dict, target_date_str: str):
+    # 関数配置の版（関数テンプレート変更時に更新し、次回実行で再埋込させる）
+    FORMULA_LAYOUT_VERSION = 1
+
+    def __init__(self, config: dict, target_date_str: str, app_factory=None):
         self.config = config
         self.target_date_str = target_date_str
         self.filter_excel_path = Path(config["paths"]["filter_input_excel"])
@@ -27,105 +32,202 @@ class DataHandler:
         # 集計設定
         self.max_campaign_rows = config["filter_settings"]["max_campaign_rows"]
 
-        # xlwingsアプリケーション参照保持
+        # 貼付設定（1回の範囲代入で書き込む行数）
+        self.paste_slab_rows = config["excel_structure"].get("paste_slab_rows", 5000)
+        self.raw_detail_sheet_name = config["excel_structure"].get("raw_detail_sheet_name", "")
+
+        # 関数配置フィンガープリント（一致時は関数埋込を省略）
+        self.fingerprint = WorkbookFingerprint(config)
+
+        # xlwingsアプリケーション参照保持（app_factory 指定時は擬似バックエンド等を使用、既定は xw.App）
+        self.app_factory = app_factory or xw.App
         self.app = None
 
-    def process(self, csv_data: pd.DataFrame) -> xw.Book:
-        """Excelデータ操作メイン処理"""
+        # 計算方式（書込中は手動計算、保存前に復元）・再計算統計
+        self.original_calculation = None
+        self.recalc_count = 0
+        self.recalc_seconds = 0.0
+
+    def process(self, csv_data: pd.DataFrame, detail_data: pd.DataFrame = None) -> xw.Book:
+        """Excelデータ操作メイン処理（detail_data 指定時は明細シートにも貼付）"""
         logger.info("Excelデータ操作開始")
 
         # Excelアプリケーション設定
-        self.app = xw.App(visible=False, add_book=False)
-        self.app.display_alerts = False
-        self.app.screen_updating = False
+        self.launch_app()
 
         try:
             # ワークブック開く
-            workbook = self.app.books.open(str(self.filter_excel_path))
+            workbook = self.open_workbook()
 
             # CSV貼付処理（CSVの列順序・列名をそのまま保持）
-            self._paste_csv_data(workbook, csv_data)
-
-            # 計算を強制実行してから関数埋込
-            workbook.app.calculate()
-            time.sleep(1)  # 計算完了待機
+            self.paste(workbook, csv_data, detail_data)
 
             # 動的関数埋込処理
-            self._embed_dynamic_formulas(workbook)
+            self.embed_formulas(workbook)
 
-            # 再計算実行
-            workbook.app.calculate()
-            time.sleep(1)  # 計算完了待機
+            # 再計算（1回のみ）
+            self.recalculate(workbook)
 
             logger.info("Excelデータ操作完了")
             return workbook
 
         except Exception as e:
             logger.error(f"Excelデータ操作エラー: {e}")
-            if self.app:
-                self.app.quit()
+            self.quit_app()
             raise
 
-    def _paste_csv_data(self, workbook: xw.Book, csv_data: pd.DataFrame):
-        """CSV貼付処理（CSVの列順序・列名をそのまま保持）"""
-        logger.info("CSV貼付処理開始")
+    def launch_app(self) -> xw.App:
+        """Excelアプリケーション起動（非表示・警告/画面更新オフ）"""
+        self.app = self.app_factory(visible=False, add_book=False)
+        self.app.display_alerts = False
+        self.app.screen_updating = False
+        logger.info("Excelアプリケーション起動完了")
+        return self.app
+
+    def open_workbook(self) -> xw.Book:
+        """FilterInput_Csvreport.xlsx を開く（開いた後に手動計算へ切替）"""
+        workbook = self.app.books.open(str(self.filter_excel_path))
+        logger.info(f"ワークブックオープン完了: {self.filter_excel_path}")
+
+        # 計算方式はブックを開いた後でないと変更できない
+        self._suspend_calculation()
+        return workbook
+
+    def _suspend_calculation(self):
+        """手動計算・イベント停止（貼付・関数書込ごとの自動再計算を抑止）"""
+        self.original_calculation = self.app.calculation
+        self.app.calculation = "manual"
+        self.app.enable_events = False
+        logger.info(f"計算方式: {self.original_calculation} → manual（イベント停止）")
+
+    def restore_calculation(self):
+        """計算方式・イベントを元に戻す（保存前・エラー時）"""
+        if self.app is None or self.original_calculation is None:
+            return
+
+        try:
+            self.app.calculation = self.original_calculation
+            self.app.enable_events = True
+            logger.info(f"計算方式復元: {self.original_calculation}")
+        except Exception as e:
+            logger.warning(f"計算方式復元エラー: {e}")
+        self.original_calculation = None
+
+    def recalculate(self, workbook: xw.Book):
+        """再計算（書込完了後に1回のみ実行、書式設定・保存は計算済みの値を使用）"""
+        start_time = time.perf_counter()
+        workbook.app.calculate()
+        elapsed = time.perf_counter() - start_time
+
+        self.recalc_count += 1
+        self.recalc_seconds += elapsed
+        logger.info(f"再計算完了: {elapsed:.2f}秒（{self.recalc_count}回目）")
+
+    def paste(self, workbook: xw.Book, csv_data: pd.DataFrame, detail_data: pd.DataFrame = None):
+        """抽出シート（＋明細シート）貼付"""
+        # CSV貼付処理（CSVの列順序・列名をそのまま保持）
+        self._paste_csv_data(workbook, csv_data)
+
+        # 明細シート貼付（事前集計貼付時のみ、関数からは参照しない）
+        if detail_data is not None:
+            self._paste_csv_data(workbook, detail_data, sheet_name=self.raw_detail_sheet_name)
+
+    def paste_breakdown(self, workbook: xw.Book, breakdown: pd.DataFrame, sheet_name: str):
+        """集計軸別シート貼付（静的な表、ヘッダーと全行を1回の範囲代入で貼付）"""
+        if sheet_name in [sheet.name for sheet in workbook.sheets]:
+            breakdown_sheet = workbook.sheets[sheet_name]
+            breakdown_sheet.clear()
+        else:
+            breakdown_sheet = workbook.sheets.add(name=sheet_name, after=workbook.sheets[-1])
+
+        # 算出不能のCTR/CVR（分母0）は空セル
+        rows = [list(breakdown.columns)] + breakdown.astype(object).where(breakdown.notna(), "").values.tolist()
+        last_col = self._column_number_to_letter(len(breakdown.columns))
+        breakdown_sheet.range(f"A1:{last_col}{len(rows)}").value = rows
+        logger.info(f"集計軸別シート貼付完了: {sheet_name} A1:{last_col}{len(rows)}")
+
+    def write_value(self, workbook: xw.Book, address: str, value):
+        """単一セル書込（address は "シート名!セル" 形式・シート名省略時は集計シート、シートがない場合は書込なし）"""
+        if "!" in address:
+            sheet_name, cell = address.rsplit("!", 1)
+            sheet_name = sheet_name.strip("'")
+        else:
+            sheet_name, cell = self.summary_sheet_name, address
+        if not cell.strip():
+            logger.warning(f"セル書込スキップ（セル番地なし）: {address}")
+            return
+        if sheet_name not in [sheet.name for sheet in workbook.sheets]:
+            logger.warning(f"セル書込スキップ（シートなし）: {address}")
+            return
+        workbook.sheets[sheet_name].range(cell).value = value
+        logger.info(f"セル書込完了: {address} = {value}")
+
+    def embed_formulas(self, workbook: xw.Book):
+        """集計シート関数埋込"""
+        # 動的関数埋込処理（手動計算中のため再計算は recalculate で1回のみ）
+        self._embed_dynamic_formulas(workbook)
+
+    def quit_app(self):
+        """Excelアプリケーション終了（エラー時の後始末、計算方式は終了前に復元）"""
+        if self.app:
+            self.restore_calculation()
+            try:
+                self.app.quit()
+            except Exception as e:
+                logger.warning(f"Excelアプリケーション終了エラー: {e}")
+            self.app = None
+
+    def _paste_csv_data(self, workbook: xw.Book, csv_data: pd.DataFrame, sheet_name: str = None):
+        """CSV貼付処理（CSVの列順序・列名をそのまま保持、既定は前日分CSV抽出シート）"""
+        sheet_name = sheet_name or self.csv_sheet_name
+        logger.info(f"CSV貼付処理開始: {sheet_name}")
 
         try:
             # 前日分CSV抽出シート取得・作成
-            if self.csv_sheet_name in [sheet.name for sheet in workbook.sheets]:
-                csv_sheet = workbook.sheets[self.csv_sheet_name]
+            if sheet_name in [sheet.name for sheet in workbook.sheets]:
+                csv_sheet = workbook.sheets[sheet_name]
                 # 既存データ完全クリア
                 csv_sheet.clear()
-            else:
-                csv_sheet = workbook.sheets.add(name=self.csv_sheet_name)
+            elif sheet_name == self.csv_sheet_name:
+                csv_sheet = workbook.sheets.add(name=sheet_name)
                 # シートを先頭に移動
                 csv_sheet.api.Move(Before=workbook.sheets[0].api)
+            else:
+                # 明細シートは末尾に追加
+                csv_sheet = workbook.sheets.add(name=sheet_name, after=workbook.sheets[-1])
 
-            # CSVデータをA1から正確に貼付
-            if not csv_data.empty:
+            # CSVデータをA1から正確に貼付（データ行0件でもヘッダーは貼付し、関数の列位置検出を可能にする）
+            if len(csv_data.columns) > 0:
                 logger.info(f"CSV貼付データ確認: {csv_data.shape[0]}行 × {csv_data.shape[1]}列")
                 logger.info(f"CSV列構成: {list(csv_data.columns)}")
 
                 # 重要な列の位置をログ出力
                 self._log_column_mapping(csv_data)
 
-                # ヘッダー行を1行目に貼付
-                header_row = list(csv_data.columns)
-                for col_idx, header in enumerate(header_row, 1):
-                    cell_address = f"{self._column_number_to_letter(col_idx)}1"
-                    csv_sheet.range(cell_address).value = str(header)
-                
-                logger.info(f"ヘッダー行貼付完了: A1:{self._column_number_to_letter(len(header_row))}1")
+                # ヘッダー行を1行目に貼付（1回の範囲代入）
+                header_row = [str(header) for header in csv_data.columns]
+                num_cols = len(header_row)
+                last_col = self._column_number_to_letter(num_cols)
+                csv_sheet.range(f"A1:{last_col}1").value = header_row
 
-                # データ行を2行目から貼付
-                data_values = csv_data.values.tolist()
-                num_rows = len(data_values)
-                num_cols = len(data_values[0]) if data_values else 0
+                logger.info(f"ヘッダー行貼付完了: A1:{last_col}1")
 
-                logger.info(f"データ貼付予定: {num_rows}行 × {num_cols}列（2行目から開始）")
+                # データ行を2行目から固定サイズのスラブ単位で貼付（全行のリスト化は行わない）
+                num_rows = len(csv_data)
+                logger.info(f"データ貼付予定: {num_rows}行 × {num_cols}列（2行目から開始、{self.paste_slab_rows}行単位）")
 
-                # データを確実に貼付
-                if num_rows > 0 and num_cols > 0:
-                    try:
-                        # 範囲指定して一括貼付
-                        start_cell = "A2"
-                        end_cell = f"{self._column_number_to_letter(num_cols)}{num_rows + 1}"
-                        paste_range = f"{start_cell}:{end_cell}"
-                        csv_sheet.range(paste_range).value = data_values
-                        logger.info(f"一括CSV貼付完了: {paste_range}")
-                    except Exception as bulk_error:
-                        logger.warning(f"一括貼付失敗、行ごと貼付に切替: {bulk_error}")
-                        
-                        # 行ごと貼付（フォールバック）
-                        for row_idx, row_data in enumerate(data_values, 2):
-                            try:
-                                row_range = f"A{row_idx}:{self._column_number_to_letter(len(row_data))}{row_idx}"
-                                csv_sheet.range(row_range).value = row_data
-                            except Exception as row_error:
-                                logger.warning(f"行{row_idx}貼付エラー: {row_error}")
+                failed_rows = 0
+                slab_count = 0
+                for offset, rows in self._iter_row_blocks(csv_data, self.paste_slab_rows):
+                    failed_rows += self._write_slab(csv_sheet, offset + 2, rows, last_col)
+                    slab_count += 1
+
+                logger.info(f"スラブ貼付完了: A2:{last_col}{num_rows + 1}（{slab_count}スラブ）")
+                if failed_rows > 0:
+                    logger.warning(f"貼付失敗行: {failed_rows}行")
 
                 # 貼付結果検証
-                self._verify_paste_result(csv_sheet, num_rows, num_cols)
+                self._verify_paste_result(csv_sheet, num_rows, header_row)
 
             else:
                 logger.warning("CSVデータが空のため貼付をスキップ")
@@ -134,6 +236,29 @@ class DataHandler:
             logger.error(f"CSV貼付エラー: {e}")
             raise
 
+    def _iter_row_blocks(self, csv_data: pd.DataFrame, block_rows: int):
+        """行ブロック単位のイテレータ（ブロックごとにカテゴリ列を文字列値へ復元）"""
+        for offset in range(0, len(csv_data), block_rows):
+            yield offset, csv_data.iloc[offset:offset + block_rows].values.tolist()
+
+    def _write_slab(self, sheet: xw.Sheet, first_row: int, rows: list, last_col: str) -> int:
+        """スラブ貼付（失敗時は二分割して失敗行を特定、失敗行数を返す）"""
+        last_row = first_row + len(rows) - 1
+        try:
+            sheet.range(f"A{first_row}:{last_col}{last_row}").value = rows
+            return 0
+        except Exception as slab_error:
+            if len(rows) == 1:
+                logger.warning(f"行{first_row}貼付エラー: {slab_error}")
+                return 1
+
+            logger.debug(f"スラブ貼付失敗、二分割して再試行: 行{first_row}-{last_row} ({slab_error})")
+            middle = len(rows) // 2
+            return (
+                self._write_slab(sheet, first_row, rows[:middle], last_col)
+                + self._write_slab(sheet, first_row + middle, rows[middle:], last_col)
+            )
+
     def _log_column_mapping(self, csv_data: pd.DataFrame):
         """列マッピング情報をログ出力"""
         logger.info("=== CSV列マッピング確認 ===")
@@ -143,21 +268,25 @@ class DataHandler:
             excel_col = self._column_number_to_letter(i + 1)
             logger.info(f"  {col_name} → {excel_col}列（{i+1}番目）")
 
-    def _verify_paste_result(self, sheet: xw.Sheet, num_rows: int, num_cols: int):
+    def _verify_paste_result(self, sheet: xw.Sheet, num_rows: int, header_row: list):
         """貼付結果検証"""
         logger.info("=== CSV貼付結果検証 ===")
         
         try:
             # ヘッダー確認（全列）
-            header_range = f"A1:{self._column_number_to_letter(num_cols)}1"
+            header_range = f"A1:{self._column_number_to_letter(len(header_row))}1"
             header_values = sheet.range(header_range).value
             if isinstance(header_values, list):
                 logger.info(f"ヘッダー確認: {header_values}")
             else:
                 logger.info(f"ヘッダー確認: {[header_values]}")
             
-            # データ確認（2-4行目の重要列）
-            important_cols = {'キャンペーン名': 'C', 'Imp': 'I', 'Click': 'J', 'CV': 'L', 'グロス': 'N', 'ネット': 'O'}
+            # データ確認（2-4行目の重要列、貼付したヘッダーから列位置を特定）
+            important_cols = {
+                col_name: self._column_number_to_letter(header_row.index(col_name) + 1)
+                for col_name in ['キャンペーン名', 'Imp', 'Click', 'CV', 'グロス', 'ネット']
+                if col_name in header_row
+            }
             
             if num_rows > 0:
                 for row in range(2, min(5, num_rows + 2)):  # 2-4行目
@@ -180,33 +309,56 @@ class DataHandler:
         logger.info("動的関数埋込開始")
 
         try:
+            # シート参照確認
+            csv_sheet_exists = self.csv_sheet_name in [sheet.name for sheet in workbook.sheets]
+            logger.info(f"CSV抽出シート存在確認: {csv_sheet_exists}")
+
+            # CSV列位置を動的に特定（完全修正版）
+            column_positions = self._detect_csv_column_positions(workbook)
+
             # 集計シート取得・作成
             if self.summary_sheet_name in [sheet.name for sheet in workbook.sheets]:
                 summary_sheet = workbook.sheets[self.summary_sheet_name]
+
+                # 関数配置が前回埋込時と同一の場合は埋込を省略
+                if self._formula_layout_unchanged(workbook, summary_sheet, column_positions):
+                    logger.info("関数配置に変更なし（フィンガープリント一致）のため関数埋込を省略")
+                    return
+
                 # B2:I100の範囲をクリア（A列は保持）
                 summary_sheet.range("B2:I100").clear_contents()
             else:
                 summary_sheet = workbook.sheets.add(name=self.summary_sheet_name)
+                # 新規シートは書式未設定
+                self.fingerprint.write(workbook, "format", None)
 
             # ヘッダー設定
             self._set_headers(summary_sheet)
 
-            # シート参照確認
-            csv_sheet_exists = self.csv_sheet_name in [sheet.name for sheet in workbook.sheets]
-            logger.info(f"CSV抽出シート存在確認: {csv_sheet_exists}")
-
-            # CSV列位置を動的に特定（完全修正版）
-            column_positions = self._detect_csv_column_positions(workbook)
-
             # 関数埋込（正確な列位置使用）
             self._embed_formulas_range(summary_sheet, column_positions)
 
+            # 埋込結果のフィンガープリント保存（次回実行時の比較用）
+            self.fingerprint.write(workbook, "formula", self._formula_fingerprint(summary_sheet, column_positions))
+
             logger.info("動的関数埋込完了")
 
         except Exception as e:
             logger.error(f"動的関数埋込エラー: {e}")
             raise
 
+    def _formula_layout_unchanged(self, workbook: xw.Book, summary_sheet: xw.Sheet, column_positions: dict) -> bool:
+        """関数配置の変更有無（保存済みフィンガープリントと現在の関数を比較）"""
+        stored = self.fingerprint.read(workbook).get("formula")
+        if not stored:
+            return False
+        return stored == self._formula_fingerprint(summary_sheet, column_positions)
+
+    def _formula_fingerprint(self, summary_sheet: xw.Sheet, column_positions: dict) -> str:
+        """関数配置フィンガープリント（B1:I最終行の関数を1回の一括読込で取得）"""
+        formulas = summary_sheet.range(f"B1:I{self.max_campaign_rows + 1}").formula
+        return self.fingerprint.digest(self.FORMULA_LAYOUT_VERSION, self.csv_sheet_name, column_positions, formulas)
+
     def _detect_csv_column_positions(self, workbook: xw.Book) -> dict:
         """CSV列位置動的検出（完全修正版 - 全範囲検索対応）"""
         logger.info("=== CSV列位置検出開始（全範囲検索修正版） ===")
@@ -492,11 +644,10 @@ class DataHandler:
         return result
 
     def save_workbook(self, workbook: xw.Book):
-        """ワークブック保存"""
+        """ワークブック保存（計算済みのため保存前の再計算なし）"""
         try:
-            # 最終計算実行
-            workbook.app.calculate()
-            time.sleep(2)  # 計算完了待機
+            # 手動計算のまま保存すると次回オープン時も手動計算になるため復元してから保存
+            self.restore_calculation()
 
             # 保存
             workbook.save()
@@ -508,5 +659,12 @@ class DataHandler:
             # アプリケーション終了
             if workbook:
                 workbook.close()
-            if self.app:
-                self.app.quit()
+            self.quit_app()
+
+    def close_workbook(self, workbook: xw.Book):
+        """ワークブックを保存せずに終了（ドライラン用）"""
+        try:
+            if workbook:
+                workbook.close()
+        finally:
+            self.quit_app()
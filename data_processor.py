@@ -5,17 +5,34 @@ fam8キャンペーンレポート自動集計システム - CSV読込・統合
 adult/general CSV統合・[total]行除外・エンコーディング自動判定（修正版）
 """
 
+import io
+import operator
+import re
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 from pathlib import Path
-import chardet
 from loguru import logger
 import time
 
+from csv_prescanner import CsvPrescanner
+from column_profiler import ColumnProfiler
+
 
 class DataProcessor:
     """CSVデータ処理クラス"""
 
-    def __init__(self, config: dict, target_date_str: str):
+    # 数値条件除外ルールの演算子
+    NUMERIC_OPERATORS = {
+        "<": operator.lt,
+        "<=": operator.le,
+        ">": operator.gt,
+        ">=": operator.ge,
+        "==": operator.eq,
+        "!=": operator.ne,
+    }
+
+    def __init__(self, config: dict, target_date_str: str, memory_guard=None):
         self.config = config
         self.target_date_str = target_date_str
         self.input_dir = Path(config["paths"]["input_dir"]) / target_date_str
@@ -27,6 +44,27 @@ class DataProcessor:
         self.chunk_size = config["csv_processing"]["chunk_size"]
         self.large_file_threshold = config["csv_processing"]["large_file_threshold"]
 
+        # カテゴリ型エンコード設定（低カーディナリティ列の辞書エンコード）
+        self.categorical_encoding = config["csv_processing"].get("categorical_encoding", True)
+        self.categorical_max_ratio = config["csv_processing"].get("categorical_max_ratio", 0.5)
+        self.numeric_columns = set(config["aggregation"]["sum_columns"]) | set(config["aggregation"]["calculated_columns"])
+
+        # バイト列事前走査（除外パターンを含む行を文字列化前に除去）
+        self.byte_prescan = config["csv_processing"].get("byte_prescan", True)
+
+        # 除外ルール（初期化時に1回だけコンパイル）
+        self.exclude_rule_definitions = self._exclude_rule_definitions()
+        self.exclude_rules = self._compile_exclude_rules()
+
+        # ソース別行数（統合データは adult → general 順）
+        self.source_row_counts = {}
+
+        # 統合データ列統計（統合時に算出）
+        self.column_profile = None
+
+        # メモリ監視（閾値接近時はチャンク読込・中間データのディスク退避に切替）
+        self.memory_guard = memory_guard
+
     def process(self) -> pd.DataFrame:
         """CSV統合処理メイン"""
         logger.info("CSV統合処理開始")
@@ -34,17 +72,61 @@ class DataProcessor:
         # adult CSV処理
         adult_data = self._process_single_csv("adult")
         logger.info(f"adult CSV処理完了: {len(adult_data)}行")
+        adult_rows = len(adult_data)
+
+        # メモリ逼迫時はgeneral処理中のピークを抑えるためadultをディスクへ一時退避
+        adult_spill = None
+        if self._memory_pressure():
+            adult_spill = self.memory_guard.spill(adult_data, f"{self.target_date_str}_adult")
+            del adult_data
 
         # general CSV処理
         general_data = self._process_single_csv("general")
         logger.info(f"general CSV処理完了: {len(general_data)}行")
 
+        if adult_spill:
+            adult_data = self.memory_guard.restore(adult_spill)
+
         # データ統合（adult → general順）
+        self.source_row_counts = {"adult": adult_rows, "general": len(general_data)}
         combined_data = self._combine_data(adult_data, general_data)
         logger.info(f"CSV統合完了: {len(combined_data)}行")
 
         return combined_data
 
+    def sample_csv(self, csv_file: Path, csv_type: str, max_bytes: int = 1024 * 1024) -> dict:
+        """先頭バイト列の抽出解析（除外ルール適用、全体行数は抽出部分の1行あたりバイト数から推定、処理コスト予測用）"""
+        file_size = csv_file.stat().st_size
+        with open(csv_file, "rb") as f:
+            raw = f.read(max_bytes)
+        whole_file = len(raw) >= file_size
+        if not whole_file:
+            # 途中で切れた最終行は除外
+            raw = raw[:raw.rfind(b"\n") + 1]
+
+        # 1-2行目（前置き行）とヘッダー行のバイト数
+        header_bytes = sum(len(line) + 1 for line in raw.split(b"\n", self.skip_rows)[:self.skip_rows])
+
+        encoding = self._detect_encoding(csv_file)
+        data = self._read_normal_csv(io.BytesIO(raw), encoding, skiprows=self.skip_rows - 1)
+        cleaned_data = self._clean_data(data, csv_type)
+
+        if whole_file or data.empty:
+            raw_rows = len(data)
+        else:
+            raw_rows = round((file_size - header_bytes) * len(data) / max(len(raw) - header_bytes, 1))
+        kept_ratio = len(cleaned_data) / len(data) if len(data) else 1.0
+
+        return {
+            "data": cleaned_data,
+            "bytes": file_size,
+            "encoding": encoding,
+            "sampled_rows": len(data),
+            "exact": whole_file,
+            "raw_rows": raw_rows,
+            "rows": round(raw_rows * kept_ratio),
+        }
+
     def _process_single_csv(self, csv_type: str) -> pd.DataFrame:
         """単一CSV処理"""
         start_time = time.time()
@@ -60,15 +142,26 @@ class DataProcessor:
         encoding = self._detect_encoding(csv_file)
         logger.info(f"{csv_type} CSV エンコーディング: {encoding}")
 
+        # バイト列事前走査（除外行は文字列化せず、残存範囲のみ解析に渡す）
+        prescan = self._prescan_csv(csv_file, encoding, csv_type)
+        source, skiprows = (prescan.open(), 0) if prescan else (csv_file, 2)
+
         # CSV読込（3行目をヘッダーとして読み込み、列順序・列名は変更しない）
-        if file_size > self.large_file_threshold:
-            # 大容量ファイル: チャンク読み込み
-            data = self._read_large_csv(csv_file, encoding)
-        else:
-            # 通常ファイル: 一括読み込み
-            data = self._read_normal_csv(csv_file, encoding)
+        try:
+            if file_size > self.large_file_threshold or self._memory_pressure():
+                # 大容量ファイル・メモリ逼迫時: チャンク読み込み
+                data = self._read_large_csv(source, encoding, skiprows)
+            else:
+                # 通常ファイル: 一括読み込み
+                data = self._read_normal_csv(source, encoding, skiprows)
+        finally:
+            if prescan:
+                prescan.close()
 
-        # データクリーニング（[total]行除去のみ）
+        # 低カーディナリティ列のカテゴリ型変換（読込直後に実施）
+        data = self._encode_categorical(data, csv_type)
+
+        # データクリーニング（除外ルール適用）
         cleaned_data = self._clean_data(data, csv_type)
 
         processing_time = time.time() - start_time
@@ -76,14 +169,38 @@ class DataProcessor:
 
         return cleaned_data
 
-    def _read_normal_csv(self, file_path: Path, encoding: str) -> pd.DataFrame:
-        """通常CSV読み込み（3行目をヘッダーとして読み込み）"""
+    def _memory_pressure(self) -> bool:
+        """メモリ逼迫判定（監視無効時は常にFalse）"""
+        return self.memory_guard is not None and self.memory_guard.under_pressure()
+
+    def _prescan_csv(self, csv_file: Path, encoding: str, csv_type: str):
+        """バイト列事前走査（無効・非対応時は None を返し通常読込）"""
+        if not self.byte_prescan or csv_file.stat().st_size == 0:
+            return None
+
+        # 1-2行目（前置き行）の後の3行目をヘッダーとして走査
+        prescan = CsvPrescanner(self.exclude_rule_definitions, skip_rows=self.skip_rows - 1).scan(csv_file, encoding)
+        if prescan is None:
+            logger.debug(f"{csv_type} CSV: 事前走査対象外のため通常読込")
+            return None
+
+        logger.info(
+            f"{csv_type} CSV 事前走査: データ{prescan.data_rows:,}行 / 除外{prescan.excluded_rows:,}行 "
+            f"({prescan.elapsed:.3f}秒)"
+        )
+        for label, hit_rows in prescan.rule_hits.items():
+            logger.info(f"{csv_type} CSV: {label}行を{hit_rows}行検出（事前走査）")
+
+        return prescan
+
+    def _read_normal_csv(self, source, encoding: str, skiprows: int = 2) -> pd.DataFrame:
+        """通常CSV読み込み（3行目をヘッダーとして読み込み、事前走査時はヘッダー行から始まるストリーム）"""
         try:
             # 3行目をヘッダーとして読み込み（skiprows=2で1-2行目をスキップ）
             data = pd.read_csv(
-                file_path,
+                source,
                 encoding=encoding,
-                skiprows=2,              # 1-2行目をスキップ、3行目がヘッダー
+                skiprows=skiprows,       # 1-2行目をスキップ、3行目がヘッダー
                 dtype=str,               # 全て文字列として読み込み
                 keep_default_na=False,   # NA値変換無効
                 na_filter=False,         # NA値フィルタ無効
@@ -123,37 +240,117 @@ class DataProcessor:
             else:
                 logger.info(f"    {col_name} → {excel_col}列（{i+1}番目）")
 
+    def _encode_categorical(self, data: pd.DataFrame, csv_type: str) -> pd.DataFrame:
+        """低カーディナリティ列のカテゴリ型変換（実測カーディナリティで判定、数値列は対象外）"""
+        if not self.categorical_encoding or data.empty:
+            return data
+
+        row_count = len(data)
+        memory_before = data.memory_usage(deep=True).sum()
+
+        # 重複率の高い文字列列のみ辞書エンコード（値はExcel貼付時にのみ文字列へ戻す）
+        target_dtypes = {}
+        for col in data.columns:
+            if col in self.numeric_columns or isinstance(data[col].dtype, pd.CategoricalDtype):
+                continue
+            distinct_count = data[col].nunique(dropna=False)
+            if distinct_count / row_count <= self.categorical_max_ratio:
+                target_dtypes[col] = "category"
+                logger.debug(f"{csv_type} CSV: {col}列をカテゴリ型に変換（{distinct_count:,}種 / {row_count:,}行）")
+
+        if not target_dtypes:
+            logger.info(f"{csv_type} CSV: カテゴリ型変換対象列なし")
+            return data
+
+        data = data.astype(target_dtypes)
+        memory_after = data.memory_usage(deep=True).sum()
+        logger.info(
+            f"{csv_type} CSV カテゴリ型変換: {len(target_dtypes)}列 {list(target_dtypes)} "
+            f"メモリ {memory_before / 1024 / 1024:.2f}MB → {memory_after / 1024 / 1024:.2f}MB"
+        )
+
+        return data
+
+    def _exclude_rule_definitions(self) -> list:
+        """除外ルール定義（exclude_patterns はキャンペーングループ列・キャンペーン名列への部分一致ルールとして展開）"""
+        rule_definitions = [
+            {"column": column, "type": "substring", "pattern": pattern}
+            for column in ['キャンペーングループ', 'キャンペーン名']
+            for pattern in self.exclude_patterns
+        ]
+        return rule_definitions + self.config["csv_processing"].get("exclude_rules", [])
+
+    def _compile_exclude_rules(self) -> list:
+        """除外ルールのコンパイル（exclude_patterns＋exclude_rules を1回だけ解釈）"""
+        compiled_rules = []
+        for rule in self.exclude_rule_definitions:
+            rule_type = rule.get("type", "substring")
+            column = rule["column"]
+            case = rule.get("case", False)
+
+            if rule_type == "substring":
+                pattern = str(rule["pattern"])
+                matcher = lambda s, p=pattern, c=case: s.str.contains(p, case=c, regex=False)
+                label = f"'{pattern}'を含む"
+            elif rule_type == "regex":
+                regex = re.compile(rule["pattern"], 0 if case else re.IGNORECASE)
+                matcher = lambda s, r=regex: s.str.contains(r, regex=True)
+                label = f"正規表現'{rule['pattern']}'に一致する"
+            elif rule_type == "exact":
+                value = str(rule["pattern"]).strip()
+                if case:
+                    matcher = lambda s, v=value: s.str.strip() == v
+                else:
+                    matcher = lambda s, v=value.lower(): s.str.strip().str.lower() == v
+                label = f"'{value}'と完全一致する"
+            elif rule_type == "numeric":
+                op = rule["op"]
+                if op not in self.NUMERIC_OPERATORS:
+                    raise ValueError(f"不正な数値条件演算子: {op}")
+                matcher = lambda s, f=self.NUMERIC_OPERATORS[op], v=float(rule["value"]): f(
+                    pd.to_numeric(s.str.replace(',', '', regex=False), errors='coerce'), v
+                )
+                label = f"数値条件'{op} {rule['value']}'に一致する"
+            else:
+                raise ValueError(f"不正な除外ルール種別: {rule_type}")
+
+            compiled_rules.append({"column": column, "label": label, "matcher": matcher})
+
+        logger.debug(f"除外ルールコンパイル完了: {len(compiled_rules)}件")
+        return compiled_rules
+
+    def _evaluate_exclude_rule(self, series: pd.Series, matcher) -> np.ndarray:
+        """除外ルール評価（カテゴリ列はカテゴリ単位で評価してコードで展開）"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = pd.Series(series.cat.categories.astype(str))
+            category_mask = matcher(categories).to_numpy(dtype=bool, na_value=False)
+            codes = series.cat.codes.to_numpy()
+            return np.where(codes >= 0, category_mask[codes], False)
+
+        return matcher(series.astype(str)).to_numpy(dtype=bool, na_value=False)
+
     def _clean_data(self, data: pd.DataFrame, csv_type: str) -> pd.DataFrame:
-        """データクリーニング（[total]行除去のみ）"""
+        """データクリーニング（除外ルールを単一マスクで一括適用）"""
         original_rows = len(data)
 
         # 空行除去
         data = data.dropna(how='all')
 
-        # [total]行除去（複数の列をチェック）
-        excluded_total = 0
-        
-        # キャンペーングループ列をチェック
-        if 'キャンペーングループ' in data.columns:
-            for pattern in self.exclude_patterns:
-                mask = data['キャンペーングループ'].astype(str).str.contains(pattern, na=False, case=False, regex=False)
-
-                excluded_rows = mask.sum()
-                if excluded_rows > 0:
-                    data = data[~mask]
-                    excluded_total += excluded_rows
-                    logger.info(f"{csv_type} CSV: キャンペーングループ列で'{pattern}'を含む行を{excluded_rows}行除外")
-
-        # キャンペーン名列もチェック
-        if 'キャンペーン名' in data.columns:
-            for pattern in self.exclude_patterns:
-                mask = data['キャンペーン名'].astype(str).str.contains(pattern, na=False, case=False, regex=False)
-
-                excluded_rows = mask.sum()
-                if excluded_rows > 0:
-                    data = data[~mask]
-                    excluded_total += excluded_rows
-                    logger.info(f"{csv_type} CSV: キャンペーン名列で'{pattern}'を含む行を{excluded_rows}行除外")
+        # 全除外ルールを1つのブールマスクに合成（フレームのコピーは最後の1回のみ）
+        exclude_mask = np.zeros(len(data), dtype=bool)
+        for rule in self.exclude_rules:
+            if rule["column"] not in data.columns:
+                continue
+
+            rule_mask = self._evaluate_exclude_rule(data[rule["column"]], rule["matcher"])
+            hit_rows = int(rule_mask.sum())
+            if hit_rows > 0:
+                logger.info(f"{csv_type} CSV: {rule['column']}列で{rule['label']}行を{hit_rows}行検出")
+            exclude_mask |= rule_mask
+
+        excluded_total = int(exclude_mask.sum())
+        if excluded_total > 0:
+            data = data[~exclude_mask]
 
         # インデックスリセット
         data = data.reset_index(drop=True)
@@ -203,6 +400,9 @@ class DataProcessor:
         logger.info(f"  adult: {adult_data.shape[0]}行 × {adult_data.shape[1]}列")
         logger.info(f"  general: {general_data.shape[0]}行 × {general_data.shape[1]}列")
 
+        # カテゴリ列のカテゴリ統合（concat後もカテゴリ型を維持するため）
+        adult_data, general_data = self._unify_categories(adult_data, general_data)
+
         # データ統合（adult → general順）
         combined_data = pd.concat([adult_data, general_data], ignore_index=True)
 
@@ -211,6 +411,29 @@ class DataProcessor:
 
         return combined_data
 
+    def _unify_categories(self, adult_data: pd.DataFrame, general_data: pd.DataFrame) -> tuple:
+        """adult/general間のカテゴリ統合（union categories）"""
+        unified_dtypes = {}
+        for col in adult_data.columns:
+            adult_is_category = isinstance(adult_data[col].dtype, pd.CategoricalDtype)
+            general_is_category = isinstance(general_data[col].dtype, pd.CategoricalDtype)
+            if not (adult_is_category or general_is_category):
+                continue
+
+            # 片側のみカテゴリ型の場合も両側をカテゴリ化して統合
+            union = union_categoricals(
+                [adult_data[col].astype("category"), general_data[col].astype("category")],
+                ignore_order=True
+            )
+            unified_dtypes[col] = pd.CategoricalDtype(union.categories)
+
+        if unified_dtypes:
+            adult_data = adult_data.astype(unified_dtypes)
+            general_data = general_data.astype(unified_dtypes)
+            logger.info(f"カテゴリ統合完了: {list(unified_dtypes)}")
+
+        return adult_data, general_data
+
     def _validate_combined_data(self, data: pd.DataFrame):
         """統合データ検証"""
 
@@ -219,6 +442,7 @@ class DataProcessor:
         logger.info(f"  総行数: {len(data):,}行")
         logger.info(f"  総列数: {len(data.columns)}列")
         logger.info(f"  最終列構成: {list(data.columns)}")
+        logger.info(f"  メモリ使用量: {data.memory_usage(deep=True).sum() / 1024 / 1024:.2f}MB")
 
         # データサンプル確認
         if not data.empty:
@@ -232,16 +456,10 @@ class DataProcessor:
                     sample_data[col] = data.iloc[i][col]
                 logger.info(f"  統合行{i+1}: {sample_data}")
 
-        # 空値チェック
-        total_cells = len(data) * len(data.columns)
-        empty_cells = data.isnull().sum().sum()
-        logger.info(f"  空値セル: {empty_cells:,}個 ({empty_cells/total_cells*100:.2f}%)")
-
-        # 重要列の値チェック
-        for col in ['Imp', 'Click', 'CV', 'グロス', 'ネット']:
-            if col in data.columns:
-                non_empty = data[col].astype(str).str.strip().ne('').sum()
-                logger.info(f"  {col}列の非空値: {non_empty}行")
+        # 列統計（非空件数・数値変換失敗件数・指標の最小/最大/合計・記述列の種類数を列ごとに1回の走査で算出）
+        profiler = ColumnProfiler(self.config)
+        self.column_profile = profiler.profile(data)
+        profiler.log_profile(self.column_profile, ['Imp', 'Click', 'CV', 'グロス', 'ネット'])
 
         logger.info("統合データ検証完了")
 
@@ -276,8 +494,10 @@ class DataProcessor:
         except UnicodeDecodeError:
             logger.debug("shift_jis読み込み失敗、自動判定に移行")
         
-        # 自動判定
+        # 自動判定（chardetはShift_JIS失敗時のみ読込）
         try:
+            import chardet
+
             with open(file_path, 'rb') as f:
                 raw_data = f.read(10240)  # 10KB読み取り
 
@@ -313,16 +533,16 @@ class DataProcessor:
         logger.warning("全てのエンコーディング試行が失敗、utf-8で強制読み込み")
         return "utf-8"
 
-    def _read_large_csv(self, file_path: Path, encoding: str) -> pd.DataFrame:
+    def _read_large_csv(self, source, encoding: str, skiprows: int = 2) -> pd.DataFrame:
         """大容量CSV読み込み（チャンク処理）"""
         logger.info("大容量ファイル検出、チャンク読み込み開始")
 
         chunks = []
         try:
             chunk_reader = pd.read_csv(
-                file_path,
+                source,
                 encoding=encoding,
-                skiprows=2,              # 3行目をヘッダーとして使用
+                skiprows=skiprows,       # 3行目をヘッダーとして使用
                 dtype=str,
                 keep_default_na=False,
                 na_filter=False,
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - Excel工程往復回数ベンチマーク
+擬似バックエンドで貼付→関数埋込→再計算→書式設定→保存を実行し、工程別のCOM往復回数と往復回数上限を検証
+"""
+
+import math
+import time
+from loguru import logger
+
+from fake_excel import CallCounter, FakeApp
+
+
+class ExcelBenchmark:
+    """Excel工程ベンチマーククラス"""
+
+    # 貼付工程の往復回数上限（範囲代入以外: シート取得・ヘッダー/先頭行の検証読込など、行数に依存しない分）
+    PASTE_OVERHEAD_CALLS = 60
+
+    def __init__(self, config: dict, target_date_str: str, latency: float = 0.0, sleep: bool = False):
+        self.config = config
+        self.target_date_str = target_date_str
+        self.latency = latency
+        self.sleep = sleep
+
+    def run(self, paste_data, detail_data=None, passes: int = 2, breakdowns=None) -> list:
+        """ベンチマーク実行（2回目以降は前回保存したブックを再度開く、breakdowns 指定時は集計軸別シートも貼付）"""
+        from data_handler import DataHandler
+        from format_manager import FormatManager
+
+        store = {}
+        results = []
+        for pass_number in range(1, passes + 1):
+            counter = CallCounter(self.latency, self.sleep)
+            handler = DataHandler(
+                self.config, self.target_date_str,
+                app_factory=lambda **options: FakeApp(counter=counter, store=store, **options)
+            )
+            stages = {}
+
+            def measure(stage_name, func):
+                snapshot = counter.snapshot()
+                start_time = time.perf_counter()
+                value = func()
+                stages[stage_name] = counter.since(snapshot)
+                stages[stage_name]["seconds"] = time.perf_counter() - start_time
+                return value
+
+            measure("launch_excel", handler.launch_app)
+            workbook = measure("open_workbook", handler.open_workbook)
+            measure("paste_csv_data", lambda: handler.paste(workbook, paste_data, detail_data))
+            if breakdowns is not None:
+                breakdown_sheet_name = self.config.get("breakdown", {}).get("sheet_name", "集計軸別シート")
+                measure("paste_breakdowns", lambda: handler.paste_breakdown(workbook, breakdowns, breakdown_sheet_name))
+            measure("embed_formulas", lambda: handler.embed_formulas(workbook))
+            measure("recalculate", lambda: handler.recalculate(workbook))
+            measure("apply_formatting", lambda: FormatManager(self.config).apply_formatting(workbook))
+            measure("save_workbook", lambda: handler.save_workbook(workbook))
+
+            results.append({
+                "pass": pass_number,
+                "stages": stages,
+                "calls": counter.calls,
+                "total_calls": counter.total_calls,
+                "modeled_seconds": counter.modeled_seconds,
+            })
+            logger.info(f"ベンチマーク{pass_number}回目: {counter.total_calls:,}往復 (見積 {counter.modeled_seconds:.2f}秒)")
+
+        return results
+
+    def check_budgets(self, results: list, paste_data, detail_data=None) -> list:
+        """往復回数上限の検証（違反内容の一覧、違反なしは空）"""
+        slab_rows = self.config["excel_structure"].get("paste_slab_rows", 5000)
+        pasted_frames = [frame for frame in (paste_data, detail_data) if frame is not None and not frame.empty]
+        # 範囲代入: ヘッダー1回＋スラブ数（行単位の書込は行わない）
+        value_set_budget = sum(1 + math.ceil(len(frame) / slab_rows) for frame in pasted_frames)
+
+        violations = []
+        for result in results:
+            label = f"{result['pass']}回目"
+            paste_calls = result["stages"]["paste_csv_data"]["calls"]
+
+            if paste_calls["range.value.set"] > value_set_budget:
+                violations.append(
+                    f"{label} 貼付の範囲代入 {paste_calls['range.value.set']}回 > 上限{value_set_budget}回"
+                )
+            paste_total = sum(paste_calls.values())
+            if paste_total > value_set_budget + self.PASTE_OVERHEAD_CALLS:
+                violations.append(
+                    f"{label} 貼付の往復 {paste_total}回 > 上限{value_set_budget + self.PASTE_OVERHEAD_CALLS}回"
+                )
+
+            if result["calls"]["app.calculate"] != 1:
+                violations.append(f"{label} 再計算 {result['calls']['app.calculate']}回（1回のみの想定）")
+
+            if result["pass"] > 1 and self.config["excel_structure"].get("skip_unchanged_layout", True):
+                embed_sets = result["stages"]["embed_formulas"]["calls"]["range.formula.set"]
+                if embed_sets:
+                    violations.append(f"{label} 配置変更なしで関数を再埋込 ({embed_sets}回)")
+                format_sets = result["stages"]["apply_formatting"]["calls"]["range.api.set"]
+                if format_sets:
+                    violations.append(f"{label} 書式変更なしで書式を再設定 ({format_sets}回)")
+
+        return violations
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - Excel擬似バックエンド
+DataHandler / FormatManager が使う xlwings の App/Book/Sheet/Range をメモリ上で再現し、COM往復回数を種別ごとに計数
+（Excel未導入環境での往復回数計測・処理時間の見積り用、関数の計算は行わない）
+"""
+
+import re
+import time
+from collections import Counter
+
+# セル番地（列・行のどちらかは省略可: "A1" / "A" / "1"）
+_ADDRESS_PATTERN = re.compile(r"^\$?([A-Z]*)\$?(\d*)$")
+
+# 列幅の既定値（Excel標準）
+_DEFAULT_COLUMN_WIDTH = 8.43
+
+
+class CallCounter:
+    """COM往復回数カウンタ（種別ごとの回数・書込セル数・擬似遅延による見積時間）"""
+
+    def __init__(self, latency=0.0, sleep: bool = False):
+        # latency: 1往復あたりの遅延秒（数値 or 種別ごとの辞書、辞書の "*" は既定値）
+        self.latency = latency
+        self.sleep = sleep
+        self.calls = Counter()
+        self.cells = Counter()
+        self.modeled_seconds = 0.0
+
+    def record(self, kind: str, cells: int = 0):
+        """往復1回を記録（sleep=True の場合は遅延を実際に待機）"""
+        self.calls[kind] += 1
+        if cells:
+            self.cells[kind] += cells
+
+        delay = self.latency_for(kind)
+        self.modeled_seconds += delay
+        if self.sleep and delay > 0:
+            time.sleep(delay)
+
+    def latency_for(self, kind: str) -> float:
+        if isinstance(self.latency, dict):
+            return self.latency.get(kind, self.latency.get("*", 0.0))
+        return self.latency
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def snapshot(self) -> dict:
+        """現時点の計数（工程間の差分計算用）"""
+        return {"calls": Counter(self.calls), "cells": Counter(self.cells), "modeled_seconds": self.modeled_seconds}
+
+    def since(self, snapshot: dict) -> dict:
+        """スナップショット以降の計数"""
+        return {
+            "calls": self.calls - snapshot["calls"],
+            "cells": self.cells - snapshot["cells"],
+            "modeled_seconds": self.modeled_seconds - snapshot["modeled_seconds"],
+        }
+
+
+class _FakeApi:
+    """.api 経由のCOM操作（属性取得・設定・呼出を全て1往復として記録、計数先は所有オブジェクトの現在のカウンタ）"""
+
+    def __init__(self, owner, path: str):
+        object.__setattr__(self, "_owner", owner)
+        object.__setattr__(self, "_path", path)
+
+    def __getattr__(self, name: str):
+        self._owner.counter.record(f"{self._path}.get")
+        return _FakeApi(self._owner, self._path)
+
+    def __setattr__(self, name: str, value):
+        self._owner.counter.record(f"{self._path}.set")
+
+    def __call__(self, *args, **kwargs):
+        self._owner.counter.record(f"{self._path}.call")
+        return _FakeApi(self._owner, self._path)
+
+
+class _FakeRangeApi(_FakeApi):
+    """Range.api（NumberFormat はセルごとに保持、読取は範囲内が同一書式ならその値・混在時は None）"""
+
+    def __init__(self, owner):
+        super().__init__(owner, "range.api")
+
+    def __getattr__(self, name: str):
+        if name != "NumberFormat":
+            return super().__getattr__(name)
+        self._owner.counter.record("range.api.get")
+        formats = {self._owner.sheet.number_formats.get(cell, "General") for cell in self._owner._cells()}
+        return formats.pop() if len(formats) == 1 else None
+
+    def __setattr__(self, name: str, value):
+        super().__setattr__(name, value)
+        if name == "NumberFormat":
+            for cell in self._owner._cells():
+                self._owner.sheet.number_formats[cell] = value
+
+
+class FakeApp:
+    """xlwings.App 相当（books.open はストア上のブックを返し、保存内容は同一ストアの次回オープンに引継ぐ）"""
+
+    def __init__(self, visible: bool = False, add_book: bool = False, counter: CallCounter = None, store: dict = None):
+        self.counter = counter or CallCounter()
+        self.store = store if store is not None else {}
+        self.books = _FakeBooks(self)
+        self._calculation = "automatic"
+        self._enable_events = True
+        self.display_alerts = True
+        self.screen_updating = True
+
+    def __setattr__(self, name: str, value):
+        if name in ("display_alerts", "screen_updating", "visible"):
+            self.counter.record(f"app.{name}.set")
+        object.__setattr__(self, name, value)
+
+    @property
+    def calculation(self) -> str:
+        self.counter.record("app.calculation.get")
+        return self._calculation
+
+    @calculation.setter
+    def calculation(self, value: str):
+        self.counter.record("app.calculation.set")
+        self._calculation = value
+
+    @property
+    def enable_events(self) -> bool:
+        self.counter.record("app.enable_events.get")
+        return self._enable_events
+
+    @enable_events.setter
+    def enable_events(self, value: bool):
+        self.counter.record("app.enable_events.set")
+        self._enable_events = value
+
+    def calculate(self):
+        self.counter.record("app.calculate")
+
+    def quit(self):
+        self.counter.record("app.quit")
+
+
+class _FakeBooks:
+    """App.books 相当"""
+
+    def __init__(self, app: FakeApp):
+        self.app = app
+
+    def open(self, fullname: str):
+        self.app.counter.record("books.open")
+        book = self.app.store.get(str(fullname))
+        if book is None:
+            book = FakeBook(str(fullname))
+            self.app.store[str(fullname)] = book
+        book.app = self.app
+        return book
+
+
+class FakeBook:
+    """xlwings.Book 相当（シート・名前定義をメモリ上に保持）"""
+
+    def __init__(self, fullname: str):
+        self.fullname = fullname
+        self.app = None
+        self._sheets = []
+        self._names = []
+        self.save_count = 0
+
+    @property
+    def counter(self) -> CallCounter:
+        return self.app.counter
+
+    @property
+    def sheets(self):
+        return _FakeSheets(self)
+
+    @property
+    def names(self):
+        return _FakeNames(self)
+
+    def save(self, path: str = None):
+        self.counter.record("book.save")
+        self.save_count += 1
+
+    def close(self):
+        self.counter.record("book.close")
+
+
+class _FakeSheets:
+    """Book.sheets 相当"""
+
+    def __init__(self, book: FakeBook):
+        self.book = book
+
+    def __iter__(self):
+        self.book.counter.record("sheets.iter")
+        return iter(list(self.book._sheets))
+
+    def __len__(self):
+        return len(self.book._sheets)
+
+    def __getitem__(self, key):
+        self.book.counter.record("sheets.get")
+        if isinstance(key, int):
+            return self.book._sheets[key]
+        for sheet in self.book._sheets:
+            if sheet._name == key:
+                return sheet
+        raise KeyError(key)
+
+    def add(self, name: str = None, before=None, after=None):
+        self.book.counter.record("sheets.add")
+        sheet = FakeSheet(self.book, name or f"Sheet{len(self.book._sheets) + 1}")
+        if after is not None:
+            self.book._sheets.insert(self.book._sheets.index(after) + 1, sheet)
+        elif before is not None:
+            self.book._sheets.insert(self.book._sheets.index(before), sheet)
+        else:
+            # xlwings の既定はアクティブシートの前（擬似的に先頭）
+            self.book._sheets.insert(0, sheet)
+        return sheet
+
+
+class _FakeNames:
+    """Book.names 相当"""
+
+    def __init__(self, book: FakeBook):
+        self.book = book
+
+    def __iter__(self):
+        self.book.counter.record("names.iter")
+        return iter(list(self.book._names))
+
+    def __len__(self):
+        return len(self.book._names)
+
+    def add(self, name: str, refers_to: str):
+        self.book.counter.record("names.add")
+        defined_name = _FakeName(self.book, name, refers_to)
+        self.book._names.append(defined_name)
+        return defined_name
+
+
+class _FakeName:
+    """名前定義"""
+
+    def __init__(self, book: FakeBook, name: str, refers_to: str):
+        self.book = book
+        self._name = name
+        self._refers_to = refers_to
+        self.api = _FakeApi(book, "name.api")
+
+    @property
+    def name(self) -> str:
+        self.book.counter.record("name.name.get")
+        return self._name
+
+    @property
+    def refers_to(self) -> str:
+        self.book.counter.record("name.refers_to.get")
+        return self._refers_to
+
+    def delete(self):
+        self.book.counter.record("name.delete")
+        self.book._names.remove(self)
+
+
+class FakeSheet:
+    """xlwings.Sheet 相当（値・関数・書式をセル番地ごとに保持）"""
+
+    def __init__(self, book: FakeBook, name: str):
+        self.book = book
+        self._name = name
+        self.values = {}
+        self.formulas = {}
+        self.formats = {}
+        self.number_formats = {}
+        self.column_widths = {}
+        self.api = _FakeApi(self, "sheet.api")
+
+    @property
+    def counter(self) -> CallCounter:
+        return self.book.counter
+
+    @property
+    def name(self) -> str:
+        self.counter.record("sheet.name.get")
+        return self._name
+
+    def range(self, address: str):
+        return FakeRange(self, address)
+
+    def clear(self):
+        self.counter.record("sheet.clear")
+        self.values.clear()
+        self.formulas.clear()
+        self.formats.clear()
+        self.number_formats.clear()
+
+    def clear_contents(self):
+        self.counter.record("sheet.clear_contents")
+        self.values.clear()
+        self.formulas.clear()
+
+
+class FakeRange:
+    """xlwings.Range 相当（範囲代入・一括読込は1往復、範囲内セル数を書込セル数として記録、複数範囲は "B2:C9,E2:E9"）"""
+
+    def __init__(self, sheet: FakeSheet, address: str):
+        self.sheet = sheet
+        self.address = address
+        self.areas = [self._parse(area) for area in address.split(",")]
+        self.first_row, self.first_col, self.last_row, self.last_col = self.areas[0]
+        self.api = _FakeRangeApi(self)
+
+    @property
+    def counter(self) -> CallCounter:
+        return self.sheet.counter
+
+    @staticmethod
+    def _parse(address: str) -> tuple:
+        """番地 → (先頭行, 先頭列, 最終行, 最終列)（列全体・行全体指定時は行・列が None）"""
+        start, _, end = address.upper().partition(":")
+        bounds = []
+        for part in (start, end or start):
+            match = _ADDRESS_PATTERN.match(part)
+            if not match:
+                raise ValueError(f"不正なセル番地: {address}")
+            letters, digits = match.groups()
+            column = 0
+            for letter in letters:
+                column = column * 26 + (ord(letter) - 64)
+            bounds.append((int(digits) if digits else None, column or None))
+        (first_row, first_col), (last_row, last_col) = bounds
+        return first_row, first_col, last_row, last_col
+
+    @property
+    def shape(self) -> tuple:
+        return self.last_row - self.first_row + 1, self.last_col - self.first_col + 1
+
+    def _cells(self):
+        for first_row, first_col, last_row, last_col in self.areas:
+            for row in range(first_row, last_row + 1):
+                for col in range(first_col, last_col + 1):
+                    yield row, col
+
+    def _grid(self, cell_map: dict, empty):
+        rows, cols = self.shape
+        return [
+            [cell_map.get((self.first_row + row_offset, self.first_col + col_offset), empty) for col_offset in range(cols)]
+            for row_offset in range(rows)
+        ]
+
+    def _assign(self, cell_map: dict, other_map: dict, value, kind: str):
+        """範囲代入（2次元リストは行単位、1次元リストは横方向、スカラーは範囲全体に展開）"""
+        if isinstance(value, (list, tuple)) and value and isinstance(value[0], (list, tuple)):
+            rows = value
+        elif isinstance(value, (list, tuple)):
+            rows = [value]
+        else:
+            rows = [[value] * self.shape[1]] * self.shape[0]
+
+        written = 0
+        for row_offset, row_values in enumerate(rows):
+            for col_offset, cell_value in enumerate(row_values):
+                cell = (self.first_row + row_offset, self.first_col + col_offset)
+                other_map.pop(cell, None)
+                if cell_value is None or cell_value == "":
+                    cell_map.pop(cell, None)
+                else:
+                    cell_map[cell] = cell_value
+                written += 1
+        self.sheet.counter.record(kind, cells=written)
+
+    @property
+    def value(self):
+        """単一セルはスカラー、1行・1列は1次元リスト、それ以外は2次元リスト（xlwings 既定と同じ）"""
+        self.sheet.counter.record("range.value.get", cells=self.shape[0] * self.shape[1])
+        grid = self._grid(self.sheet.values, None)
+        rows, cols = self.shape
+        if rows == 1 and cols == 1:
+            return grid[0][0]
+        if rows == 1:
+            return grid[0]
+        if cols == 1:
+            return [row[0] for row in grid]
+        return grid
+
+    @value.setter
+    def value(self, value):
+        self._assign(self.sheet.values, self.sheet.formulas, value, "range.value.set")
+
+    @property
+    def formula(self):
+        """単一セルは文字列、複数セルはタプルのタプル（未入力セルは空文字）"""
+        self.sheet.counter.record("range.formula.get", cells=self.shape[0] * self.shape[1])
+        grid = self._grid({**self.sheet.values, **self.sheet.formulas}, "")
+        if self.shape == (1, 1):
+            return grid[0][0]
+        return tuple(tuple(row) for row in grid)
+
+    @formula.setter
+    def formula(self, value):
+        self._assign(self.sheet.formulas, self.sheet.values, value, "range.formula.set")
+
+    def clear_contents(self):
+        self.sheet.counter.record("range.clear_contents")
+        for cell in list(self._cells()):
+            self.sheet.values.pop(cell, None)
+            self.sheet.formulas.pop(cell, None)
+
+    @property
+    def color(self):
+        self.sheet.counter.record("range.color.get")
+        return self.sheet.formats.get((self.address, "color"))
+
+    @color.setter
+    def color(self, value):
+        self.sheet.counter.record("range.color.set")
+        self.sheet.formats[(self.address, "color")] = value
+
+    def autofit(self):
+        self.sheet.counter.record("range.autofit")
+
+    @property
+    def column_width(self) -> float:
+        self.sheet.counter.record("range.column_width.get")
+        return self.sheet.column_widths.get(self.first_col, _DEFAULT_COLUMN_WIDTH)
+
+    @column_width.setter
+    def column_width(self, value: float):
+        self.sheet.counter.record("range.column_width.set")
+        for column in range(self.first_col, self.last_col + 1):
+            self.sheet.column_widths[column] = value
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - ファイル配布
+複数配布先への並列・アトミック配布（ハッシュ比較による同一内容スキップ・コピー後検証）
+"""
+
+import os
+import shutil
+import hashlib
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+
+class FileDistributor:
+    """ファイル配布クラス"""
+
+    # ハッシュ計算時の読込単位
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, config: dict, target_date_str: str):
+        self.config = config
+        self.target_date_str = target_date_str
+
+        # 配布先（未設定時は output_dir/{date} のみ）
+        distribution = config.get("distribution", {})
+        self.target_dirs = distribution.get("targets") or [str(Path(config["paths"]["output_dir"]) / "{date}")]
+        self.max_workers = distribution.get("max_workers", 4)
+
+    def distribute(self, source_file: Path, output_filename: str) -> list:
+        """全配布先へ並列配布（1件でも失敗した場合は例外送出）"""
+        source_hash = self._file_hash(source_file)
+        source_size = source_file.stat().st_size
+        logger.info(f"配布元: {source_file} ({source_size:,} bytes, sha256={source_hash[:12]})")
+
+        destinations = [
+            Path(target_dir.format(date=self.target_date_str)) / output_filename
+            for target_dir in self.target_dirs
+        ]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(destinations))) as executor:
+            futures = [
+                executor.submit(self._distribute_one, source_file, destination, source_hash, source_size)
+                for destination in destinations
+            ]
+
+        results = []
+        errors = []
+        for destination, future in zip(destinations, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"配布失敗: {destination} ({e})")
+                errors.append(destination)
+
+        if errors:
+            raise RuntimeError(f"ファイル配布失敗: {len(errors)}/{len(destinations)}件")
+
+        return results
+
+    def _distribute_one(self, source_file: Path, destination: Path, source_hash: str, source_size: int) -> dict:
+        """単一配布先への配布（一時ファイルへコピー→検証→リネーム）"""
+        start_time = time.perf_counter()
+        destination.parent.mkdir(parents=True, exist_ok=True)
+
+        # 同一内容が配布済みの場合はスキップ
+        if destination.exists() and destination.stat().st_size == source_size \
+                and self._file_hash(destination) == source_hash:
+            elapsed = time.perf_counter() - start_time
+            logger.info(f"  配布スキップ（同一内容）: {destination} ({elapsed:.2f}秒)")
+            return {"destination": str(destination), "status": "skipped", "bytes": 0, "seconds": elapsed}
+
+        temp_file = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+        try:
+            shutil.copy2(source_file, temp_file)
+
+            # コピー後ハッシュ検証
+            copied_hash = self._file_hash(temp_file)
+            if copied_hash != source_hash:
+                raise IOError(f"コピー後ハッシュ不一致: {copied_hash[:12]} != {source_hash[:12]}")
+
+            # 読み手が書込途中のファイルを開かないようリネームで置換
+            os.replace(temp_file, destination)
+        finally:
+            if temp_file.exists():
+                temp_file.unlink()
+
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"  配布完了: {destination} ({source_size:,} bytes, {elapsed:.2f}秒)")
+        return {"destination": str(destination), "status": "copied", "bytes": source_size, "seconds": elapsed}
+
+    def _file_hash(self, file_path: Path) -> str:
+        """SHA-256ハッシュ計算"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -8,9 +8,14 @@ CTR/CVR右寄せ・ヘッダーグレー・グリッド線・数値フォーマ
 import xlwings as xw
 from loguru import logger
 
+from workbook_fingerprint import WorkbookFingerprint
+
 
 class FormatManager:
     """Excel書式設定クラス"""
+
+    # 書式設定の版（書式設定処理の変更時に更新し、次回実行で再設定させる）
+    FORMAT_VERSION = 1
     
     def __init__(self, config: dict):
         self.config = config
@@ -24,6 +29,9 @@ class FormatManager:
         self.currency_format = config["excel_formatting"]["currency_format"]
         self.number_format = config["excel_formatting"]["number_format"]
         self.header_background_color = tuple(config["excel_formatting"]["header_background_color"])
+
+        # 書式設定フィンガープリント（一致時は書式設定を省略）
+        self.fingerprint = WorkbookFingerprint(config)
     
     def apply_formatting(self, workbook: xw.Book):
         """書式設定メイン処理"""
@@ -32,9 +40,18 @@ class FormatManager:
         try:
             # 集計シート取得
             summary_sheet = workbook.sheets[self.summary_sheet_name]
-            
-            # 計算実行（書式設定前に数値を確定）
-            workbook.app.calculate()
+
+            # グリッド線の範囲（検索キー入力行に依存するためフィンガープリントに含める）
+            data_range = self._get_data_range(summary_sheet)
+
+            # 書式設定・グリッド線範囲が前回と同一かつ実際の表示形式が維持されている場合は値に依存する列幅調整のみ実行
+            format_fingerprint = self.fingerprint.digest(
+                self.FORMAT_VERSION, self.config["excel_formatting"], self.max_campaign_rows, data_range
+            )
+            if self.fingerprint.matches(workbook, "format", format_fingerprint) and self._number_formats_intact(summary_sheet):
+                logger.info("書式設定に変更なし（フィンガープリント一致）のため列幅調整のみ実行")
+                self._auto_adjust_columns(summary_sheet)
+                return
             
             # ヘッダー書式設定
             self._format_headers(summary_sheet)
@@ -52,10 +69,10 @@ class FormatManager:
             self._auto_adjust_columns(summary_sheet)
             
             # グリッド線設定
-            self._apply_grid_lines(summary_sheet)
-            
-            # 最終計算実行
-            workbook.app.calculate()
+            self._apply_grid_lines(summary_sheet, data_range)
+
+            # 書式設定フィンガープリント保存（次回実行時の比較用）
+            self.fingerprint.write(workbook, "format", format_fingerprint)
             
             logger.info("Excel書式設定完了")
             
@@ -205,13 +222,26 @@ class FormatManager:
             logger.error(f"列幅自動調整エラー: {e}")
             raise
     
-    def _apply_grid_lines(self, sheet: xw.Sheet):
+    def _number_formats_intact(self, sheet: xw.Sheet) -> bool:
+        """数値列・通貨列の表示形式が設定値のまま維持されているか（範囲ごとに一括読取、混在時は None）"""
+        try:
+            last_row = self.max_campaign_rows + 1
+            number_range = f"B2:C{last_row},E2:E{last_row},G2:H{last_row}"
+            if sheet.range(number_range).api.NumberFormat != self.number_format:
+                return False
+            return sheet.range(f"I2:I{last_row}").api.NumberFormat == self.currency_format
+        except Exception as e:
+            logger.warning(f"表示形式読取エラー（書式を再設定）: {e}")
+            return False
+
+    def _apply_grid_lines(self, sheet: xw.Sheet, data_range: str = None):
         """グリッド線設定"""
         logger.info("グリッド線設定開始")
         
         try:
             # データ範囲特定
-            data_range = self._get_data_range(sheet)
+            if data_range is None:
+                data_range = self._get_data_range(sheet)
             
             if data_range:
                 try:
@@ -249,15 +279,14 @@ class FormatManager:
     def _get_data_range(self, sheet: xw.Sheet) -> str:
         """データ範囲特定"""
         try:
-            # A列の最終行を検索（キャンペーン名が入っている行まで）
+            # A列の最終行を検索（キャンペーン名が入っている行まで、一括読込）
             last_row = 1
-            for row in range(2, self.max_campaign_rows + 2):
-                try:
-                    cell_value = sheet.range(f"A{row}").value
-                    if cell_value and str(cell_value).strip():
-                        last_row = row
-                except:
-                    break
+            column_values = sheet.range(f"A2:A{self.max_campaign_rows + 1}").value
+            if not isinstance(column_values, list):
+                column_values = [column_values]
+            for offset, cell_value in enumerate(column_values):
+                if cell_value and str(cell_value).strip():
+                    last_row = offset + 2
             
             if last_row > 1:
                 return f"A1:I{last_row}"
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 日次キャンペーン集計履歴（SQLite）
+キャンペーン名×ソース×日付単位の指標合算を蓄積・検索
+"""
+
+import sqlite3
+from pathlib import Path
+from datetime import datetime
+from loguru import logger
+
+
+class HistoryStore:
+    """日次キャンペーン集計履歴クラス"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS daily_campaign (
+            campaign    TEXT    NOT NULL,
+            report_date TEXT    NOT NULL,
+            source      TEXT    NOT NULL,
+            imp         INTEGER NOT NULL,
+            click       INTEGER NOT NULL,
+            cv          INTEGER NOT NULL,
+            gross       REAL    NOT NULL,
+            net         REAL    NOT NULL,
+            PRIMARY KEY (campaign, report_date, source)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_daily_campaign_date ON daily_campaign (report_date);
+
+        CREATE TABLE IF NOT EXISTS ingested_days (
+            report_date    TEXT PRIMARY KEY,
+            campaign_count INTEGER NOT NULL,
+            ingested_at    TEXT    NOT NULL
+        );
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.db_path = Path(config.get("history", {}).get("db_path", "history/campaign_history.sqlite3"))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.connection = sqlite3.connect(str(self.db_path))
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        """DB接続終了"""
+        self.connection.close()
+
+    def upsert_daily(self, report_date: str, aggregated) -> int:
+        """日次集計登録（同日分は置換、aggregated は CampaignAggregator.aggregate の結果）"""
+        records = [
+            (row[1], report_date, row[0], int(row[2]), int(row[3]), int(row[4]), float(row[5]), float(row[6]))
+            for row in aggregated[['source', 'キャンペーン名', 'Imp', 'Click', 'CV', 'グロス', 'ネット']].itertuples(index=False)
+        ]
+
+        with self.connection:
+            self.connection.execute("DELETE FROM daily_campaign WHERE report_date = ?", (report_date,))
+            self.connection.executemany(
+                "INSERT INTO daily_campaign (campaign, report_date, source, imp, click, cv, gross, net) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            self.connection.execute(
+                "INSERT INTO ingested_days (report_date, campaign_count, ingested_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(report_date) DO UPDATE SET "
+                "campaign_count = excluded.campaign_count, ingested_at = excluded.ingested_at",
+                (report_date, len(records), datetime.now().isoformat(timespec="seconds"))
+            )
+
+        logger.info(f"履歴DB登録完了: {report_date} {len(records):,}件 → {self.db_path}")
+        return len(records)
+
+    def ingested_dates(self) -> set:
+        """登録済み日付一覧"""
+        rows = self.connection.execute("SELECT report_date FROM ingested_days").fetchall()
+        return {row[0] for row in rows}
+
+    def query(self, campaign: str = None, exact: bool = False, date_from: str = None,
+              date_to: str = None, source: str = None, by_source: bool = False) -> list:
+        """履歴検索（キャンペーン名の完全一致／部分一致・期間・ソース指定）"""
+        conditions = []
+        params = []
+
+        if campaign:
+            if exact:
+                conditions.append("campaign = ?")
+                params.append(campaign)
+            else:
+                escaped = campaign.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                conditions.append("campaign LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+        if date_from:
+            conditions.append("report_date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("report_date <= ?")
+            params.append(date_to)
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        group_columns = "report_date, source, campaign" if by_source else "report_date, campaign"
+        select_source = "source" if by_source else "'all'"
+
+        sql = (
+            f"SELECT report_date, {select_source}, campaign, "
+            f"SUM(imp), SUM(click), SUM(cv), SUM(gross), SUM(net) "
+            f"FROM daily_campaign {where_clause} "
+            f"GROUP BY {group_columns} ORDER BY campaign, report_date"
+        )
+        return self.connection.execute(sql, params).fetchall()
+
+    def window_totals(self, date_from: str, date_to: str):
+        """期間内のキャンペーン名単位合算（全ソース合計）"""
+        import pandas as pd
+
+        rows = self.connection.execute(
+            "SELECT campaign, SUM(imp), SUM(click), SUM(cv), SUM(gross), SUM(net) "
+            "FROM daily_campaign WHERE report_date BETWEEN ? AND ? GROUP BY campaign",
+            (date_from, date_to)
+        ).fetchall()
+        return pd.DataFrame(rows, columns=['キャンペーン名', 'Imp', 'Click', 'CV', 'グロス', 'ネット'])
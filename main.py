@@ -8,9 +8,19 @@ fam8キャンペーンレポート自動集計システム - メインエント
   python main.py                    # 前日分を自動処理
   python main.py --date 20250615    # 指定日処理
   python main.py --debug            # デバッグモード
+  python main.py --profile cprofile  # 工程別プロファイル（sampling も指定可、[system].dry_run と併用可）
+  python main.py --date 20250615 --resume  # 前回失敗時の完了済み工程から再開
+  python main.py --window mtd       # 月初来の期間集計（7d / 30d も指定可）
+  python main.py --date 20250615 --explain  # 処理コスト予測（実行・ファイル作成なし）
+  python main.py check --date 20250615  # 事前チェック（設定・入力・パスのみ、pandas/Excel不使用）
+  python main.py history --campaign キー --from 20250501 --to 20250531  # 日次集計履歴検索
+  python main.py history-import     # 既存入力フォルダから履歴DBへ一括登録
+  python main.py excel-bench --date 20250615 --latency 1  # Excel工程の往復回数計測（擬似バックエンド）
+  python main.py perf-report --days 30  # 処理性能推移・悪化工程の表示
 """
 
 import sys
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
 import typer
@@ -19,26 +29,250 @@ from loguru import logger
 # プロジェクトルートをPythonパスに追加
 sys.path.insert(0, str(Path(__file__).parent))
 
-from orchestrator import CampaignReportOrchestrator
+# orchestrator は各コマンド内で遅延import（--help 等で重いモジュールを読み込まない）
 
 app = typer.Typer(help="fam8キャンペーンレポート自動集計システム")
 
-@app.command()
+@app.callback(invoke_without_command=True)
 def main(
+    ctx: typer.Context,
     date: str = typer.Option(
-        None, 
-        "--date", 
+        None,
+        "--date",
         help="処理対象日 (YYYYMMDD形式, 未指定時は前日)"
     ),
     debug: bool = typer.Option(
-        False, 
-        "--debug", 
+        False,
+        "--debug",
         help="デバッグモード"
+    ),
+    window: str = typer.Option(
+        None,
+        "--window",
+        help="期間集計 (mtd: 月初来 / 7d / 30d: 対象日を含む直近N日)"
+    ),
+    profile: str = typer.Option(
+        None,
+        "--profile",
+        help="工程別プロファイル (cprofile / sampling、結果は log/{date}/profile)"
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="前回失敗時のチェックポイントから再開（入力CSV・設定が変更されていれば最初から実行）"
+    ),
+    explain: bool = typer.Option(
+        False,
+        "--explain",
+        help="実行せずに処理コスト（Excel往復回数・関数セル数・再計算走査セル数・ピークメモリ・処理時間）を予測"
     )
 ):
     """fam8キャンペーンレポート自動集計処理を実行"""
-    orchestrator = CampaignReportOrchestrator(debug_mode=debug)
-    orchestrator.execute(target_date=date)
+    if ctx.invoked_subcommand is not None:
+        return
+
+    from orchestrator import CampaignReportOrchestrator
+
+    orchestrator = CampaignReportOrchestrator(debug_mode=debug, profile_mode=profile, resume=resume)
+    if explain:
+        _print_explain(orchestrator, date)
+    elif window:
+        orchestrator.execute_window(target_date=date, window=window)
+    else:
+        orchestrator.execute(target_date=date)
+
+def _print_explain(orchestrator, date: str):
+    """処理コスト予測の表示（ファイル作成なし）"""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    estimate = orchestrator.explain(target_date=date)
+
+    typer.echo(f"処理コスト予測: {estimate['target_date']}（実行なし・ファイル作成なし）")
+    typer.echo("入力\tサイズMB\t推定行数\t除外後\t文字コード\t算出方法")
+    for input_estimate in estimate["inputs"]:
+        method = "全行解析" if input_estimate["exact"] else f"先頭{input_estimate['sampled_rows']:,}行から推定"
+        typer.echo(
+            f"{input_estimate['source']}\t{input_estimate['bytes'] / 1024 / 1024:.1f}\t{input_estimate['raw_rows']:,}"
+            f"\t{input_estimate['rows']:,}\t{input_estimate['encoding']}\t{method}"
+        )
+    for missing_input in estimate["missing_inputs"]:
+        typer.echo(f"[NG] 入力CSVなし: {missing_input}")
+
+    options = estimate["options"]
+    typer.echo(
+        f"設定: 貼付={options['paste_mode']} 絞込貼付={options['paste_filter']} スラブ={options['paste_slab_rows']:,}行"
+        f" 関数配置省略={options['skip_unchanged_layout']} 事前走査={options['byte_prescan']} 工程並行={options['stage_workers']}"
+    )
+    filter_note = f"（一致率 {estimate['filter_ratio']:.1%}）" if estimate["filter_ratio"] is not None else ""
+    typer.echo(f"検索キー: {estimate['keys']}件 / 統合行数: {estimate['rows']:,}行 / 貼付行数: {estimate['paste_rows']:,}行{filter_note}")
+    if estimate["detail_rows"]:
+        typer.echo(f"明細シート貼付: {estimate['detail_rows']:,}行")
+
+    layout_note = "省略（前回の関数配置あり）" if estimate["layout_skipped"] else "実行"
+    typer.echo(f"Excel往復: {estimate['com_calls']:,}回（見積 {estimate['com_seconds']:.2f}秒）/ 関数埋込・書式設定: {layout_note}")
+    typer.echo(f"関数セル書込: {estimate['formula_cells']:,}セル（集計シート関数 {estimate['recalc_formula_cells']:,}セル）")
+    typer.echo(f"再計算1回あたりの走査セル数: {estimate['scan_cells']:,}")
+
+    if estimate["history_runs"]:
+        source_note = "同一設定" if estimate["history_same_options"] else "設定の異なる実行を含む"
+        typer.echo(f"ピークメモリ: {estimate['peak_rss'] / 1024 / 1024:,.0f}MB / 処理時間: {estimate['wall_seconds']:.1f}秒"
+                   f"（処理性能履歴 {estimate['history_runs']}件で補正、{source_note}）")
+        typer.echo("工程\t予測秒")
+        for stage_name, seconds in estimate["stage_seconds"].items():
+            typer.echo(f"{stage_name}\t{seconds:.2f}")
+    else:
+        typer.echo(f"ピークメモリ: {estimate['peak_rss'] / 1024 / 1024:,.0f}MB（概算）/ 処理時間: -（処理性能履歴なし、1回実行後に予測可能）")
+
+@app.command()
+def check(
+    date: str = typer.Option(None, "--date", help="処理対象日 (YYYYMMDD形式, 未指定時は前日)")
+):
+    """事前チェック（設定・入力CSV・パスのみ検証、pandas/Excel不使用）"""
+    start_time = time.perf_counter()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    from orchestrator import CampaignReportOrchestrator
+
+    problems = CampaignReportOrchestrator().preflight(target_date=date)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+    for problem in problems:
+        typer.echo(f"[NG] {problem}")
+    if problems:
+        typer.echo(f"事前チェック失敗: {len(problems)}件 ({elapsed_ms:.1f}ms)")
+        raise typer.Exit(code=1)
+
+    typer.echo(f"[OK] 事前チェック完了 ({elapsed_ms:.1f}ms)")
+
+@app.command()
+def history(
+    campaign: str = typer.Option(None, "--campaign", "-c", help="キャンペーン名（既定は部分一致）"),
+    exact: bool = typer.Option(False, "--exact", help="キャンペーン名を完全一致で検索"),
+    date_from: str = typer.Option(None, "--from", help="開始日 (YYYYMMDD形式)"),
+    date_to: str = typer.Option(None, "--to", help="終了日 (YYYYMMDD形式)"),
+    source: str = typer.Option(None, "--source", help="ソース絞込 (adult/general)"),
+    by_source: bool = typer.Option(False, "--by-source", help="ソース別に表示")
+):
+    """日次キャンペーン集計履歴を検索"""
+    start_time = time.perf_counter()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    from orchestrator import CampaignReportOrchestrator
+
+    orchestrator = CampaignReportOrchestrator()
+    rows = orchestrator.show_history(
+        campaign=campaign, exact=exact, date_from=date_from,
+        date_to=date_to, source=source, by_source=by_source
+    )
+
+    typer.echo("日付\tソース\tキャンペーン名\tImp\tClick\tCTR\tCV\tCVR\tグロス\tネット")
+    for report_date, row_source, name, imp, click, cv, gross, net in rows:
+        ctr = f"{click / imp * 100:.2f}%" if imp else ""
+        cvr = f"{cv / click * 100:.2f}%" if click else ""
+        typer.echo(f"{report_date}\t{row_source}\t{name}\t{imp:,}\t{click:,}\t{ctr}\t{cv:,}\t{cvr}\t{gross:,.0f}\t{net:,.0f}")
+
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    typer.echo(f"{len(rows):,}件 ({elapsed_ms:.1f}ms)")
+
+@app.command("history-import")
+def history_import(
+    date_from: str = typer.Option(None, "--from", help="開始日 (YYYYMMDD形式)"),
+    date_to: str = typer.Option(None, "--to", help="終了日 (YYYYMMDD形式)"),
+    force: bool = typer.Option(False, "--force", help="登録済み日付も再登録")
+):
+    """既存入力フォルダ（YYYYMMDD）から日次集計履歴を一括登録"""
+    # 日別CSV処理の詳細ログは抑制し、一括登録の進捗のみ表示
+    logger.remove()
+    logger.add(sys.stdout, level="INFO", filter={"": "INFO", "data_processor": "WARNING", "campaign_aggregator": "WARNING"})
+
+    from orchestrator import CampaignReportOrchestrator
+
+    orchestrator = CampaignReportOrchestrator()
+    orchestrator.import_history(date_from=date_from, date_to=date_to, force=force)
+
+@app.command("excel-bench")
+def excel_bench(
+    date: str = typer.Option(None, "--date", help="処理対象日 (YYYYMMDD形式, 未指定時は前日)"),
+    latency: float = typer.Option(0.0, "--latency", help="1往復あたりの擬似遅延（ミリ秒、見積時間の算出に使用）"),
+    passes: int = typer.Option(2, "--passes", help="実行回数（2回目以降は前回保存したブックを再度開く）"),
+    sleep: bool = typer.Option(False, "--sleep", help="擬似遅延を実際に待機")
+):
+    """Excel工程の往復回数ベンチマーク（擬似バックエンド使用、Excel不要）"""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    from orchestrator import CampaignReportOrchestrator
+
+    try:
+        results, violations = CampaignReportOrchestrator().bench_excel(
+            target_date=date, latency=latency / 1000, passes=passes, sleep=sleep
+        )
+    except FileNotFoundError as e:
+        typer.echo(f"[NG] {e}")
+        raise typer.Exit(code=1)
+
+    for result in results:
+        typer.echo(f"[{result['pass']}回目] 往復{result['total_calls']:,}回 / 見積{result['modeled_seconds']:.2f}秒")
+        typer.echo("工程\t往復\t書込セル\t見積秒\t実測秒")
+        for stage_name, stage in result["stages"].items():
+            typer.echo(
+                f"{stage_name}\t{sum(stage['calls'].values()):,}\t{sum(stage['cells'].values()):,}"
+                f"\t{stage['modeled_seconds']:.3f}\t{stage['seconds']:.3f}"
+            )
+        typer.echo("往復種別（上位10件）: " + ", ".join(f"{kind}={count:,}" for kind, count in result["calls"].most_common(10)))
+
+    for violation in violations:
+        typer.echo(f"[NG] {violation}")
+    if violations:
+        raise typer.Exit(code=1)
+    typer.echo("[OK] 往復回数上限内")
+
+@app.command("perf-report")
+def perf_report(
+    days: int = typer.Option(30, "--days", help="表示期間（日）"),
+    stages: int = typer.Option(7, "--stages", help="工程別推移に表示する直近実行数")
+):
+    """処理性能推移を表示（1行あたり処理時間が基準より悪化した工程を [NG] 表示）"""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    from orchestrator import CampaignReportOrchestrator
+
+    runs, stage_trend = CampaignReportOrchestrator().perf_report(days=days)
+    if not runs:
+        typer.echo(f"処理性能履歴なし（直近{days}日）")
+        return
+
+    typer.echo("実行\t処理対象日\t完了日時\t処理秒\t行数\t入力MB\tピークMB\t設定\tリビジョン\t悪化")
+    for run in runs:
+        typer.echo(
+            f"#{run['run_id']}\t{run['report_date']}\t{run['finished_at']}\t{run['total_seconds']:.2f}\t{run['rows']:,}"
+            f"\t{run['input_bytes'] / 1024 / 1024:.1f}\t{run['peak_rss'] / 1024 / 1024:.0f}\t{run['options_key']}"
+            f"\t{run['git_revision'] or '-'}\t{len(run['regressions'])}"
+        )
+
+    # 工程別処理時間（直近実行、秒）
+    recent_runs = runs[-stages:]
+    stage_names = list(dict.fromkeys(name for run in recent_runs for name in stage_trend.get(run["run_id"], {})))
+    typer.echo("\n工程\t" + "\t".join(f"#{run['run_id']}" for run in recent_runs))
+    for stage_name in stage_names:
+        cells = [stage_trend.get(run["run_id"], {}).get(stage_name) for run in recent_runs]
+        typer.echo(f"{stage_name}\t" + "\t".join("-" if seconds is None else f"{seconds:.2f}" for seconds in cells))
+
+    typer.echo("")
+    regression_count = 0
+    for run in runs:
+        for regression in run["regressions"]:
+            regression_count += 1
+            typer.echo(
+                f"[NG] #{run['run_id']} {run['report_date']} {regression['stage']}: {regression['seconds']:.2f}秒"
+                f"（基準 {regression['expected_seconds']:.2f}秒の{regression['ratio']:.1f}倍、直近{regression['baseline_runs']}回の中央値）"
+            )
+    if not regression_count:
+        typer.echo("[OK] 悪化工程なし")
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 検索キー照合キャッシュ（SQLite）
+検索キー一覧の版×キャンペーン名ごとの一致キーを日をまたいで保持し、新出キャンペーン名のみ照合
+（照合はトランザクション外で行い、結果の書込のみ短い書込トランザクションで実行、複数接続からの同時利用に対応）
+"""
+
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+from datetime import datetime, timedelta
+from loguru import logger
+
+
+class MatchCache:
+    """検索キー照合キャッシュクラス"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS key_match (
+            key_version  TEXT NOT NULL,
+            campaign     TEXT NOT NULL,
+            matched_keys TEXT NOT NULL,
+            last_seen    TEXT NOT NULL,
+            PRIMARY KEY (key_version, campaign)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_key_match_last_seen ON key_match (last_seen);
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+
+        cache_config = config.get("match_cache", {})
+        self.db_path = Path(cache_config.get("db_path", "history/match_cache.sqlite3"))
+        self.max_entries = cache_config.get("max_entries", 200000)
+        self.max_idle_days = cache_config.get("max_idle_days", 90)
+        self.busy_timeout = cache_config.get("busy_timeout_seconds", 30)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 自動コミット（書込トランザクションは BEGIN IMMEDIATE で明示）、他接続の書込中は busy_timeout まで待機
+        self.connection = sqlite3.connect(str(self.db_path), timeout=self.busy_timeout, isolation_level=None)
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        """DB接続終了"""
+        self.connection.close()
+
+    def key_version(self, keys: list) -> str:
+        """検索キー一覧の版（空欄を除く重複なしキー集合のハッシュ、並び順の変更では変わらない）"""
+        normalized_keys = sorted({key for key in keys if key})
+        return hashlib.sha256(json.dumps(normalized_keys, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+    def matches(self, keys: list, names: list, evaluate) -> dict:
+        """キャンペーン名 → 一致キー一覧（既出名はキャッシュ参照、新出名のみ evaluate(keys, names) で照合）"""
+        version = self.key_version(keys)
+        now = datetime.now().isoformat(timespec="seconds")
+
+        # 照合対象名を一時表に展開して結合（キャッシュ全件は読み込まない、一時表は接続ごと）
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS run_names (campaign TEXT PRIMARY KEY)")
+        self.connection.execute("DELETE FROM run_names")
+        self.connection.executemany("INSERT OR IGNORE INTO run_names (campaign) VALUES (?)", ((name,) for name in names))
+
+        cached = {
+            campaign: json.loads(matched_keys)
+            for campaign, matched_keys in self.connection.execute(
+                "SELECT k.campaign, k.matched_keys FROM key_match k "
+                "JOIN run_names r ON r.campaign = k.campaign WHERE k.key_version = ?",
+                (version,)
+            )
+        }
+
+        # 新出名の照合（長時間になり得るためロックを保持しない）
+        new_names = [name for name in names if name not in cached]
+        evaluated = evaluate(keys, new_names) if new_names else {}
+
+        # 結果の書込のみ書込ロックを取得（他接続の書込中は busy_timeout まで待機）
+        self.connection.execute("BEGIN IMMEDIATE")
+        with self.connection:
+            self.connection.execute(
+                "UPDATE key_match SET last_seen = ? "
+                "WHERE key_version = ? AND campaign IN (SELECT campaign FROM run_names)",
+                (now, version)
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO key_match (key_version, campaign, matched_keys, last_seen) VALUES (?, ?, ?, ?)",
+                ((version, name, json.dumps(matched_keys, ensure_ascii=False), now) for name, matched_keys in evaluated.items())
+            )
+
+            evicted = self._evict(version)
+
+        logger.info(
+            f"照合キャッシュ: 既出{len(cached):,}件 / 新出{len(new_names):,}件 "
+            f"(キー版 {version}, 削除{evicted:,}件)"
+        )
+        cached.update(evaluated)
+        return cached
+
+    def _evict(self, version: str) -> int:
+        """不要エントリ削除（旧版キー・一定期間未出現・上限超過分を最終出現の古い順に削除）"""
+        cutoff = (datetime.now() - timedelta(days=self.max_idle_days)).isoformat(timespec="seconds")
+        evicted = self.connection.execute(
+            "DELETE FROM key_match WHERE key_version != ? OR last_seen < ?", (version, cutoff)
+        ).rowcount
+
+        entry_count = self.connection.execute("SELECT COUNT(*) FROM key_match").fetchone()[0]
+        if entry_count > self.max_entries:
+            evicted += self.connection.execute(
+                "DELETE FROM key_match WHERE campaign IN ("
+                "SELECT campaign FROM key_match WHERE key_version = ? ORDER BY last_seen ASC LIMIT ?)",
+                (version, entry_count - self.max_entries)
+            ).rowcount
+
+        return evicted
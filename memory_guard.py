@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - メモリ監視
+RSSを一定間隔で採取して工程別ピークを記録し、閾値接近時は以降の処理をストリーミングモードへ切替
+"""
+
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from loguru import logger
+
+
+class MemoryGuard(threading.Thread):
+    """メモリ監視スレッド"""
+
+    def __init__(self, threshold_bytes: int, pressure_ratio: float = 0.8, interval: float = 0.2):
+        super().__init__(daemon=True)
+        import psutil
+
+        self.process = psutil.Process()
+        self.threshold_bytes = threshold_bytes
+        self.pressure_bytes = int(threshold_bytes * pressure_ratio)
+        self.interval = interval
+
+        # ピーク記録（全体・工程別）
+        self.peak_rss = 0
+        self.stage_peaks = {}
+        self._active_stages = set()
+        self._lock = threading.Lock()
+
+        # 閾値接近（一度検知したら以降の処理は全てストリーミングモード）
+        self._pressure = threading.Event()
+        self._stop_event = threading.Event()
+
+        # 退避先（ローカル一時ディレクトリ、終了時に削除）
+        self.spill_dir = None
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        """監視終了・退避ファイル削除"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+
+    def sample(self) -> int:
+        """RSS採取（実行中の全工程のピークを更新）"""
+        rss = self.process.memory_info().rss
+        with self._lock:
+            self.peak_rss = max(self.peak_rss, rss)
+            for stage_name in self._active_stages:
+                self.stage_peaks[stage_name] = max(self.stage_peaks.get(stage_name, 0), rss)
+
+        if rss >= self.pressure_bytes and not self._pressure.is_set():
+            self._pressure.set()
+            logger.warning(
+                f"メモリ使用量が閾値に接近: {rss / 1024 / 1024:.0f}MB / {self.threshold_bytes / 1024 / 1024:.0f}MB "
+                f"→ 以降の処理をストリーミングモードに切替"
+            )
+        return rss
+
+    def under_pressure(self) -> bool:
+        """閾値接近判定（判定時点のRSSも採取）"""
+        self.sample()
+        return self._pressure.is_set()
+
+    @contextmanager
+    def stage(self, stage_name: str):
+        """工程実行中のピーク記録"""
+        with self._lock:
+            self._active_stages.add(stage_name)
+        self.sample()
+        try:
+            yield
+        finally:
+            self.sample()
+            with self._lock:
+                self._active_stages.discard(stage_name)
+
+    def spill(self, frame, name: str) -> Path:
+        """DataFrameのローカルディスク退避（Parquet）"""
+        if self.spill_dir is None:
+            self.spill_dir = Path(tempfile.mkdtemp(prefix="fam8_spill_"))
+
+        spill_file = self.spill_dir / f"{name}.parquet"
+        frame.to_parquet(spill_file, index=False)
+        logger.info(f"メモリ逼迫のため一時退避: {name} ({len(frame):,}行) → {spill_file}")
+        return spill_file
+
+    def restore(self, spill_file: Path):
+        """退避したDataFrameの読込（読込後に退避ファイル削除）"""
+        import pandas as pd
+
+        frame = pd.read_parquet(spill_file)
+        spill_file.unlink()
+        logger.info(f"一時退避から復元: {spill_file.stem} ({len(frame):,}行)")
+        return frame
+
+    def log_peaks(self):
+        """工程別ピークRSSをパフォーマンスログへ出力"""
+        perf_logger = logger.bind(performance=True)
+        perf_logger.info(f"ピークメモリ使用量: {self.peak_rss / 1024 / 1024:.2f}MB（閾値 {self.threshold_bytes / 1024 / 1024:.0f}MB）")
+        for stage_name, peak in self.stage_peaks.items():
+            perf_logger.info(f"  {stage_name}: {peak / 1024 / 1024:.2f}MB")
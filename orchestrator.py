@@ -6,29 +6,70 @@ fam8キャンペーンレポート自動集計システム - メイン制御・
 """
 
 import sys
-import shutil
+import threading
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime, timedelta
 import tomli
 from loguru import logger
-import psutil
 import time
 
-from data_processor import DataProcessor
-from data_handler import DataHandler
-from format_manager import FormatManager
+# pandas / xlwings / psutil を使うモジュールは各工程内で遅延import（--help・日付不正・入力欠損時の起動を軽量化）
+from history_store import HistoryStore
+from file_distributor import FileDistributor
 
 
 class CampaignReportOrchestrator:
     """fam8キャンペーンレポート自動集計メイン制御クラス"""
 
-    def __init__(self, debug_mode: bool = False):
+    # 事前チェックで確認する必須設定キー
+    REQUIRED_CONFIG_KEYS = {
+        "paths": ["input_dir", "output_dir", "filter_input_excel"],
+        "files": ["adult_csv", "general_csv", "output_filename"],
+        "csv_processing": ["skip_header_rows", "exclude_patterns", "fallback_encodings", "chunk_size", "large_file_threshold"],
+        "filter_settings": ["sheet_name", "max_campaign_rows"],
+        "aggregation": ["sum_columns", "calculated_columns"],
+        "excel_structure": ["summary_sheet_name", "summary_columns", "csv_sheet_name"],
+        "excel_formatting": ["percentage_format", "currency_format", "number_format", "header_background_color"],
+    }
+
+    def __init__(self, debug_mode: bool = False, profile_mode: str = None, resume: bool = False):
         self.debug_mode = debug_mode
+        self.profile_mode = profile_mode
+        self.resume = resume
         self.config = None
         self.target_date = None
         self.target_date_str = None
         self.start_time = time.time()
 
+        # 工程別処理時間・プロファイラ
+        self.stage_timings = {}
+        self.profiler = None
+
+        # メモリ監視（工程別ピークRSS記録・閾値接近時のストリーミング切替）
+        self.memory_guard = None
+        self.combined_row_count = 0
+
+        # COM往復トレース（performance.trace_com_calls 有効時のみ）
+        self.com_tracer = None
+
+        # Excel操作（工程グラフ内で生成）
+        self.data_handler = None
+
+        # 工程チェックポイント（--resume 時は完了済み工程を再利用）
+        self.checkpoint = None
+        self.completed_stages = []
+
+        # キャンペーン集計（履歴登録・事前集計貼付の並行呼出で1回のみ計算）
+        self.campaign_aggregates = None
+        self._aggregates_lock = threading.Lock()
+
+        # 絞込貼付の除外行数（絞込貼付無効時は None）
+        self.paste_filter_dropped_rows = None
+
+        # Excel SEARCH と同じ文字列にできない検索キー（数値・日時セル、ありの場合は絞込貼付なし）
+        self.inexact_filter_keys = []
+
     @logger.catch
     def execute(self, target_date: str = None):
         """メイン処理実行"""
@@ -46,27 +87,74 @@ class CampaignReportOrchestrator:
             logger.info(f"fam8キャンペーンレポート自動集計開始")
             logger.info(f"処理対象日: {self.target_date_str}")
             logger.info(f"デバッグモード: {self.debug_mode}")
+            logger.info(f"ドライラン: {self.dry_run}")
             logger.info("="*60)
 
-            # 工程4: 環境バリデーション
-            self._validate_environment()
+            # プロファイラ初期化（--profile 指定時）
+            self._initialize_profiler()
 
-            # 工程5: CSV統合・集計処理
-            self._process_csv_data()
+            # メモリ監視開始
+            self._initialize_memory_guard()
 
-            # 工程6: Excel出力処理（データ貼付→関数埋込→書式設定の順序保証）
-            self._build_excel_report()
+            # COM往復トレース初期化（有効時のみ）
+            self._initialize_com_tracer()
 
-            # 工程7: ファイル配布
-            self._distribute_files()
+            # チェックポイント初期化（--resume 指定時は完了済み工程を検証）
+            self._initialize_checkpoint()
+
+            # 工程4〜7: 工程グラフ実行（CSV統合とExcel起動・ブックオープンを並行、貼付→関数埋込→書式設定→保存の順序保証）
+            self._run_stage_graph()
 
             # 工程8: 処理完了ログ
             self._log_completion()
 
+            # 処理性能履歴登録・悪化工程検出
+            self._record_perf_history()
+
+            # 正常終了時はチェックポイント不要
+            if self.checkpoint:
+                self.checkpoint.clear()
+
             logger.info("="*60)
             logger.info("fam8キャンペーンレポート自動集計完了")
             logger.info("="*60)
 
+        except Exception as e:
+            logger.error(f"致命的エラー発生: {e}")
+            if self.data_handler:
+                self.data_handler.quit_app()
+            if self.memory_guard:
+                self.memory_guard.stop()
+            if self.com_tracer:
+                self.com_tracer.log_summary()
+            if self.checkpoint:
+                self._preserve_checkpoint()
+                logger.info(f"完了済み工程から再開: python main.py --date {self.target_date_str} --resume")
+            sys.exit(1)
+
+    @logger.catch
+    def execute_window(self, target_date: str = None, window: str = "mtd"):
+        """期間集計処理実行（月初来・直近N日、Excel不使用）"""
+        try:
+            self._load_config()
+            self._calculate_target_date(target_date)
+            self._initialize_logging()
+
+            logger.info("="*60)
+            logger.info(f"fam8キャンペーンレポート期間集計開始")
+            logger.info(f"処理対象日: {self.target_date_str}")
+            logger.info(f"集計期間: {window}")
+            logger.info("="*60)
+
+            from window_report import WindowReportBuilder
+
+            output_file = WindowReportBuilder(self.config, self.target_date, window).build()
+
+            logger.info("="*60)
+            logger.info(f"fam8キャンペーンレポート期間集計完了: {output_file}")
+            logger.info(f"処理時間: {time.time() - self.start_time:.2f}秒")
+            logger.info("="*60)
+
         except Exception as e:
             logger.error(f"致命的エラー発生: {e}")
             sys.exit(1)
@@ -80,6 +168,9 @@ class CampaignReportOrchestrator:
         with open(config_path, "rb") as f:
             self.config = tomli.load(f)
 
+        # ドライラン（ワークブック保存・ファイル配布・履歴登録を行わない）
+        self.dry_run = self.config.get("system", {}).get("dry_run", False)
+
         logger.info(f"設定ファイル読込完了: {config_path}")
 
     def _calculate_target_date(self, target_date: str = None):
@@ -130,20 +221,116 @@ class CampaignReportOrchestrator:
             retention="30 days"
         )
 
+        # パフォーマンスログ（logger.bind(performance=True) で出力した行のみ）
+        if self.config.get("performance", {}).get("enable_performance_logging", False):
+            logger.add(
+                str(performance_log),
+                level="DEBUG",
+                format="[{level}] {time:YYYY-MM-DD HH:mm:ss} → {message}",
+                mode="a",
+                filter=lambda record: record["extra"].get("performance", False)
+            )
+
         logger.info(f"ログ初期化完了: {log_file}")
 
+    def _initialize_profiler(self):
+        """プロファイラ初期化（出力先: log/{date}/profile）"""
+        if not self.profile_mode:
+            return
+
+        from stage_profiler import StageProfiler
+
+        performance_config = self.config.get("performance", {})
+        self.profiler = StageProfiler(
+            self.profile_mode,
+            Path("log") / self.target_date_str / "profile",
+            top_n=performance_config.get("profile_top_n", 20),
+            sample_interval=performance_config.get("profile_sample_interval", 0.005)
+        )
+        logger.info(f"工程別プロファイル有効: {self.profile_mode} → {self.profiler.output_dir}")
+
+    def _initialize_memory_guard(self):
+        """メモリ監視初期化（performance.monitor_memory_usage 有効時）"""
+        performance_config = self.config.get("performance", {})
+        if not performance_config.get("monitor_memory_usage", False):
+            return
+
+        from memory_guard import MemoryGuard
+
+        self.memory_guard = MemoryGuard(
+            performance_config.get("memory_warning_threshold", 1073741824),
+            pressure_ratio=performance_config.get("memory_pressure_ratio", 0.8),
+            interval=performance_config.get("memory_sample_interval", 0.2)
+        )
+        self.memory_guard.start()
+
+    def _initialize_com_tracer(self):
+        """COM往復トレース初期化（無効時は代理オブジェクトを使わず xlwings を直接呼出）"""
+        performance_config = self.config.get("performance", {})
+        if not performance_config.get("trace_com_calls", False):
+            return
+
+        from com_tracer import ComTracer
+
+        self.com_tracer = ComTracer(top_n=performance_config.get("com_trace_top_n", 20))
+        logger.info("COM往復トレース有効")
+
+    def _initialize_checkpoint(self):
+        """チェックポイント初期化（ドライラン・入力CSV欠損時は無効）"""
+        if not self.config.get("checkpoint", {}).get("enable_checkpoint", False) or self.dry_run:
+            return
+
+        input_files = self._input_csv_paths()
+        if not all(input_file.exists() for input_file in input_files):
+            return
+
+        from checkpoint_store import CheckpointStore
+
+        self.checkpoint = CheckpointStore(self.config, self.target_date_str)
+        fingerprint = self.checkpoint.fingerprint(input_files)
+
+        if not self.resume:
+            self.checkpoint.start(fingerprint)
+            return
+
+        self.completed_stages = self.checkpoint.resume(fingerprint, input_files)
+
+        # 保存済みブックが保存後に変更されている場合（サイズ・更新時刻の不一致）はExcel工程から再実行
+        if "save_workbook" in self.completed_stages:
+            saved_stat = self.checkpoint.stage_values("save_workbook").get("workbook_stat")
+            filter_excel = Path(self.config["paths"]["filter_input_excel"])
+            if not filter_excel.exists() or self.checkpoint.file_stat(filter_excel) != saved_stat:
+                logger.warning("保存済みブックが変更されているためExcel工程から再実行")
+                self.completed_stages.remove("save_workbook")
+
+    def _preserve_checkpoint(self):
+        """失敗時のチェックポイント確定（保存待ちの成果物を保存し、入力CSV内容ハッシュを記録）"""
+        try:
+            self.checkpoint.flush()
+            self.checkpoint.record_input_hash(self._input_csv_paths())
+        except Exception as e:
+            logger.warning(f"チェックポイント確定エラー: {e}")
+
+    def _run_stage(self, stage_name: str, stage_func):
+        """工程実行（処理時間記録、--profile 指定時はプロファイル取得）"""
+        stage_start = time.perf_counter()
+        try:
+            with self.memory_guard.stage(stage_name) if self.memory_guard else nullcontext(), \
+                    self.com_tracer.stage(stage_name) if self.com_tracer else nullcontext():
+                if self.profiler:
+                    with self.profiler.profile(stage_name):
+                        return stage_func()
+                return stage_func()
+        finally:
+            self.stage_timings[stage_name] = time.perf_counter() - stage_start
+            logger.debug(f"工程処理時間: {stage_name} {self.stage_timings[stage_name]:.2f}秒")
+
     def _validate_environment(self):
         """環境バリデーション（修正版）"""
         logger.info("環境バリデーション開始")
 
         # 入力CSVファイル存在チェック
-        input_dir = Path(self.config["paths"]["input_dir"]) / self.target_date_str
-
-        # 正確な日付フォーマット使用（YYYY-MM-DD）
-        date_formatted = f"{self.target_date_str[:4]}-{self.target_date_str[4:6]}-{self.target_date_str[6:]}"
-        
-        adult_csv = input_dir / self.config["files"]["adult_csv"].format(date=date_formatted)
-        general_csv = input_dir / self.config["files"]["general_csv"].format(date=date_formatted)
+        adult_csv, general_csv = self._input_csv_paths()
 
         logger.info(f"CSVファイル存在確認:")
         logger.info(f"  adult CSV: {adult_csv}")
@@ -175,14 +362,106 @@ class CampaignReportOrchestrator:
 
         logger.info("環境バリデーション完了")
 
+    def _input_csv_paths(self) -> tuple:
+        """入力CSVパス（adult, general）"""
+        input_dir = Path(self.config["paths"]["input_dir"]) / self.target_date_str
+
+        # 正確な日付フォーマット使用（YYYY-MM-DD）
+        date_formatted = f"{self.target_date_str[:4]}-{self.target_date_str[4:6]}-{self.target_date_str[6:]}"
+
+        adult_csv = input_dir / self.config["files"]["adult_csv"].format(date=date_formatted)
+        general_csv = input_dir / self.config["files"]["general_csv"].format(date=date_formatted)
+        return adult_csv, general_csv
+
+    def explain(self, target_date: str = None) -> dict:
+        """処理コスト予測（入力CSVの先頭のみ解析、Excel不使用・ファイル作成なし）"""
+        self._load_config()
+        self._calculate_target_date(target_date)
+
+        from campaign_aggregator import CampaignAggregator
+        from cost_model import CostModel
+
+        adult_csv, general_csv = self._input_csv_paths()
+        csv_paths = {csv_type: csv_file for csv_type, csv_file in (("adult", adult_csv), ("general", general_csv))
+                     if csv_file.exists()}
+        aggregator = CampaignAggregator(self.config)
+        keys = aggregator.load_filter_keys()
+
+        # 実行時と同じく、Excel SEARCH と同じ文字列にできない検索キーがあれば絞込貼付なしで予測
+        options = self._engine_options()
+        if aggregator.inexact_keys:
+            options["paste_filter"] = False
+        estimate = CostModel(self.config, self.target_date_str).estimate(csv_paths, keys, options)
+        estimate["target_date"] = self.target_date_str
+        estimate["options"] = options
+        estimate["missing_inputs"] = [str(path) for path in (adult_csv, general_csv) if not path.exists()]
+        return estimate
+
+    def preflight(self, target_date: str = None) -> list:
+        """事前チェック（設定・入力CSV・パスの検証のみ、pandas/Excel不使用・ファイル作成なし）"""
+        try:
+            self._load_config()
+            self._calculate_target_date(target_date)
+        except Exception as e:
+            return [str(e)]
+
+        problems = []
+
+        # 必須設定キー確認
+        for section, keys in self.REQUIRED_CONFIG_KEYS.items():
+            for key in keys:
+                if key not in self.config.get(section, {}):
+                    problems.append(f"設定不足: [{section}] {key}")
+        if problems:
+            return problems
+
+        # 入力CSV確認
+        for csv_type, csv_file in zip(("adult", "general"), self._input_csv_paths()):
+            if not csv_file.exists():
+                problems.append(f"{csv_type} CSVファイルが見つかりません: {csv_file}")
+            elif csv_file.stat().st_size == 0:
+                problems.append(f"{csv_type} CSVファイルが空です: {csv_file}")
+
+        # FilterInput_Csvreport.xlsx確認
+        filter_excel = Path(self.config["paths"]["filter_input_excel"])
+        if not filter_excel.exists():
+            problems.append(f"FilterInput_Csvreport.xlsxが見つかりません: {filter_excel}")
+
+        # 出力・配布先の親ディレクトリ確認（作成はしない）
+        output_root = Path(self.config["paths"]["output_dir"])
+        if not output_root.exists():
+            problems.append(f"出力ディレクトリが見つかりません: {output_root}")
+        for target_dir in self.config.get("distribution", {}).get("targets", []):
+            target_parent = Path(target_dir.format(date=self.target_date_str)).parent
+            if not target_parent.exists():
+                problems.append(f"配布先の親ディレクトリが見つかりません: {target_parent}")
+
+        return problems
+
     def _process_csv_data(self):
         """CSV統合・集計処理"""
         logger.info("CSV統合・集計処理開始")
 
-        processor = DataProcessor(self.config, self.target_date_str)
-        combined_data = processor.process()
+        if "process_csv_data" in self.completed_stages:
+            # チェックポイントから復元（CSV検出・解析を省略）
+            combined_data = self.checkpoint.load_frame("process_csv_data", "combined_data")
+            self.source_row_counts = self.checkpoint.stage_values("process_csv_data")["source_row_counts"]
+        else:
+            from data_processor import DataProcessor
+
+            processor = DataProcessor(self.config, self.target_date_str, memory_guard=self.memory_guard)
+            combined_data = processor.process()
+            self.source_row_counts = processor.source_row_counts
+
+            if self.checkpoint:
+                self.checkpoint.complete(
+                    "process_csv_data",
+                    frames={"combined_data": combined_data},
+                    values={"source_row_counts": self.source_row_counts}
+                )
 
         self.combined_csv_data = combined_data
+        self.combined_row_count = len(combined_data)
         logger.info(f"CSV統合完了: {len(combined_data)}行")
 
         # 統合データの基本情報をログ出力
@@ -191,43 +470,358 @@ class CampaignReportOrchestrator:
         logger.info(f"  列数: {len(combined_data.columns)}列")
         logger.info(f"  列構成: {list(combined_data.columns)}")
 
-    def _build_excel_report(self):
-        """Excel出力処理（順序保証：データ貼付→関数埋込→書式設定）"""
+        return combined_data
+
+    def _update_history(self):
+        """日次集計履歴登録（失敗してもレポート処理は継続）"""
+        if not self.config.get("history", {}).get("enable_history", False):
+            logger.debug("履歴DB登録無効のためスキップ")
+            return
+        if self.dry_run:
+            logger.info("ドライランのため履歴DB登録をスキップ")
+            return
+        if "update_history" in self.completed_stages:
+            logger.info("履歴DB登録済み（チェックポイント）のためスキップ")
+            return
+
+        try:
+            aggregated = self._campaign_aggregates()
+            store = HistoryStore(self.config)
+            try:
+                store.upsert_daily(self.target_date_str, aggregated)
+            finally:
+                store.close()
+
+            if self.checkpoint:
+                self.checkpoint.complete("update_history")
+        except Exception as e:
+            logger.warning(f"履歴DB登録エラー（処理継続）: {e}")
+
+    def _campaign_aggregates(self):
+        """キャンペーン名×ソース単位集計（履歴登録・事前集計貼付で共用、初回のみ計算）"""
+        with self._aggregates_lock:
+            if self.campaign_aggregates is not None:
+                return self.campaign_aggregates
+
+            if self.checkpoint and self.checkpoint.has_frame("campaign_aggregates", "campaign_aggregates"):
+                self.campaign_aggregates = self.checkpoint.load_frame("campaign_aggregates", "campaign_aggregates")
+                return self.campaign_aggregates
+
+            from campaign_aggregator import CampaignAggregator
+
+            self.campaign_aggregates = CampaignAggregator(self.config).aggregate(
+                self.combined_csv_data, self.source_row_counts
+            )
+            if self.checkpoint:
+                self.checkpoint.complete("campaign_aggregates", frames={"campaign_aggregates": self.campaign_aggregates})
+            return self.campaign_aggregates
+
+    def _release_combined_data(self):
+        """統合データの参照解放（貼付・履歴登録・集計データ出力の完了後）"""
+        self.combined_csv_data = None
+        if self.memory_guard:
+            logger.debug(f"統合データ解放後のメモリ使用量: {self.memory_guard.sample() / 1024 / 1024:.2f}MB")
+
+    def _load_filter_keys(self) -> list:
+        """集計シート検索キー読込（集計データ出力・絞込貼付とも無効時は読込なし）"""
+        if not self.config.get("export", {}).get("enable_export", False) and not self._paste_filter_enabled():
+            return []
+
+        from campaign_aggregator import CampaignAggregator
+
+        aggregator = CampaignAggregator(self.config)
+        keys = aggregator.load_filter_keys()
+        self.inexact_filter_keys = aggregator.inexact_keys
+        return keys
+
+    def _build_breakdowns(self, combined_data):
+        """集計軸別集計（無効時は None）"""
+        breakdown_config = self.config.get("breakdown", {})
+        if not breakdown_config.get("enable_breakdown", False):
+            return None
+
+        from campaign_aggregator import CampaignAggregator
+
+        return CampaignAggregator(self.config).breakdowns(
+            combined_data, self.source_row_counts, breakdown_config.get("dimensions", [])
+        )
+
+    def _paste_breakdowns(self, workbook, breakdowns):
+        """集計軸別シート貼付（集計軸別集計の無効時はスキップ）"""
+        if breakdowns is None:
+            return
+        self.data_handler.paste_breakdown(
+            workbook, breakdowns, self.config["breakdown"].get("sheet_name", "集計軸別シート")
+        )
+
+    def _export_summary(self, filter_keys: list, breakdowns=None):
+        """集計データ出力（Parquet/CSV/JSON、失敗してもレポート処理は継続）"""
+        if not self.config.get("export", {}).get("enable_export", False):
+            logger.debug("集計データ出力無効のためスキップ")
+            return
+        if self.dry_run:
+            logger.info("ドライランのため集計データ出力をスキップ")
+            return
+
+        try:
+            from campaign_aggregator import CampaignAggregator
+            from summary_exporter import SummaryExporter
+
+            match_cache = self._open_match_cache()
+            try:
+                summary = CampaignAggregator(self.config).build_summary(
+                    self._campaign_aggregates(), filter_keys, match_cache
+                )
+            finally:
+                if match_cache:
+                    match_cache.close()
+
+            SummaryExporter(self.config, self.target_date_str).export(summary, self.combined_csv_data, breakdowns)
+        except Exception as e:
+            logger.warning(f"集計データ出力エラー（処理継続）: {e}")
+
+    def _open_match_cache(self):
+        """検索キー照合キャッシュ（無効時は None）"""
+        if not self.config.get("match_cache", {}).get("enable_match_cache", False):
+            return None
+
+        from match_cache import MatchCache
+
+        return MatchCache(self.config)
+
+    def _paste_filter_enabled(self) -> bool:
+        return self.config["excel_structure"].get("paste_filter", False)
+
+    def _prepare_paste_data(self, filter_keys: list = None) -> tuple:
+        """抽出シート貼付データ準備（paste_mode = aggregated 時はキャンペーン名×ソース単位に事前集計、
+        filter_keys 指定時は検索キーに一致する行のみ）"""
+        excel_structure = self.config["excel_structure"]
+        if excel_structure.get("paste_mode", "raw") != "aggregated":
+            paste_data, detail_data = self.combined_csv_data, None
+        else:
+            from campaign_aggregator import CampaignAggregator
+
+            paste_data = CampaignAggregator(self.config).format_for_paste(self._campaign_aggregates())
+            logger.info(f"事前集計貼付: {len(self.combined_csv_data):,}行 → {len(paste_data):,}行")
+
+            # 明細シート（未設定時は明細を貼付しない）
+            detail_data = self.combined_csv_data if excel_structure.get("raw_detail_sheet_name") else None
+
+        if filter_keys is not None:
+            paste_data = self._filter_paste_data(paste_data, filter_keys)
+        return paste_data, detail_data
+
+    def _filter_paste_data(self, paste_data, filter_keys: list):
+        """絞込貼付（集計シートの関数が参照しない行を除外、明細シートは対象外）"""
+        keys = [key for key in filter_keys if key]
+        if not keys:
+            logger.warning("検索キーがないため絞込貼付を行わず全行を貼付")
+            return paste_data
+
+        from campaign_aggregator import CampaignAggregator
+
+        aggregator = CampaignAggregator(self.config)
+
+        # Excel SEARCH のワイルドカード（* ? ~）を含むキーは部分一致の結果が異なるため全行を貼付
+        wildcard_keys = aggregator.wildcard_keys(keys)
+        if wildcard_keys:
+            logger.warning(f"ワイルドカードを含む検索キーがあるため絞込貼付を行わず全行を貼付: {wildcard_keys}")
+            return paste_data
+
+        # 数値・日時セルの検索キーは Excel と一致が確実な文字列にできない場合に全行を貼付
+        if self.inexact_filter_keys:
+            logger.warning(f"Excel SEARCH と同じ文字列にできない検索キーがあるため絞込貼付を行わず全行を貼付: {self.inexact_filter_keys}")
+            return paste_data
+
+        # 照合キャッシュの障害（ロック競合等）は貼付を止めずキャッシュなしで照合
+        try:
+            match_cache = self._open_match_cache()
+            try:
+                filtered_data, dropped_rows = aggregator.filter_matching_rows(paste_data, keys, match_cache)
+            finally:
+                if match_cache:
+                    match_cache.close()
+        except Exception as e:
+            logger.warning(f"照合キャッシュエラーのためキャッシュなしで照合: {e}")
+            filtered_data, dropped_rows = aggregator.filter_matching_rows(paste_data, keys)
+
+        self.paste_filter_dropped_rows = dropped_rows
+        logger.info(f"絞込貼付: {len(paste_data):,}行 → {len(filtered_data):,}行（除外{dropped_rows:,}行）")
+        return filtered_data
+
+    def _build_stage_graph(self) -> list:
+        """工程グラフ定義（入出力で依存関係を宣言、Excel COM操作はメインスレッドで実行）"""
+        from stage_scheduler import Stage
+
+        def timed(stage_name, func):
+            return lambda **inputs: self._run_stage(stage_name, lambda: func(**inputs))
+
+        if "save_workbook" in self.completed_stages:
+            # 保存済み（チェックポイント）: Excel工程を省略して配布から再開
+            logger.info("ワークブック保存済み（チェックポイント）のためExcel工程を省略")
+            return [
+                Stage("validate_environment", timed("validate_environment", lambda: self._validate_environment()),
+                      outputs=("environment",)),
+                Stage("process_csv_data", timed("process_csv_data", lambda environment: self._process_csv_data()),
+                      inputs=("environment",), outputs=("combined_data",), worker=True),
+                Stage("update_history", timed("update_history", lambda combined_data: self._update_history()),
+                      inputs=("combined_data",), outputs=("history_updated",), worker=True),
+                Stage("load_filter_keys", timed("load_filter_keys", lambda environment: self._load_filter_keys()),
+                      inputs=("environment",), outputs=("filter_keys",), worker=True),
+                Stage("build_breakdowns", timed("build_breakdowns", lambda combined_data: self._build_breakdowns(combined_data)),
+                      inputs=("combined_data",), outputs=("breakdowns",), worker=True),
+                Stage("export_summary",
+                      timed("export_summary", lambda combined_data, filter_keys, breakdowns: self._export_summary(filter_keys, breakdowns)),
+                      inputs=("combined_data", "filter_keys", "breakdowns"), outputs=("summary_exported",), worker=True),
+                Stage("release_combined_data",
+                      timed("release_combined_data", lambda history_updated, summary_exported: self._release_combined_data()),
+                      inputs=("history_updated", "summary_exported")),
+                Stage("distribute_files", timed("distribute_files", lambda environment: self._distribute_files()),
+                      inputs=("environment",)),
+            ]
+
+        return [
+            # 工程4: 環境バリデーション
+            Stage("validate_environment", timed("validate_environment", lambda: self._validate_environment()),
+                  outputs=("environment",)),
+
+            # 工程5: CSV統合・集計処理（Excel起動・ブックオープンと並行）
+            Stage("process_csv_data", timed("process_csv_data", lambda environment: self._process_csv_data()),
+                  inputs=("environment",), outputs=("combined_data",), worker=True),
+
+            # 工程5-2: 日次集計履歴登録
+            Stage("update_history", timed("update_history", lambda combined_data: self._update_history()),
+                  inputs=("combined_data",), outputs=("history_updated",), worker=True),
+
+            # 工程5-3: 集計データ出力（検索キーはExcelの保存と競合しないよう先に読込）
+            Stage("load_filter_keys", timed("load_filter_keys", lambda environment: self._load_filter_keys()),
+                  inputs=("environment",), outputs=("filter_keys",), worker=True),
+            Stage("export_summary",
+                  timed("export_summary", lambda combined_data, filter_keys, breakdowns: self._export_summary(filter_keys, breakdowns)),
+                  inputs=("combined_data", "filter_keys", "breakdowns"), outputs=("summary_exported",), worker=True),
+
+            # 工程5-4: 集計軸別集計（サイズ・ステータス等、Excelのピボットテーブルの代替）
+            Stage("build_breakdowns", timed("build_breakdowns", lambda combined_data: self._build_breakdowns(combined_data)),
+                  inputs=("combined_data",), outputs=("breakdowns",), worker=True),
+
+            # 工程6-1: Excel起動・ワークブックオープン
+            Stage("launch_excel", timed("launch_excel", lambda environment: self._launch_excel()),
+                  inputs=("environment",), outputs=("excel_app",)),
+            Stage("open_workbook", timed("open_workbook", lambda excel_app: self.data_handler.open_workbook()),
+                  inputs=("excel_app",), outputs=("workbook",)),
+
+            # 工程6-2: データ貼付 → 関数埋込 → 再計算（1回のみ） → 書式設定 → 保存（順序保証）
+            Stage("paste_csv_data",
+                  timed("paste_csv_data", lambda workbook, combined_data, filter_keys: self._paste_csv_data(workbook, filter_keys)),
+                  inputs=("workbook", "combined_data", "filter_keys"), outputs=("pasted",)),
+            Stage("paste_breakdowns", timed("paste_breakdowns", lambda workbook, breakdowns, pasted: self._paste_breakdowns(workbook, breakdowns)),
+                  inputs=("workbook", "breakdowns", "pasted"), outputs=("breakdowns_pasted",)),
+            Stage("embed_formulas", timed("embed_formulas", lambda workbook, pasted: self.data_handler.embed_formulas(workbook)),
+                  inputs=("workbook", "pasted"), outputs=("formulas_embedded",)),
+
+            # 工程6-3: 統合データ解放（貼付・履歴登録・集計データ出力の完了後、以降のExcel工程のメモリを確保）
+            Stage("release_combined_data",
+                  timed("release_combined_data", lambda pasted, history_updated, summary_exported: self._release_combined_data()),
+                  inputs=("pasted", "history_updated", "summary_exported")),
+            Stage("recalculate", timed("recalculate", lambda workbook, formulas_embedded: self.data_handler.recalculate(workbook)),
+                  inputs=("workbook", "formulas_embedded"), outputs=("calculated",)),
+            Stage("apply_formatting", timed("apply_formatting", lambda workbook, calculated: self._apply_formatting(workbook)),
+                  inputs=("workbook", "calculated"), outputs=("formatted",)),
+            Stage("save_workbook", timed("save_workbook", lambda workbook, formatted, breakdowns_pasted: self._save_workbook(workbook)),
+                  inputs=("workbook", "formatted", "breakdowns_pasted"), outputs=("saved",)),
+
+            # 工程7: ファイル配布
+            Stage("distribute_files", timed("distribute_files", lambda saved: self._distribute_files()),
+                  inputs=("saved",)),
+        ]
+
+    def _run_stage_graph(self):
+        """工程グラフ実行（プロファイル時は計測を分離するため全工程を順次実行）"""
+        from stage_scheduler import StageScheduler
+
+        max_workers = 0 if self.profiler else self.config.get("performance", {}).get("stage_workers", 2)
+        if self.profiler:
+            logger.info("プロファイル有効のため工程を順次実行")
+
+        StageScheduler(self._build_stage_graph(), max_workers=max_workers).run()
+
+    def _launch_excel(self):
+        """Excel出力処理開始（Excelアプリケーション起動）"""
         logger.info("Excel出力処理開始")
 
-        # データ操作（CSV貼付＋関数埋込）
-        data_handler = DataHandler(self.config, self.target_date_str)
-        workbook = data_handler.process(self.combined_csv_data)
+        from data_handler import DataHandler
+
+        app_factory = None
+        if self.com_tracer:
+            import xlwings as xw
+            app_factory = self.com_tracer.wrap_factory(xw.App)
+
+        self.data_handler = DataHandler(self.config, self.target_date_str, app_factory=app_factory)
+        return self.data_handler.launch_app()
+
+    def _paste_csv_data(self, workbook, filter_keys: list = None):
+        """抽出シート貼付（全行 or 事前集計、絞込貼付有効時は検索キーに一致する行のみ）"""
+        self.paste_filter_dropped_rows = None
+        paste_data, detail_data = self._prepare_paste_data(filter_keys if self._paste_filter_enabled() else None)
+
+        # メモリ逼迫時は貼付単位を縮小して1回あたりの行リスト生成量を抑制
+        if self.memory_guard and self.memory_guard.under_pressure():
+            streaming_slab_rows = self.config.get("performance", {}).get("memory_streaming_slab_rows", 1000)
+            if self.data_handler.paste_slab_rows > streaming_slab_rows:
+                logger.info(f"メモリ逼迫のため貼付単位を縮小: {self.data_handler.paste_slab_rows}行 → {streaming_slab_rows}行")
+                self.data_handler.paste_slab_rows = streaming_slab_rows
+
+        self.data_handler.paste(workbook, paste_data, detail_data)
+
+        # 除外行数の書込（設定時のみ）
+        count_cell = self.config["excel_structure"].get("paste_filter_count_cell", "")
+        if count_cell and self.paste_filter_dropped_rows is not None:
+            self.data_handler.write_value(workbook, count_cell, self.paste_filter_dropped_rows)
+
+    def _apply_formatting(self, workbook):
+        """書式設定（関数埋込後に実行）"""
+        from format_manager import FormatManager
 
-        # 書式設定（関数埋込後に実行）
         format_manager = FormatManager(self.config)
         format_manager.apply_formatting(workbook)
 
-        # ファイル保存
-        data_handler.save_workbook(workbook)
+    def _save_workbook(self, workbook):
+        """ファイル保存（ドライラン時は保存せずに閉じる）"""
+        if self.dry_run:
+            self.data_handler.close_workbook(workbook)
+            logger.info("ドライランのためワークブックを保存せずに終了")
+        else:
+            self.data_handler.save_workbook(workbook)
+
+            if self.checkpoint:
+                filter_excel = Path(self.config["paths"]["filter_input_excel"])
+                self.checkpoint.complete("save_workbook", values={"workbook_stat": self.checkpoint.file_stat(filter_excel)})
 
         logger.info("Excel出力処理完了")
 
     def _distribute_files(self):
-        """ファイル配布"""
+        """ファイル配布（複数配布先へ並列・アトミック配布）"""
+        if self.dry_run:
+            logger.info("ドライランのためファイル配布をスキップ")
+            return
+
         logger.info("ファイル配布開始")
 
         # 元ファイル
         source_file = Path(self.config["paths"]["filter_input_excel"])
 
-        # 配布先ディレクトリ
-        output_dir = Path(self.config["paths"]["output_dir"]) / self.target_date_str
-
         # 配布先ファイル名（YYYYMMDD形式）
         output_filename = self.config["files"]["output_filename"].format(date=self.target_date_str)
-        output_file = output_dir / output_filename
 
-        # ファイルコピー
-        shutil.copy2(source_file, output_file)
+        # 並列配布（同一内容の配布先はスキップ、コピー後にハッシュ検証）
+        distributor = FileDistributor(self.config, self.target_date_str)
+        results = distributor.distribute(source_file, output_filename)
 
+        copied_bytes = sum(result["bytes"] for result in results)
+        skipped_count = sum(1 for result in results if result["status"] == "skipped")
         logger.info(f"ファイル配布完了:")
         logger.info(f"  元ファイル: {source_file}")
-        logger.info(f"  配布先: {output_file}")
+        logger.info(f"  配布先: {len(results)}件（スキップ{skipped_count}件、転送{copied_bytes:,} bytes）")
 
     def _log_completion(self):
         """処理完了ログ"""
@@ -235,6 +829,7 @@ class CampaignReportOrchestrator:
         processing_time = end_time - self.start_time
 
         # メモリ使用量
+        import psutil
         memory_usage = psutil.Process().memory_info().rss / 1024 / 1024  # MB
 
         logger.info("="*40)
@@ -242,5 +837,161 @@ class CampaignReportOrchestrator:
         logger.info(f"処理時間: {processing_time:.2f}秒")
         logger.info(f"メモリ使用量: {memory_usage:.2f}MB")
         logger.info(f"処理対象日: {self.target_date_str}")
-        logger.info(f"CSV統合行数: {len(self.combined_csv_data):,}行")
-        logger.info("="*40)
\ No newline at end of file
+        logger.info(f"CSV統合行数: {self.combined_row_count:,}行")
+        if self.data_handler:
+            logger.info(f"Excel再計算: {self.data_handler.recalc_count}回 ({self.data_handler.recalc_seconds:.2f}秒)")
+        logger.info("工程別処理時間:")
+        for stage_name, stage_time in self.stage_timings.items():
+            logger.info(f"  {stage_name}: {stage_time:.2f}秒")
+        logger.info("="*40)
+
+        # COM往復トレース集計出力
+        if self.com_tracer:
+            self.com_tracer.log_summary()
+
+        # 工程別ピークメモリ出力・監視終了
+        if self.memory_guard:
+            self.memory_guard.stop()
+            self.memory_guard.log_peaks()
+
+        # プロファイルサマリー出力
+        if self.profiler:
+            self.profiler.write_summary()
+
+    def _engine_options(self) -> dict:
+        """処理時間に影響する実行設定（処理性能履歴の比較単位）"""
+        csv_processing = self.config["csv_processing"]
+        excel_structure = self.config["excel_structure"]
+        performance = self.config.get("performance", {})
+        return {
+            "dry_run": self.dry_run,
+            "resume": self.resume,
+            "profile_mode": self.profile_mode,
+            "trace_com_calls": performance.get("trace_com_calls", False),
+            "streaming": bool(self.memory_guard and self.memory_guard.under_pressure()),
+            "stage_workers": performance.get("stage_workers", 2),
+            "byte_prescan": csv_processing.get("byte_prescan", True),
+            "categorical_encoding": csv_processing.get("categorical_encoding", True),
+            "paste_mode": excel_structure.get("paste_mode", "raw"),
+            "paste_slab_rows": excel_structure.get("paste_slab_rows", 5000),
+            "paste_filter": excel_structure.get("paste_filter", False),
+            "skip_unchanged_layout": excel_structure.get("skip_unchanged_layout", True),
+            "match_cache": self.config.get("match_cache", {}).get("enable_match_cache", False),
+            "breakdown": self.config.get("breakdown", {}).get("enable_breakdown", False),
+        }
+
+    def _record_perf_history(self):
+        """処理性能履歴登録（登録失敗は処理結果に影響させない）"""
+        if not self.config.get("perf_history", {}).get("enable_perf_history", False):
+            return
+
+        from perf_history import PerfHistory
+
+        try:
+            if self.memory_guard:
+                peak_rss = self.memory_guard.peak_rss
+            else:
+                import psutil
+                peak_rss = psutil.Process().memory_info().rss
+            input_bytes = sum(path.stat().st_size for path in self._input_csv_paths() if path.exists())
+
+            history = PerfHistory(self.config)
+            try:
+                run_id = history.record(
+                    self.target_date_str, time.time() - self.start_time, self.combined_row_count,
+                    input_bytes, peak_rss, self._engine_options(), self.stage_timings
+                )
+                regressions = history.log_regressions(run_id)
+            finally:
+                history.close()
+            logger.info(f"処理性能履歴登録完了: #{run_id}（悪化工程{len(regressions)}件）")
+        except Exception as e:
+            logger.warning(f"処理性能履歴登録失敗: {e}")
+
+    def perf_report(self, days: int = 30) -> tuple:
+        """処理性能推移（実行記録・工程別処理時間・実行ごとの悪化工程）"""
+        self._load_config()
+
+        from perf_history import PerfHistory
+
+        history = PerfHistory(self.config)
+        try:
+            runs = history.runs(days=days)
+            for run in runs:
+                run["regressions"] = history.regressions(run["run_id"])
+            return runs, history.stage_trend(days=days)
+        finally:
+            history.close()
+
+    def show_history(self, campaign: str = None, exact: bool = False, date_from: str = None,
+                     date_to: str = None, source: str = None, by_source: bool = False) -> list:
+        """日次集計履歴検索"""
+        self._load_config()
+
+        store = HistoryStore(self.config)
+        try:
+            return store.query(
+                campaign=campaign, exact=exact, date_from=date_from,
+                date_to=date_to, source=source, by_source=by_source
+            )
+        finally:
+            store.close()
+
+    def import_history(self, date_from: str = None, date_to: str = None, force: bool = False):
+        """既存入力フォルダからの履歴一括登録（登録済み日付は force 指定時のみ再登録）"""
+        self._load_config()
+
+        input_root = Path(self.config["paths"]["input_dir"])
+        target_dates = sorted(
+            path.name for path in input_root.iterdir()
+            if path.is_dir() and len(path.name) == 8 and path.name.isdigit()
+            and (date_from is None or path.name >= date_from)
+            and (date_to is None or path.name <= date_to)
+        )
+
+        store = HistoryStore(self.config)
+        try:
+            ingested = set() if force else store.ingested_dates()
+            pending_dates = [date_str for date_str in target_dates if date_str not in ingested]
+            logger.info(f"履歴一括登録開始: 対象{len(target_dates)}日 / 未登録{len(pending_dates)}日")
+
+            from data_processor import DataProcessor
+            from campaign_aggregator import CampaignAggregator
+
+            aggregator = CampaignAggregator(self.config)
+            imported_count = 0
+            for date_str in pending_dates:
+                try:
+                    processor = DataProcessor(self.config, date_str)
+                    combined_data = processor.process()
+                    store.upsert_daily(date_str, aggregator.aggregate(combined_data, processor.source_row_counts))
+                    imported_count += 1
+                except Exception as e:
+                    logger.warning(f"履歴一括登録スキップ: {date_str} ({e})")
+
+            logger.info(f"履歴一括登録完了: {imported_count}/{len(pending_dates)}日")
+        finally:
+            store.close()
+
+    def bench_excel(self, target_date: str = None, latency: float = 0.0, passes: int = 2, sleep: bool = False) -> tuple:
+        """Excel工程の往復回数ベンチマーク（擬似バックエンド使用、Excel不要・ブック保存なし）"""
+        self._load_config()
+        self._calculate_target_date(target_date)
+
+        # 入力CSV不足は集計前に検出（処理対象日の指定漏れが多いため日付を明示）
+        for csv_file in self._input_csv_paths():
+            if not csv_file.exists():
+                raise FileNotFoundError(f"入力CSVが見つかりません（処理対象日 {self.target_date_str}、--date で指定）: {csv_file}")
+
+        from data_processor import DataProcessor
+        from excel_benchmark import ExcelBenchmark
+
+        processor = DataProcessor(self.config, self.target_date_str)
+        self.combined_csv_data = processor.process()
+        self.source_row_counts = processor.source_row_counts
+        paste_data, detail_data = self._prepare_paste_data()
+        breakdowns = self._build_breakdowns(self.combined_csv_data)
+
+        benchmark = ExcelBenchmark(self.config, self.target_date_str, latency=latency, sleep=sleep)
+        results = benchmark.run(paste_data, detail_data, passes=passes, breakdowns=breakdowns)
+        return results, benchmark.check_budgets(results, paste_data, detail_data)
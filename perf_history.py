@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 処理性能履歴（SQLite）
+実行ごとの工程別処理時間・行数・入力サイズ・ピークメモリ・実行設定・gitリビジョンを蓄積し、
+直近の同一設定の実行を基準に1行あたり処理時間の悪化を検出
+"""
+
+import json
+import sqlite3
+import hashlib
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta
+from loguru import logger
+
+
+class PerfHistory:
+    """処理性能履歴クラス"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS perf_runs (
+            run_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_date   TEXT NOT NULL,
+            finished_at   TEXT NOT NULL,
+            total_seconds REAL NOT NULL,
+            rows          INTEGER NOT NULL,
+            input_bytes   INTEGER NOT NULL,
+            peak_rss      INTEGER NOT NULL,
+            options_key   TEXT NOT NULL,
+            options       TEXT NOT NULL,
+            git_revision  TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS perf_stages (
+            run_id  INTEGER NOT NULL REFERENCES perf_runs (run_id),
+            stage   TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            PRIMARY KEY (run_id, stage)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_perf_runs_options ON perf_runs (options_key, run_id);
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+
+        history_config = config.get("perf_history", {})
+        self.db_path = Path(history_config.get("db_path", "history/perf_history.sqlite3"))
+        self.baseline_runs = history_config.get("baseline_runs", 14)
+        self.regression_ratio = history_config.get("regression_ratio", 0.5)
+        self.min_regression_seconds = history_config.get("min_regression_seconds", 0.5)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.connection = sqlite3.connect(str(self.db_path))
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        """DB接続終了"""
+        self.connection.close()
+
+    def record(self, report_date: str, total_seconds: float, rows: int, input_bytes: int, peak_rss: int,
+               options: dict, stage_timings: dict) -> int:
+        """実行記録の追加（run_id を返却）"""
+        options_json = json.dumps(options, ensure_ascii=False, sort_keys=True)
+        options_key = self.options_key(options)
+
+        with self.connection:
+            run_id = self.connection.execute(
+                "INSERT INTO perf_runs (report_date, finished_at, total_seconds, rows, input_bytes, peak_rss, "
+                "options_key, options, git_revision) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (report_date, datetime.now().isoformat(timespec="seconds"), total_seconds, rows, input_bytes,
+                 peak_rss, options_key, options_json, self.git_revision())
+            ).lastrowid
+            self.connection.executemany(
+                "INSERT INTO perf_stages (run_id, stage, seconds) VALUES (?, ?, ?)",
+                ((run_id, stage, seconds) for stage, seconds in stage_timings.items())
+            )
+        return run_id
+
+    def options_key(self, options: dict) -> str:
+        """実行設定の識別子（同一設定の実行のみを比較対象とする）"""
+        options_json = json.dumps(options, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(options_json.encode("utf-8")).hexdigest()[:12]
+
+    def git_revision(self) -> str:
+        """実行中コードのgitリビジョン（未コミット変更ありは +dirty、git管理外は None）"""
+        repo_dir = Path(__file__).parent
+        try:
+            revision = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=repo_dir,
+                capture_output=True, text=True, timeout=5, check=True
+            ).stdout.strip()
+            dirty = subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo_dir,
+                capture_output=True, text=True, timeout=5, check=True
+            ).stdout.strip()
+            return f"{revision}+dirty" if dirty else revision
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def runs(self, days: int = 30) -> list:
+        """直近の実行記録（古い順）"""
+        since = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+        rows = self.connection.execute(
+            "SELECT run_id, report_date, finished_at, total_seconds, rows, input_bytes, peak_rss, options_key, git_revision "
+            "FROM perf_runs WHERE finished_at >= ? ORDER BY run_id",
+            (since,)
+        ).fetchall()
+        columns = ["run_id", "report_date", "finished_at", "total_seconds", "rows", "input_bytes", "peak_rss",
+                   "options_key", "git_revision"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def samples(self, options_key: str = None, limit: int = 50) -> list:
+        """直近の実行記録と工程別処理時間（新しい順、options_key 指定時は同一設定のみ）"""
+        query = "SELECT run_id, rows, input_bytes, peak_rss, total_seconds FROM perf_runs"
+        params = []
+        if options_key:
+            query += " WHERE options_key = ?"
+            params.append(options_key)
+        query += " ORDER BY run_id DESC LIMIT ?"
+        params.append(limit)
+
+        samples = []
+        for run_id, rows, input_bytes, peak_rss, total_seconds in self.connection.execute(query, params).fetchall():
+            stages = dict(self.connection.execute(
+                "SELECT stage, seconds FROM perf_stages WHERE run_id = ?", (run_id,)
+            ).fetchall())
+            samples.append({
+                "rows": rows, "input_bytes": input_bytes, "peak_rss": peak_rss,
+                "total_seconds": total_seconds, "stages": stages,
+            })
+        return samples
+
+    def regressions(self, run_id: int) -> list:
+        """指定実行の悪化工程（1行あたり処理時間が同一設定の直近実行の中央値より regression_ratio 以上増加）"""
+        run = self.connection.execute(
+            "SELECT rows, options_key FROM perf_runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if run is None:
+            return []
+        rows, options_key = run
+
+        baseline_ids = [
+            row[0] for row in self.connection.execute(
+                "SELECT run_id FROM perf_runs WHERE options_key = ? AND run_id < ? ORDER BY run_id DESC LIMIT ?",
+                (options_key, run_id, self.baseline_runs)
+            )
+        ]
+        if not baseline_ids:
+            return []
+
+        # 工程ごとの基準値（直近実行の1行あたり処理時間の中央値、行数0の実行は除外）
+        placeholders = ",".join("?" * len(baseline_ids))
+        baseline = {}
+        for stage, seconds, baseline_rows in self.connection.execute(
+            f"SELECT s.stage, s.seconds, r.rows FROM perf_stages s JOIN perf_runs r ON r.run_id = s.run_id "
+            f"WHERE s.run_id IN ({placeholders}) AND r.rows > 0",
+            baseline_ids
+        ):
+            baseline.setdefault(stage, []).append(seconds / baseline_rows)
+
+        regressions = []
+        for stage, seconds in self.connection.execute(
+            "SELECT stage, seconds FROM perf_stages WHERE run_id = ?", (run_id,)
+        ):
+            if stage not in baseline or rows <= 0:
+                continue
+
+            baseline_per_row = statistics.median(baseline[stage])
+            expected_seconds = baseline_per_row * rows
+            if seconds > expected_seconds * (1 + self.regression_ratio) and seconds - expected_seconds >= self.min_regression_seconds:
+                regressions.append({
+                    "stage": stage,
+                    "seconds": seconds,
+                    "expected_seconds": expected_seconds,
+                    "ratio": seconds / expected_seconds if expected_seconds > 0 else float("inf"),
+                    "baseline_runs": len(baseline[stage]),
+                })
+
+        return sorted(regressions, key=lambda regression: -regression["seconds"])
+
+    def stage_trend(self, days: int = 30) -> dict:
+        """工程別の処理時間推移（run_id → {工程: 秒}）"""
+        since = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+        trend = {}
+        for run_id, stage, seconds in self.connection.execute(
+            "SELECT s.run_id, s.stage, s.seconds FROM perf_stages s JOIN perf_runs r ON r.run_id = s.run_id "
+            "WHERE r.finished_at >= ? ORDER BY s.run_id",
+            (since,)
+        ):
+            trend.setdefault(run_id, {})[stage] = seconds
+        return trend
+
+    def log_regressions(self, run_id: int):
+        """悪化工程の警告出力"""
+        regressions = self.regressions(run_id)
+        for regression in regressions:
+            logger.warning(
+                f"処理時間悪化: {regression['stage']} {regression['seconds']:.2f}秒"
+                f"（基準 {regression['expected_seconds']:.2f}秒の{regression['ratio']:.1f}倍、直近{regression['baseline_runs']}回の中央値）"
+            )
+        return regressions
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 行分割並列集計
+統合データの集計対象列を Arrow IPC 一時ファイルに1回だけ書出し、joblib のプロセスプールで各ワーカーが
+メモリマップ経由で担当行範囲のみ読込（ワーカーごとのデータフレーム転送なし）、部分合算を親プロセスで再集計
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+def _aggregate_shard(config: dict, ipc_path: str, offset: int, length: int) -> pd.DataFrame:
+    """担当行範囲のキャンペーン名×ソース単位部分合算（ワーカープロセスで実行）"""
+    import pyarrow as pa
+    from campaign_aggregator import CampaignAggregator
+
+    with pa.memory_map(ipc_path) as source:
+        shard = pa.ipc.open_file(source).read_all().slice(offset, length).to_pandas()
+
+    aggregator = CampaignAggregator(config)
+    metrics = aggregator.to_numeric_metrics(shard)
+    metrics.insert(0, 'キャンペーン名', shard['キャンペーン名'].to_numpy())
+    metrics.insert(0, 'source', shard['source'].to_numpy())
+    return (
+        metrics.groupby(['source', 'キャンペーン名'], observed=True, sort=False)[aggregator.METRIC_COLUMNS]
+        .sum()
+        .reset_index()
+    )
+
+
+def _match_shard(config: dict, keys: list, names: list) -> dict:
+    """担当キャンペーン名の一致キー照合（ワーカープロセスで実行）"""
+    from campaign_aggregator import CampaignAggregator
+
+    return CampaignAggregator(config)._match_names_serial(keys, names)
+
+
+class ShardPool:
+    """行分割並列集計クラス"""
+
+    def __init__(self, config: dict):
+        self.config = config
+
+        performance_config = config.get("performance", {})
+        shard_workers = performance_config.get("shard_workers", -1)
+        self.workers = (os.cpu_count() or 1) if shard_workers < 1 else shard_workers
+        self.min_rows = performance_config.get("shard_min_rows", 1000000)
+        self.min_names = performance_config.get("shard_min_names", 50000)
+
+    def _parallel(self):
+        """joblib 並列実行器（未導入時は None で単一プロセス処理）"""
+        try:
+            from joblib import Parallel
+        except ImportError:
+            logger.warning("joblib 未導入のため単一プロセスで集計します")
+            return None
+        return Parallel(n_jobs=self.workers, backend="loky")
+
+    def _shard_bounds(self, total: int) -> list:
+        """行範囲分割（ワーカー数で均等分割）"""
+        edges = np.linspace(0, total, self.workers + 1, dtype="int64")
+        return [(int(start), int(end - start)) for start, end in zip(edges[:-1], edges[1:]) if end > start]
+
+    def should_aggregate(self, rows: int) -> bool:
+        return self.workers > 1 and rows >= self.min_rows
+
+    def should_match(self, names: int) -> bool:
+        return self.workers > 1 and names >= self.min_names
+
+    def aggregate(self, data: pd.DataFrame, source_labels: pd.Categorical, metric_columns: list) -> pd.DataFrame:
+        """キャンペーン名×ソース単位の並列合算（並列実行不可時は None）"""
+        parallel = self._parallel()
+        if parallel is None:
+            return None
+
+        import pyarrow as pa
+        from joblib import delayed
+
+        start_time = time.perf_counter()
+        columns = ['キャンペーン名'] + [col for col in metric_columns if col in data.columns]
+        frame = data[columns].reset_index(drop=True)
+        frame['source'] = source_labels
+
+        spill_dir = Path(tempfile.mkdtemp(prefix="fam8_shard_"))
+        try:
+            ipc_path = spill_dir / "combined.arrow"
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            with pa.OSFile(str(ipc_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            del frame, table
+
+            bounds = self._shard_bounds(len(data))
+            partials = parallel(
+                delayed(_aggregate_shard)(self.config, str(ipc_path), offset, length) for offset, length in bounds
+            )
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+        # 部分合算の再集計（分割順に連結するため出現順は単一プロセス集計と一致）
+        aggregated = (
+            pd.concat(partials, ignore_index=True)
+            .groupby(['source', 'キャンペーン名'], observed=True, sort=False)[metric_columns]
+            .sum()
+            .reset_index()
+        )
+        logger.info(f"並列集計: {len(data):,}行 / {len(bounds)}分割 ({time.perf_counter() - start_time:.2f}秒)")
+        return aggregated
+
+    def match(self, keys: list, names: list) -> dict:
+        """キャンペーン名の一致キー並列照合（並列実行不可時は None）"""
+        parallel = self._parallel()
+        if parallel is None:
+            return None
+
+        from joblib import delayed
+
+        start_time = time.perf_counter()
+        partials = parallel(
+            delayed(_match_shard)(self.config, keys, names[offset:offset + length])
+            for offset, length in self._shard_bounds(len(names))
+        )
+
+        matches = {}
+        for partial in partials:
+            matches.update(partial)
+        logger.info(f"並列照合: {len(names):,}名 × {len(keys)}キー ({time.perf_counter() - start_time:.2f}秒)")
+        return matches
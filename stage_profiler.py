@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 工程別プロファイラ
+cProfile（決定的）またはスタックサンプリングで工程ごとのホットスポットを記録
+"""
+
+import io
+import sys
+import time
+import threading
+import cProfile
+import pstats
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from loguru import logger
+
+
+class StageProfiler:
+    """工程別プロファイルクラス"""
+
+    MODES = ("cprofile", "sampling")
+
+    def __init__(self, mode: str, output_dir: Path, top_n: int = 20, sample_interval: float = 0.005):
+        if mode not in self.MODES:
+            raise ValueError(f"不正なプロファイル方式: {mode} ({'/'.join(self.MODES)} で指定)")
+
+        self.mode = mode
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+
+        # 工程ごとの上位ホットスポット（サマリー出力用）
+        self.stage_summaries = []
+
+    @contextmanager
+    def profile(self, stage_name: str):
+        """工程プロファイル（with ブロック内の処理を計測）"""
+        file_stem = f"{len(self.stage_summaries) + 1:02d}_{stage_name}"
+        start_time = time.perf_counter()
+
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start_time
+                self._save_cprofile(profiler, stage_name, file_stem, elapsed)
+        else:
+            sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                elapsed = time.perf_counter() - start_time
+                self._save_samples(sampler, stage_name, file_stem, elapsed)
+
+    def _save_cprofile(self, profiler: cProfile.Profile, stage_name: str, file_stem: str, elapsed: float):
+        """cProfile結果保存（.prof＋累積時間上位）"""
+        prof_file = self.output_dir / f"{file_stem}.prof"
+        profiler.dump_stats(str(prof_file))
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+
+        self.stage_summaries.append((stage_name, elapsed, buffer.getvalue()))
+        logger.info(f"プロファイル保存: {stage_name} ({elapsed:.2f}秒) → {prof_file}")
+
+    def _save_samples(self, sampler: "_StackSampler", stage_name: str, file_stem: str, elapsed: float):
+        """サンプリング結果保存（collapsed stack形式＋自己時間上位）"""
+        collapsed_file = self.output_dir / f"{file_stem}.collapsed"
+        with open(collapsed_file, "w", encoding="utf-8") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        total_samples = sum(sampler.stacks.values())
+        leaf_counts = Counter()
+        for stack, count in sampler.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+
+        lines = [f"サンプル数: {total_samples} (間隔 {self.sample_interval * 1000:.1f}ms)"]
+        for frame_name, count in leaf_counts.most_common(self.top_n):
+            lines.append(f"  {count / total_samples * 100:6.2f}%  {count:6d}  {frame_name}")
+
+        self.stage_summaries.append((stage_name, elapsed, "\n".join(lines) + "\n"))
+        logger.info(f"プロファイル保存: {stage_name} ({elapsed:.2f}秒) → {collapsed_file}")
+
+    def write_summary(self) -> Path:
+        """全工程のホットスポット上位サマリー出力"""
+        summary_file = self.output_dir / "profile_summary.txt"
+        with open(summary_file, "w", encoding="utf-8") as f:
+            f.write(f"プロファイル方式: {self.mode} / 上位{self.top_n}件\n")
+            for stage_name, elapsed, summary in self.stage_summaries:
+                f.write("=" * 60 + "\n")
+                f.write(f"工程: {stage_name} ({elapsed:.2f}秒)\n")
+                f.write("=" * 60 + "\n")
+                f.write(summary)
+
+        logger.info(f"プロファイルサマリー出力: {summary_file}")
+        return summary_file
+
+
+class _StackSampler(threading.Thread):
+    """対象スレッドのスタックを一定間隔で採取するサンプラー"""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 工程スケジューラ
+入出力で依存関係を宣言した工程グラフを実行（独立工程はワーカースレッドで並行実行）
+"""
+
+import time
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+
+@dataclass
+class Stage:
+    """工程定義（inputs が全て揃った時点で実行、戻り値を outputs に格納）"""
+    name: str
+    func: object
+    inputs: tuple = ()
+    outputs: tuple = ()
+    worker: bool = False  # True: ワーカースレッドで実行 / False: メインスレッドで実行（Excel COM操作）
+    started_at: float = field(default=None, repr=False)
+    finished_at: float = field(default=None, repr=False)
+
+
+class StageScheduler:
+    """工程グラフ実行クラス"""
+
+    def __init__(self, stages: list, max_workers: int = 2):
+        self.stages = stages
+        self.max_workers = max_workers
+        self.producers = self._resolve_producers()
+        self.origin = None
+
+    def _resolve_producers(self) -> dict:
+        """出力名 → 生成工程の対応付け（未生成の入力・重複出力を検出）"""
+        producers = {}
+        for stage in self.stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"工程出力が重複しています: {output} ({producers[output].name}, {stage.name})")
+                producers[output] = stage
+
+        for stage in self.stages:
+            for stage_input in stage.inputs:
+                if stage_input not in producers:
+                    raise ValueError(f"工程入力の生成元がありません: {stage.name}.{stage_input}")
+
+        return producers
+
+    def run(self) -> dict:
+        """工程グラフ実行（max_workers=0 の場合は全工程をメインスレッドで順次実行）"""
+        self.origin = time.perf_counter()
+        self._results = {}
+        self._pending = list(self.stages)
+        self._running = 0
+        self._errors = []
+        self._remaining_consumers = {
+            output: sum(1 for stage in self.stages if output in stage.inputs) for output in self.producers
+        }
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers) if self.max_workers > 0 else None
+
+        try:
+            while True:
+                with self._condition:
+                    self._dispatch_workers()
+                    stage = self._next_main_stage()
+                    while stage is None and not self._errors and (self._running or self._pending):
+                        if not self._running:
+                            raise RuntimeError(f"実行可能な工程がありません: {[s.name for s in self._pending]}")
+                        self._condition.wait()
+                        stage = self._next_main_stage()
+
+                    if self._errors:
+                        raise self._errors[0]
+                    if stage is None:
+                        break
+                    self._pending.remove(stage)
+
+                # メインスレッド工程（Excel COM操作）はロック外で実行
+                outputs = self._execute(stage, self._results)
+                with self._condition:
+                    self._results.update(outputs)
+                    self._release_consumed(stage)
+        finally:
+            if self._executor:
+                # 失敗時も実行中のワーカー工程の終了を待つ
+                self._executor.shutdown(wait=True, cancel_futures=True)
+
+        self._log_critical_path()
+        return self._results
+
+    def _release_consumed(self, stage: Stage):
+        """全参照工程が完了した出力を破棄（大きな中間データを後続工程の実行中に保持しない、ロック保持中に呼出）"""
+        for stage_input in stage.inputs:
+            self._remaining_consumers[stage_input] -= 1
+            if self._remaining_consumers[stage_input] == 0:
+                self._results.pop(stage_input, None)
+
+    def _ready(self, stage: Stage) -> bool:
+        return all(name in self._results for name in stage.inputs)
+
+    def _next_main_stage(self):
+        """実行可能なメインスレッド工程（宣言順、ロック保持中に呼出）"""
+        for stage in self._pending:
+            if self._ready(stage) and not (stage.worker and self._executor):
+                return stage
+        return None
+
+    def _dispatch_workers(self):
+        """実行可能なワーカー工程を投入（ロック保持中に呼出）"""
+        if not self._executor:
+            return
+
+        for stage in [stage for stage in self._pending if stage.worker and self._ready(stage)]:
+            self._pending.remove(stage)
+            self._running += 1
+            future = self._executor.submit(self._execute, stage, dict(self._results))
+            future.stage = stage
+            future.add_done_callback(self._on_worker_done)
+
+    def _on_worker_done(self, future):
+        """ワーカー工程完了（出力を反映し、後続のワーカー工程を即時投入）"""
+        with self._condition:
+            self._running -= 1
+            try:
+                self._results.update(future.result())
+                self._release_consumed(future.stage)
+                self._dispatch_workers()
+            except Exception as e:
+                self._errors.append(e)
+            self._condition.notify_all()
+
+    def _execute(self, stage: Stage, results: dict) -> dict:
+        """工程実行（入力を引数に渡し、戻り値を出力名に対応付け）"""
+        stage.started_at = time.perf_counter() - self.origin
+        try:
+            value = stage.func(**{name: results[name] for name in stage.inputs})
+        finally:
+            stage.finished_at = time.perf_counter() - self.origin
+
+        if len(stage.outputs) == 0:
+            return {}
+        if len(stage.outputs) == 1:
+            return {stage.outputs[0]: value}
+        return dict(zip(stage.outputs, value))
+
+    def critical_path(self) -> list:
+        """クリティカルパス（最後に完了した工程から、最も遅く完了した依存工程を遡る）"""
+        finished = [stage for stage in self.stages if stage.finished_at is not None]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda stage: stage.finished_at)]
+        while True:
+            dependencies = [self.producers[name] for name in path[-1].inputs]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda stage: stage.finished_at))
+
+        return list(reversed(path))
+
+    def _log_critical_path(self):
+        """工程タイムライン・クリティカルパスをパフォーマンスログへ出力"""
+        perf_logger = logger.bind(performance=True)
+        perf_logger.info("工程タイムライン（開始 → 終了）:")
+        for stage in sorted(self.stages, key=lambda stage: stage.started_at or 0):
+            if stage.started_at is None:
+                continue
+            thread_label = "worker" if stage.worker and self.max_workers > 0 else "main"
+            perf_logger.info(
+                f"  {stage.name:<24} {stage.started_at:7.2f}秒 → {stage.finished_at:7.2f}秒 "
+                f"({stage.finished_at - stage.started_at:.2f}秒, {thread_label})"
+            )
+
+        path = self.critical_path()
+        if path:
+            route = " → ".join(f"{stage.name}({stage.finished_at - stage.started_at:.2f}秒)" for stage in path)
+            perf_logger.info(f"クリティカルパス: {route}")
+            perf_logger.info(f"全体所要時間: {path[-1].finished_at:.2f}秒")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 集計データ出力
+集計シート相当の集計値・集計軸別集計（任意で統合CSVデータ）をParquet/CSV/JSONで出力（Excel不使用、BI連携用）
+"""
+
+import os
+import json
+from pathlib import Path
+from datetime import datetime
+import pandas as pd
+from loguru import logger
+
+
+class SummaryExporter:
+    """集計データ出力クラス"""
+
+    FORMATS = ("parquet", "csv", "json")
+
+    # 集計値の列型（未一致キーは欠損値、列型は一致件数に関わらず固定）
+    SUMMARY_SCHEMA = {
+        "report_date": "string",
+        "キャンペーン名": "string",
+        "Imp": "Int64",
+        "Click": "Int64",
+        "CTR": "Float64",
+        "CV": "Int64",
+        "CVR": "Float64",
+        "グロス": "Float64",
+        "ネット": "Float64",
+        "税別グロス": "Float64",
+        "集計軸": "string",
+        "値": "string",
+    }
+
+    # 小数列の丸め桁数
+    FLOAT_DECIMALS = 6
+
+    def __init__(self, config: dict, target_date_str: str):
+        self.config = config
+        self.target_date_str = target_date_str
+
+        export_config = config.get("export", {})
+        self.formats = export_config.get("formats", list(self.FORMATS))
+        self.include_combined = export_config.get("include_combined", False)
+        for export_format in self.formats:
+            if export_format not in self.FORMATS:
+                raise ValueError(f"不正な出力形式: {export_format} ({'/'.join(self.FORMATS)} で指定)")
+
+        self.output_dir = Path(config["paths"]["output_dir"]) / target_date_str
+        self.summary_filename = config["files"].get("summary_export_filename", "csv2report_{date}_summary.{ext}")
+        self.combined_filename = config["files"].get("combined_export_filename", "csv2report_{date}_combined.{ext}")
+        self.breakdown_filename = config["files"].get("breakdown_export_filename", "csv2report_{date}_breakdown.{ext}")
+
+    def export(self, summary: pd.DataFrame, combined_data: pd.DataFrame = None, breakdown: pd.DataFrame = None) -> list:
+        """集計データ出力（出力ファイル一覧を返却）"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        typed_summary = self.typed_summary(summary)
+
+        output_files = []
+        for export_format in self.formats:
+            output_files.append(self._write(typed_summary, self.summary_filename, export_format))
+
+        # 集計軸別集計（集計値と同じ列型で出力）
+        if breakdown is not None:
+            typed_breakdown = self.typed_summary(breakdown)
+            for export_format in self.formats:
+                output_files.append(self._write(typed_breakdown, self.breakdown_filename, export_format))
+
+        # 統合CSVデータはParquet/CSVのみ（JSONは行数が多いため対象外）
+        if self.include_combined and combined_data is not None:
+            for export_format in self.formats:
+                if export_format != "json":
+                    output_files.append(self._write(combined_data, self.combined_filename, export_format))
+
+        for output_file in output_files:
+            logger.info(f"  集計データ出力: {output_file} ({output_file.stat().st_size:,} bytes)")
+        return output_files
+
+    def typed_summary(self, summary: pd.DataFrame) -> pd.DataFrame:
+        """列型固定の集計値（先頭に処理対象日列を追加）"""
+        typed_summary = summary.copy()
+        typed_summary.insert(0, "report_date", self.target_date_str)
+
+        dtypes = {col: self.SUMMARY_SCHEMA.get(col, "Float64") for col in typed_summary.columns}
+        for col, dtype in dtypes.items():
+            if dtype == "Int64":
+                # 合算値は整数（float64で保持されている場合も丸めて整数化）
+                typed_summary[col] = pd.to_numeric(typed_summary[col], errors="coerce").round(0)
+        typed_summary = typed_summary.astype(dtypes)
+
+        # 合算時の浮動小数点誤差を除去（CSV/JSONで 0.1+0.2 型の端数を出さない）
+        float_columns = [col for col, dtype in dtypes.items() if dtype == "Float64"]
+        typed_summary[float_columns] = typed_summary[float_columns].round(self.FLOAT_DECIMALS)
+        return typed_summary
+
+    def _write(self, data: pd.DataFrame, filename_template: str, export_format: str) -> Path:
+        """単一ファイル出力（一時ファイルへ書込後にリネームで置換）"""
+        output_file = self.output_dir / filename_template.format(date=self.target_date_str, ext=export_format)
+        temp_file = output_file.with_name(f".{output_file.name}.tmp")
+
+        try:
+            if export_format == "parquet":
+                data.to_parquet(temp_file, index=False)
+            elif export_format == "csv":
+                data.to_csv(temp_file, index=False, encoding="utf-8")
+            else:
+                self._write_json(data, temp_file)
+            os.replace(temp_file, output_file)
+        finally:
+            if temp_file.exists():
+                temp_file.unlink()
+
+        return output_file
+
+    def _write_json(self, data: pd.DataFrame, output_file: Path):
+        """JSON出力（列型・処理対象日・作成日時を含むオブジェクト、欠損値は null）"""
+        document = {
+            "report_date": self.target_date_str,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "schema": {col: str(dtype) for col, dtype in data.dtypes.items()},
+            "rows": json.loads(data.to_json(orient="records", force_ascii=False)),
+        }
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - テスト共通設定
+"""
+
+import re
+import sys
+from pathlib import Path
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+FIXTURE_DATE = "20250615"
+
+
+@pytest.fixture
+def fixture_env(tmp_path: Path) -> Path:
+    """事前チェック用の最小環境（設定ファイル・入力CSV・FilterInput・出力先をすべて tmp_path 配下に作成）"""
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    filter_excel = tmp_path / "FilterInput_Csvreport.xlsx"
+    (input_dir / FIXTURE_DATE).mkdir(parents=True)
+    output_dir.mkdir()
+    filter_excel.write_bytes(b"placeholder")
+
+    # 本番設定のパスのみ差し替え（TOMLリテラル文字列でバックスラッシュを回避）
+    config_text = (PROJECT_ROOT / "config.toml").read_bytes().decode("utf-8")
+    config_text = re.sub(r'(?m)^input_dir = ".*"', f"input_dir = '{input_dir}'", config_text)
+    config_text = re.sub(r'(?m)^output_dir = ".*"', f"output_dir = '{output_dir}'", config_text)
+    config_text = re.sub(r'(?m)^filter_input_excel = ".*"', f"filter_input_excel = '{filter_excel}'", config_text)
+    (tmp_path / "config.toml").write_text(config_text, encoding="utf-8")
+
+    date_formatted = f"{FIXTURE_DATE[:4]}-{FIXTURE_DATE[4:6]}-{FIXTURE_DATE[6:]}"
+    for csv_type in ("adult", "general"):
+        csv_file = input_dir / FIXTURE_DATE / f"affiliate_article_{date_formatted}_{csv_type}.csv"
+        csv_file.write_text("広告管理\n期間,x\nキャンペーングループ,ID,キャンペーン名\n1,1,テスト\n", encoding="shift_jis")
+
+    return tmp_path
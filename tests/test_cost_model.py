@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 処理コスト予測テスト
+入力CSVの抽出解析（行数・除外行）と、予測したExcel往復回数が擬似バックエンドの実測と一致することを検証
+"""
+
+import pytest
+import tomli
+from conftest import PROJECT_ROOT
+
+from cost_model import CostModel
+from data_processor import DataProcessor
+from excel_benchmark import ExcelBenchmark
+
+SLAB_ROWS = 7
+DATA_ROWS = 23
+
+
+@pytest.fixture
+def cost_config(tmp_path) -> dict:
+    """本番設定（スラブ行数・集計行数のみ縮小、処理性能履歴・日次集計履歴は tmp_path 配下）"""
+    with open(PROJECT_ROOT / "config.toml", "rb") as f:
+        config = tomli.load(f)
+    config["paths"]["input_dir"] = str(tmp_path)
+    config["paths"]["filter_input_excel"] = str(tmp_path / "FilterInput_Csvreport.xlsx")
+    config["excel_structure"]["paste_slab_rows"] = SLAB_ROWS
+    config["excel_structure"]["paste_mode"] = "raw"
+    config["excel_structure"]["raw_detail_sheet_name"] = ""
+    config["filter_settings"]["max_campaign_rows"] = 10
+    config.setdefault("history", {})["db_path"] = str(tmp_path / "campaign_history.sqlite3")
+    config.setdefault("perf_history", {})["db_path"] = str(tmp_path / "perf_history.sqlite3")
+    return config
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """前置き2行＋ヘッダー＋データ行（[total] 行を1行含む）"""
+    lines = ["広告管理", "期間,x", "キャンペーングループ,ID,キャンペーン名,Imp,Click,CV,グロス,ネット"]
+    lines += [f"G,{row},キャンペーン{row % 5},{row},{row % 3},{row % 2},{row * 10},{row * 8}" for row in range(DATA_ROWS)]
+    lines.append("[total],,,1,1,1,1,1")
+    path = tmp_path / "general.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="shift_jis")
+    return path
+
+
+def test_sample_csv_counts_rows_and_exclusions(cost_config, csv_file):
+    sampled = DataProcessor(cost_config, "20250615").sample_csv(csv_file, "general")
+
+    assert sampled["exact"]
+    assert sampled["raw_rows"] == DATA_ROWS + 1
+    assert sampled["rows"] == DATA_ROWS
+    assert len(sampled["data"]) == DATA_ROWS
+
+
+def test_sample_csv_estimates_rows_from_prefix(cost_config, csv_file):
+    sampled = DataProcessor(cost_config, "20250615").sample_csv(csv_file, "general", max_bytes=400)
+
+    assert not sampled["exact"]
+    assert sampled["sampled_rows"] < DATA_ROWS
+    assert abs(sampled["raw_rows"] - (DATA_ROWS + 1)) <= 2
+
+
+def test_com_calls_match_fake_backend(cost_config, csv_file):
+    options = {"paste_mode": "raw", "paste_slab_rows": SLAB_ROWS, "skip_unchanged_layout": True, "breakdown": False}
+    estimate = CostModel(cost_config, "20250615").estimate({"general": csv_file}, ["キャンペーン1"], options)
+
+    paste_data = DataProcessor(cost_config, "20250615").sample_csv(csv_file, "general")["data"]
+    measured = ExcelBenchmark(cost_config, "20250615").run(paste_data, passes=1)[0]
+
+    assert estimate["paste_rows"] == DATA_ROWS
+    assert estimate["com_calls"] == measured["total_calls"]
+    assert estimate["formula_cells"] == measured["stages"]["embed_formulas"]["cells"]["range.formula.set"]
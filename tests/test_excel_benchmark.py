@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - Excel工程往復回数テスト
+擬似バックエンドで貼付の範囲代入回数・再計算回数・2回目の関数埋込/書式設定省略を検証
+"""
+
+import math
+import subprocess
+import sys
+import pandas as pd
+import pytest
+import tomli
+from conftest import PROJECT_ROOT
+
+from excel_benchmark import ExcelBenchmark
+from fake_excel import FakeApp
+from format_manager import FormatManager
+
+SLAB_ROWS = 7
+
+
+@pytest.fixture
+def bench_config(tmp_path) -> dict:
+    """本番設定（スラブ行数・集計行数のみ縮小、FilterInput は擬似バックエンドのため存在不要）"""
+    with open(PROJECT_ROOT / "config.toml", "rb") as f:
+        config = tomli.load(f)
+    config["paths"]["filter_input_excel"] = str(tmp_path / "FilterInput_Csvreport.xlsx")
+    config["excel_structure"]["paste_slab_rows"] = SLAB_ROWS
+    config["excel_structure"]["raw_detail_sheet_name"] = ""
+    config["excel_structure"]["skip_unchanged_layout"] = True
+    config["filter_settings"]["max_campaign_rows"] = 10
+    return config
+
+
+def _paste_data(rows: int) -> pd.DataFrame:
+    """CSV列構成を模した合成データ"""
+    return pd.DataFrame({
+        "キャンペーングループ": ["G"] * rows,
+        "ID": range(rows),
+        "キャンペーン名": [f"キャンペーン{row % 5}" for row in range(rows)],
+        "Imp": range(rows),
+        "Click": [row % 3 for row in range(rows)],
+        "CV": [row % 2 for row in range(rows)],
+        "グロス": [row * 10 for row in range(rows)],
+        "ネット": [row * 8 for row in range(rows)],
+    })
+
+
+@pytest.mark.parametrize("rows", [1, SLAB_ROWS, 23])
+def test_paste_writes_header_and_slabs_only(bench_config, rows):
+    paste_data = _paste_data(rows)
+    results = ExcelBenchmark(bench_config, "20250615").run(paste_data, passes=1)
+
+    paste_calls = results[0]["stages"]["paste_csv_data"]["calls"]
+    assert paste_calls["range.value.set"] == 1 + math.ceil(rows / SLAB_ROWS)
+
+
+def test_recalculates_once_per_pass(bench_config):
+    results = ExcelBenchmark(bench_config, "20250615").run(_paste_data(23), passes=2)
+
+    assert [result["calls"]["app.calculate"] for result in results] == [1, 1]
+
+
+def test_second_pass_skips_formulas_and_formatting(bench_config):
+    paste_data = _paste_data(23)
+    benchmark = ExcelBenchmark(bench_config, "20250615")
+    first, second = benchmark.run(paste_data, passes=2)
+
+    assert first["stages"]["embed_formulas"]["calls"]["range.formula.set"] > 0
+    assert first["stages"]["apply_formatting"]["calls"]["range.api.set"] > 0
+    assert second["stages"]["embed_formulas"]["calls"]["range.formula.set"] == 0
+    assert second["stages"]["apply_formatting"]["calls"]["range.api.set"] == 0
+    assert benchmark.check_budgets([first, second], paste_data) == []
+
+
+def test_formatting_reapplied_when_key_rows_or_number_formats_change(bench_config):
+    app = FakeApp()
+    workbook = app.books.open(bench_config["paths"]["filter_input_excel"])
+    summary_sheet = workbook.sheets.add(name=bench_config["excel_structure"]["summary_sheet_name"])
+    summary_sheet.range("A2").value = "キー1"
+
+    def format_sets() -> int:
+        snapshot = app.counter.snapshot()
+        FormatManager(bench_config).apply_formatting(workbook)
+        return app.counter.since(snapshot)["calls"]["range.api.set"]
+
+    assert format_sets() > 0
+    assert format_sets() == 0
+
+    # 検索キー行の追加（グリッド線範囲の変更）
+    summary_sheet.range("A3").value = "キー2"
+    assert format_sets() > 0
+    assert format_sets() == 0
+
+    # 表示形式の手動変更
+    summary_sheet.range("I2:I4").api.NumberFormat = "General"
+    assert format_sets() > 0
+    assert format_sets() == 0
+
+
+def test_excel_bench_reports_missing_inputs(fixture_env):
+    result = subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "main.py"), "excel-bench", "--date", "20250101"],
+        cwd=fixture_env, capture_output=True, text=True, encoding="utf-8", errors="replace", timeout=60
+    )
+
+    assert result.returncode == 1
+    assert "[NG] 入力CSVが見つかりません" in result.stdout
+    assert "Traceback" not in result.stderr
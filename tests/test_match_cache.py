@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 検索キー照合キャッシュテスト
+キャッシュ参照・新出名のみの照合と、同一DBを開いた2接続からの同時照合を検証
+"""
+
+import threading
+import time
+
+from match_cache import MatchCache
+
+KEYS = ["春", "夏"]
+
+
+def _evaluate(keys: list, names: list) -> dict:
+    return {name: [key for key in keys if key in name] for name in names}
+
+
+def _cache_config(tmp_path) -> dict:
+    return {"match_cache": {"db_path": str(tmp_path / "match_cache.sqlite3"), "busy_timeout_seconds": 10}}
+
+
+def test_only_new_names_are_evaluated(tmp_path):
+    evaluated_names = []
+
+    def evaluate(keys, names):
+        evaluated_names.extend(names)
+        return _evaluate(keys, names)
+
+    cache = MatchCache(_cache_config(tmp_path))
+    try:
+        assert cache.matches(KEYS, ["春セール", "冬セール"], evaluate) == {"春セール": ["春"], "冬セール": []}
+        assert cache.matches(KEYS, ["春セール", "夏セール"], evaluate) == {"春セール": ["春"], "夏セール": ["夏"]}
+    finally:
+        cache.close()
+
+    assert evaluated_names == ["春セール", "冬セール", "夏セール"]
+
+
+def test_concurrent_connections_do_not_lock_each_other(tmp_path):
+    config = _cache_config(tmp_path)
+    MatchCache(config).close()
+
+    def slow_evaluate(keys, names):
+        time.sleep(0.5)
+        return _evaluate(keys, names)
+
+    results, errors = {}, []
+
+    def run(label, names):
+        cache = MatchCache(config)
+        try:
+            results[label] = cache.matches(KEYS, names, slow_evaluate)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            cache.close()
+
+    threads = [
+        threading.Thread(target=run, args=("summary", ["春セール", "冬セール"])),
+        threading.Thread(target=run, args=("paste", ["夏セール", "冬セール"])),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert results["summary"] == {"春セール": ["春"], "冬セール": []}
+    assert results["paste"] == {"夏セール": ["夏"], "冬セール": []}
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 絞込貼付テスト
+検索キーに一致する行のみの貼付・照合キャッシュ障害時のキャッシュなし照合・数値/日付キーの文字列化・除外行数のセル書込を検証
+"""
+
+import sqlite3
+from datetime import date, datetime
+import pandas as pd
+import pytest
+import tomli
+from conftest import PROJECT_ROOT
+
+from openpyxl import Workbook
+
+from campaign_aggregator import CampaignAggregator
+from data_handler import DataHandler
+from fake_excel import FakeApp
+from orchestrator import CampaignReportOrchestrator
+
+
+@pytest.fixture
+def orchestrator(tmp_path) -> CampaignReportOrchestrator:
+    with open(PROJECT_ROOT / "config.toml", "rb") as f:
+        config = tomli.load(f)
+    config["match_cache"]["enable_match_cache"] = True
+    config["match_cache"]["db_path"] = str(tmp_path / "match_cache.sqlite3")
+
+    orchestrator = CampaignReportOrchestrator()
+    orchestrator.config = config
+    orchestrator.paste_filter_dropped_rows = None
+    return orchestrator
+
+
+def _paste_data() -> pd.DataFrame:
+    return pd.DataFrame({"キャンペーン名": ["春セール", "冬セール", "夏セール", "春キャンペーン"], "Imp": ["1", "2", "3", "4"]})
+
+
+def test_filter_keeps_matching_rows(orchestrator):
+    filtered = orchestrator._filter_paste_data(_paste_data(), ["春", ""])
+
+    assert filtered["キャンペーン名"].tolist() == ["春セール", "春キャンペーン"]
+    assert orchestrator.paste_filter_dropped_rows == 2
+
+
+def test_filter_falls_back_when_match_cache_fails(orchestrator, monkeypatch):
+    class LockedCache:
+        def matches(self, keys, names, evaluate):
+            raise sqlite3.OperationalError("database is locked")
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(orchestrator, "_open_match_cache", lambda: LockedCache())
+    filtered = orchestrator._filter_paste_data(_paste_data(), ["夏"])
+
+    assert filtered["キャンペーン名"].tolist() == ["夏セール"]
+    assert orchestrator.paste_filter_dropped_rows == 3
+
+
+@pytest.mark.parametrize("address, sheet_name, cell", [
+    ("集計シート!K1", "集計シート", (1, 11)),
+    ("'前日分CSV抽出シート'!B2", "前日分CSV抽出シート", (2, 2)),
+    ("K1", None, (1, 11)),
+])
+def test_write_value_addresses(orchestrator, address, sheet_name, cell):
+    config = orchestrator.config
+    sheet_name = sheet_name or config["excel_structure"]["summary_sheet_name"]
+    workbook = FakeApp().books.open("FilterInput_Csvreport.xlsx")
+    for name in (config["excel_structure"]["summary_sheet_name"], "前日分CSV抽出シート"):
+        workbook.sheets.add(name=name)
+
+    DataHandler(config, "20250615", app_factory=FakeApp).write_value(workbook, address, 7)
+
+    assert workbook.sheets[sheet_name].values == {cell: 7}
+
+
+def test_write_value_skips_missing_sheet(orchestrator):
+    workbook = FakeApp().books.open("FilterInput_Csvreport.xlsx")
+
+    DataHandler(orchestrator.config, "20250615", app_factory=FakeApp).write_value(workbook, "なし!K1", 7)
+    DataHandler(orchestrator.config, "20250615", app_factory=FakeApp).write_value(workbook, "K1", 7)
+
+    assert len(workbook.sheets) == 0
+
+
+def test_numeric_and_date_keys_use_excel_search_text(orchestrator, tmp_path):
+    filter_excel = tmp_path / "FilterInput_Csvreport.xlsx"
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = orchestrator.config["filter_settings"]["sheet_name"]
+    for row, value in enumerate([" 春 ", 12, 12.0, 0.5, date(2025, 6, 15), None, True], start=2):
+        sheet.cell(row=row, column=1, value=value)
+    workbook.save(filter_excel)
+    orchestrator.config["paths"]["filter_input_excel"] = str(filter_excel)
+
+    aggregator = CampaignAggregator(orchestrator.config)
+    keys = aggregator.load_filter_keys()
+
+    assert keys[:7] == ["春", "12", "12", "0.5", "45823", "", "TRUE"]
+    assert aggregator.inexact_keys == []
+
+
+@pytest.mark.parametrize("value", [1e20, datetime(2025, 6, 15, 9, 30), date(1900, 1, 1)])
+def test_inexact_keys_are_reported(orchestrator, value):
+    text, exact = CampaignAggregator(orchestrator.config).search_text(value)
+
+    assert text
+    assert not exact
+
+
+def test_filter_skipped_for_inexact_keys(orchestrator):
+    orchestrator.inexact_filter_keys = ["1e+20"]
+    paste_data = _paste_data()
+
+    assert orchestrator._filter_paste_data(paste_data, ["春", "1e+20"]) is paste_data
+    assert orchestrator.paste_filter_dropped_rows is None
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 起動時import予算テスト
+python -X importtime main.py check で重いモジュールを読み込まないこと・import時間の合計が予算内であることを検証
+"""
+
+import re
+import subprocess
+import sys
+from conftest import FIXTURE_DATE, PROJECT_ROOT
+
+# check コマンドで読み込んではならないモジュール（各コマンド内で遅延import）
+FORBIDDEN_MODULES = ["pandas", "numpy", "xlwings", "psutil", "chardet"]
+
+# import時間の合計（各モジュールの self 時間の総和）の予算（秒）
+IMPORT_BUDGET_SECONDS = 1.0
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _run_importtime(cwd) -> tuple:
+    """check コマンドを -X importtime 付きで実行（終了コード・import記録の一覧を返却）"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(PROJECT_ROOT / "main.py"), "check", "--date", FIXTURE_DATE],
+        cwd=cwd, capture_output=True, text=True, encoding="utf-8", errors="replace", timeout=60
+    )
+    imports = [
+        (match.group(4), int(match.group(1)))
+        for match in map(IMPORT_LINE.match, result.stderr.splitlines()) if match
+    ]
+    return result, imports
+
+
+def test_check_does_not_import_heavy_modules(fixture_env):
+    result, imports = _run_importtime(fixture_env)
+    assert result.returncode == 0, result.stdout
+
+    imported = {name for name, _ in imports}
+    loaded = [
+        module for module in FORBIDDEN_MODULES
+        if module in imported or any(name.startswith(f"{module}.") for name in imported)
+    ]
+    assert not loaded, f"check コマンドで重いモジュールを読込: {loaded}"
+
+
+def test_check_import_time_within_budget(fixture_env):
+    result, imports = _run_importtime(fixture_env)
+    assert imports, result.stderr[-2000:]
+
+    total_seconds = sum(self_us for _, self_us in imports) / 1_000_000
+    slowest = sorted(imports, key=lambda item: -item[1])[:10]
+    assert total_seconds < IMPORT_BUDGET_SECONDS, (
+        f"import時間 {total_seconds:.3f}秒 > 予算 {IMPORT_BUDGET_SECONDS}秒（上位: {slowest}）"
+    )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - 期間集計（月初来・直近N日）
+履歴DBの日次キャンペーン集計を部分和キャッシュとして期間合算し、集計シートを出力
+"""
+
+from pathlib import Path
+from datetime import datetime, timedelta
+from loguru import logger
+
+from data_processor import DataProcessor
+from campaign_aggregator import CampaignAggregator
+from history_store import HistoryStore
+from match_cache import MatchCache
+
+
+class WindowReportBuilder:
+    """期間集計レポート作成クラス"""
+
+    # 期間指定（mtd: 月初来、Nd: 対象日を含む直近N日）
+    WINDOWS = ("mtd", "7d", "30d")
+
+    def __init__(self, config: dict, target_date: datetime, window: str):
+        if window not in self.WINDOWS:
+            raise ValueError(f"不正な集計期間: {window} ({'/'.join(self.WINDOWS)} で指定)")
+
+        self.config = config
+        self.target_date = target_date
+        self.target_date_str = target_date.strftime("%Y%m%d")
+        self.window = window
+
+        self.aggregator = CampaignAggregator(config)
+
+    def build(self) -> Path:
+        """期間集計メイン処理"""
+        window_dates = self._window_dates()
+        date_from, date_to = window_dates[0], window_dates[-1]
+        logger.info(f"期間集計開始: {self.window} ({date_from}～{date_to}, {len(window_dates)}日)")
+
+        store = HistoryStore(self.config)
+        try:
+            # 未集計日のみCSV処理（集計済み日は履歴DBの部分和を再利用）
+            self._fill_missing_days(store, window_dates)
+
+            campaign_totals = store.window_totals(date_from, date_to)
+        finally:
+            store.close()
+
+        logger.info(f"期間合算完了: {len(campaign_totals):,}キャンペーン")
+
+        keys = self.aggregator.load_filter_keys()
+        match_cache = MatchCache(self.config) if self.config.get("match_cache", {}).get("enable_match_cache", False) else None
+        try:
+            summary = self.aggregator.build_summary(campaign_totals, keys, match_cache)
+        finally:
+            if match_cache:
+                match_cache.close()
+
+        return self._write_report(summary, date_from, date_to)
+
+    def _window_dates(self) -> list:
+        """期間内日付一覧（YYYYMMDD、昇順）"""
+        if self.window == "mtd":
+            start_date = self.target_date.replace(day=1)
+        else:
+            start_date = self.target_date - timedelta(days=int(self.window[:-1]) - 1)
+
+        day_count = (self.target_date - start_date).days + 1
+        return [(start_date + timedelta(days=offset)).strftime("%Y%m%d") for offset in range(day_count)]
+
+    def _fill_missing_days(self, store: HistoryStore, window_dates: list):
+        """未集計日の日次集計を履歴DBへ追加"""
+        ingested = store.ingested_dates()
+        missing_dates = [date_str for date_str in window_dates if date_str not in ingested]
+        logger.info(f"日次部分和: 集計済み{len(window_dates) - len(missing_dates)}日 / 追加集計{len(missing_dates)}日")
+
+        for date_str in missing_dates:
+            try:
+                processor = DataProcessor(self.config, date_str)
+                combined_data = processor.process()
+                store.upsert_daily(date_str, self.aggregator.aggregate(combined_data, processor.source_row_counts))
+            except FileNotFoundError as e:
+                logger.warning(f"入力CSVなしのため期間集計から除外: {date_str} ({e})")
+
+    def _write_report(self, summary, date_from: str, date_to: str) -> Path:
+        """期間集計シート出力（CTR/CVRは%表示、税別グロスは通貨書式）"""
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill
+
+        output_dir = Path(self.config["paths"]["output_dir"]) / self.target_date_str
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_filename = self.config["files"]["window_output_filename"].format(
+            date=self.target_date_str, window=self.window
+        )
+        output_file = output_dir / output_filename
+
+        formatting = self.config["excel_formatting"]
+        column_formats = {
+            "CTR": formatting["percentage_format"],
+            "CVR": formatting["percentage_format"],
+            "税別グロス": formatting["currency_format"],
+            "Imp": formatting["number_format"],
+            "Click": formatting["number_format"],
+            "CV": formatting["number_format"],
+            "グロス": formatting["number_format"],
+            "ネット": formatting["number_format"],
+        }
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = self.config["excel_structure"]["summary_sheet_name"]
+
+        # ヘッダー（薄いグレー・太字）
+        header_fill = PatternFill("solid", fgColor="{:02X}{:02X}{:02X}".format(*formatting["header_background_color"]))
+        sheet.append(list(summary.columns))
+        for cell in sheet[1]:
+            cell.font = Font(bold=formatting["header_font_bold"])
+            cell.fill = header_fill
+
+        for record in summary.itertuples(index=False):
+            sheet.append([None if value != value else value for value in record])  # NaN → 空セル
+
+        for col_idx, col_name in enumerate(summary.columns, 1):
+            if col_name in column_formats:
+                for (cell,) in sheet.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx):
+                    cell.number_format = column_formats[col_name]
+
+        sheet["K1"] = "集計期間"
+        sheet["L1"] = f"{date_from}～{date_to}"
+
+        workbook.save(output_file)
+        logger.info(f"期間集計出力完了: {output_file}")
+        return output_file
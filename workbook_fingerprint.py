@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fam8キャンペーンレポート自動集計システム - ワークブック配置フィンガープリント
+集計シートの関数配置・書式設定状態のハッシュを非表示の名前定義に保存し、変更がなければ再設定を省略
+"""
+
+import json
+import hashlib
+from loguru import logger
+
+
+class WorkbookFingerprint:
+    """ワークブック配置フィンガープリントクラス"""
+
+    # 保存先の名前定義（非表示）
+    DEFINED_NAME = "FAM8_LAYOUT_FINGERPRINT"
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.enabled = config["excel_structure"].get("skip_unchanged_layout", True)
+
+    def digest(self, *parts) -> str:
+        """構成要素のハッシュ（JSON化して連結）"""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def read(self, workbook) -> dict:
+        """保存済みフィンガープリント読込（未保存時は空）"""
+        if not self.enabled:
+            return {}
+
+        try:
+            for name in workbook.names:
+                if name.name == self.DEFINED_NAME:
+                    # refers_to は ="formula=...;format=..." 形式
+                    value = name.refers_to.lstrip("=").strip('"')
+                    return dict(part.split("=", 1) for part in value.split(";") if "=" in part)
+        except Exception as e:
+            logger.warning(f"配置フィンガープリント読込エラー: {e}")
+        return {}
+
+    def matches(self, workbook, kind: str, fingerprint: str) -> bool:
+        """保存済みフィンガープリントとの一致判定"""
+        return self.enabled and self.read(workbook).get(kind) == fingerprint
+
+    def write(self, workbook, kind: str, fingerprint: str):
+        """フィンガープリント保存（fingerprint=None で削除、他の種別の値は保持、保存はワークブック保存時）"""
+        if not self.enabled:
+            return
+
+        try:
+            values = self.read(workbook)
+            if fingerprint is None:
+                values.pop(kind, None)
+            else:
+                values[kind] = fingerprint
+            refers_to = '="' + ";".join(f"{key}={value}" for key, value in sorted(values.items())) + '"'
+
+            for name in workbook.names:
+                if name.name == self.DEFINED_NAME:
+                    name.delete()
+                    break
+
+            defined_name = workbook.names.add(self.DEFINED_NAME, refers_to)
+            defined_name.api.Visible = False
+            logger.debug(f"配置フィンガープリント保存: {kind}={fingerprint}")
+        except Exception as e:
+            logger.warning(f"配置フィンガープリント保存エラー（次回も再設定）: {e}")